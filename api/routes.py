@@ -1,6 +1,8 @@
 """API路由"""
 from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import Dict
+from fastapi.responses import PlainTextResponse
+from typing import Dict, Optional
+import threading
 import uuid
 from datetime import datetime
 
@@ -19,6 +21,72 @@ router = APIRouter(prefix="/api/v1", tags=["审核"])
 # 临时存储（实际应使用数据库）
 tasks_storage: Dict[str, ReviewResponse] = {}
 
+# 进程内共享的租户规则注册表（热更新时整体替换规则快照）
+_rule_registry = None
+_rule_registry_lock = threading.Lock()
+
+
+def get_rule_registry():
+    """获取共享的租户规则注册表，首次调用时初始化并启动规则文件监听
+
+    Returns:
+        TenantRuleRegistry: 租户规则注册表
+    """
+    global _rule_registry
+    if _rule_registry is None:
+        with _rule_registry_lock:
+            if _rule_registry is None:
+                from services.tenant_rules import TenantRuleRegistry
+                from config.settings import settings
+
+                registry = TenantRuleRegistry(
+                    tenants_dir=settings.rule_tenants_dir,
+                    cache_dir=settings.rule_cache_dir,
+                    metrics_enabled=settings.rule_metrics_enabled,
+                    metrics_sample_rate=settings.rule_metrics_sample_rate,
+                    cache_size=settings.rule_ruleset_cache_size,
+                    max_tenants=settings.rule_max_tenants
+                )
+                if settings.rule_watch_interval > 0:
+                    registry.start_watching(settings.rule_watch_interval)
+                _rule_registry = registry
+    return _rule_registry
+
+
+def get_rule_engine(tenant_id: Optional[str] = None):
+    """获取租户的规则引擎
+
+    Args:
+        tenant_id: 租户ID，为空或未配置租户规则时使用基础规则
+
+    Returns:
+        RuleEngine: 规则引擎
+    """
+    return get_rule_registry().get(tenant_id)
+
+
+# 进程内共享的审核流程（OCR线程池、进程池和识别缓存只创建一次）
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline():
+    """获取共享的审核流程，首次调用时初始化
+
+    规则检测按租户在路由中完成，结果通过 ``rule_result`` 传入流程。
+
+    Returns:
+        ModerationPipeline: 审核流程
+    """
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                from core.pipeline import ModerationPipeline
+
+                _pipeline = ModerationPipeline(rule_engine=get_rule_engine())
+    return _pipeline
+
 
 @router.post("/review", response_model=ReviewResponse, summary="提交审核任务")
 async def submit_review(
@@ -41,11 +109,9 @@ async def submit_review(
     
     if sync:
         # 同步执行审核（用于测试）
-        from core.pipeline import ModerationPipeline, ContentData
-        from config.settings import Settings
+        from core.pipeline import ContentData
         
-        settings = Settings()
-        pipeline = ModerationPipeline(settings)
+        pipeline = get_pipeline()
         
         content_data = ContentData(
             content_type=request.content_type,
@@ -54,8 +120,10 @@ async def submit_review(
         )
         
         try:
-            import asyncio
-            result = await pipeline.execute(content_data)
+            rule_result = get_rule_engine(request.tenant_id).check_text(
+                content_data.content, mode=pipeline.rule_scan_mode
+            )
+            result = await pipeline.execute(content_data, rule_result=rule_result)
             
             # 创建完成的响应
             response = ReviewResponse(
@@ -66,7 +134,7 @@ async def submit_review(
                     confidence=result.confidence,
                     violation_types=result.violation_types,
                     suggestions=result.suggestions,
-                    details=result.details
+                    details={"spans": result.spans} if result.spans else None
                 ),
                 completed_at=datetime.now()
             )
@@ -121,14 +189,24 @@ async def batch_review(request: BatchReviewRequest, sync: bool = False):
     """
     if sync:
         # 同步执行（用于测试）
-        from core.pipeline import ModerationPipeline, ContentData
-        from config.settings import Settings
+        from core.pipeline import ContentData
+        
+        pipeline = get_pipeline()
         
-        settings = Settings()
-        pipeline = ModerationPipeline(settings)
+        # 规则引擎阶段按租户分组整批检测，摊薄逐条调用开销
+        # （条目未指定租户时使用请求的租户）
+        groups: Dict[int, tuple] = {}
+        for index, item in enumerate(request.items):
+            engine = get_rule_engine(item.tenant_id or request.tenant_id)
+            groups.setdefault(id(engine), (engine, []))[1].append(index)
+        rule_results = [None] * len(request.items)
+        for engine, indices in groups.values():
+            texts = [request.items[index].content for index in indices]
+            for index, rule_result in zip(indices, engine.check_texts(texts, mode=pipeline.rule_scan_mode)):
+                rule_results[index] = rule_result
         
         results = []
-        for item in request.items:
+        for item, rule_result in zip(request.items, rule_results):
             content_data = ContentData(
                 content_type=item.content_type,
                 content=item.content,
@@ -136,12 +214,13 @@ async def batch_review(request: BatchReviewRequest, sync: bool = False):
             )
             
             try:
-                result = await pipeline.execute(content_data)
+                result = await pipeline.execute(content_data, rule_result=rule_result)
                 results.append({
                     "is_compliant": result.is_compliant,
                     "confidence": result.confidence,
                     "violation_types": result.violation_types,
-                    "suggestions": result.suggestions
+                    "suggestions": result.suggestions,
+                    "spans": result.spans
                 })
             except Exception as e:
                 results.append({
@@ -202,12 +281,55 @@ async def get_stats(
 @router.post("/admin/reload-rules", response_model=StandardResponse, summary="重载规则")
 async def reload_rules() -> StandardResponse:
     """重载规则配置
+
+    新规则快照构建完成后原子替换，重载期间的审核请求不受影响。
+    同时重新扫描租户规则目录，并重载已加载的租户规则。
     
     Returns:
         StandardResponse: 标准响应
     """
-    # 实际应调用规则引擎的hot_reload方法
+    import asyncio
+
+    registry = get_rule_registry()
+    loop = asyncio.get_running_loop()
+    success = await loop.run_in_executor(None, registry.hot_reload)
+    if not success:
+        raise HTTPException(status_code=500, detail="规则重载失败")
+
+    stats = registry.base.get_statistics()
+    return StandardResponse(
+        code=200,
+        message="规则已重载",
+        data={
+            "version": stats["version"],
+            "content_hash": stats["content_hash"],
+            "tenants": registry.tenants
+        }
+    )
+
+
+@router.get("/admin/rule-metrics", response_model=StandardResponse, summary="规则命中统计")
+async def get_rule_metrics() -> StandardResponse:
+    """获取每条规则的命中次数和采样的正则耗时
+
+    Returns:
+        StandardResponse: 标准响应
+    """
     return StandardResponse(
         code=200,
-        message="规则已重载"
+        message="规则统计",
+        data=get_rule_engine().get_metrics()
+    )
+
+
+@router.get("/metrics/rules", response_class=PlainTextResponse, summary="规则指标（Prometheus）")
+async def get_rule_metrics_prometheus() -> PlainTextResponse:
+    """以 Prometheus 文本格式导出规则指标
+
+    Returns:
+        PlainTextResponse: Prometheus 文本格式的指标
+    """
+    return PlainTextResponse(
+        get_rule_engine().render_metrics(),
+        media_type="text/plain; version=0.0.4"
     )
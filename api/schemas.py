@@ -17,6 +17,7 @@ class ReviewRequest(BaseModel):
     content_type: ContentType = Field(..., description="内容类型")
     content: str = Field(..., description="文本内容或URL")
     image_url: Optional[str] = Field(default=None, description="图片URL")
+    tenant_id: Optional[str] = Field(default=None, description="租户ID（使用该租户的规则集）")
     metadata: Optional[Dict] = Field(default={}, description="元数据")
 
 
@@ -56,6 +57,7 @@ class ReviewResponse(BaseModel):
 class BatchReviewRequest(BaseModel):
     """批量审核请求"""
     items: List[ReviewRequest] = Field(..., description="审核项列表")
+    tenant_id: Optional[str] = Field(default=None, description="租户ID（使用该租户的规则集）")
     callback_url: Optional[str] = Field(default=None, description="回调URL")
 
 
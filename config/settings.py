@@ -23,6 +23,18 @@ class Settings(BaseSettings):
     # OCR配置
     tencent_secret_id: Optional[str] = None
     tencent_secret_key: Optional[str] = None
+    ocr_paddle_executor: str = "process"  # PaddleOCR 执行方式：process、thread
+    ocr_tesseract_executor: str = "thread"  # Tesseract 执行方式：thread、subprocess
+    ocr_max_workers: int = 0  # 每个OCR引擎的并发上限，0 表示使用 max_workers
+    ocr_mode: str = "race"  # 多引擎识别模式：all、race、cascade
+    ocr_confidence_threshold: float = 0.85  # race/cascade 模式下直接采用结果的置信度阈值
+    ocr_cache_enabled: bool = True  # 是否按图片哈希缓存OCR结果
+    ocr_cache_size: int = 10000  # 最多缓存的图片数
+    ocr_cache_ttl: int = 604800  # 缓存有效期（秒），0 表示不过期
+    ocr_cache_radius: int = 0  # 0 表示只复用像素完全相同的图片；大于 0 时按 dHash 汉明距离复用近似图片
+    ocr_cache_path: Optional[str] = None  # OCR缓存的 SQLite 文件，为空时只缓存在内存中
+    ocr_preprocess_enabled: bool = True  # 识别前是否做图像预处理（缩小、灰度化、倾斜校正、二值化）
+    ocr_max_side: int = 1600  # 预处理后图片长边的上限（像素）
 
     # 数据库配置
     database_url: str = "sqlite:///./data/moderation.db"
@@ -32,6 +44,14 @@ class Settings(BaseSettings):
     confidence_threshold_high: float = 0.9
     confidence_threshold_low: float = 0.6
     max_workers: int = 4
+    rule_cache_dir: Optional[str] = "data/rule_cache"  # 规则编译产物缓存目录
+    rule_watch_interval: float = 5.0  # 规则文件监听间隔（秒），0 表示不监听
+    rule_metrics_enabled: bool = True  # 是否统计规则命中和正则耗时
+    rule_metrics_sample_rate: int = 64  # 每多少条文本采样一次正则耗时
+    rule_scan_mode: str = "all"  # 审核流程的规则检测模式：all、first_critical、any（短路模式的违规类型和证据不完整）
+    rule_tenants_dir: Optional[str] = "config/tenants"  # 租户规则目录（文件名即租户ID）
+    rule_ruleset_cache_size: int = 32  # 按内容哈希共享的编译规则集缓存容量
+    rule_max_tenants: int = 256  # 最多同时加载的租户规则引擎数量
     log_level: str = "INFO"
 
     # Celery配置
@@ -1,10 +1,11 @@
 """审核流程编排"""
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from dataclasses import dataclass
 from datetime import datetime
 
-from services.rule_engine import RuleEngine
+from services.rule_engine import RuleEngine, RuleResult
 from services.ocr_service import OCRService
+from services.ocr_cache import OCRCache
 from services.llm_service import LLMService
 from services.rag_service import RAGService
 from config.settings import settings
@@ -17,6 +18,8 @@ class ContentData:
     content: str
     text: str = ""
     metadata: Dict = None
+    # 图片内容（编码后的字节），有值时OCR直接解码，无需先写临时文件
+    image_data: Optional[bytes] = None
 
 
 @dataclass
@@ -30,6 +33,7 @@ class Decision:
     need_human_review: bool
     stage: str
     costs: Dict
+    spans: Optional[List[Dict]] = None
 
 
 class ModerationPipeline:
@@ -50,8 +54,26 @@ class ModerationPipeline:
             llm_service: LLM服务
             rag_service: RAG服务
         """
-        self.rule_engine = rule_engine or RuleEngine()
-        self.ocr_service = ocr_service or OCRService()
+        self.rule_engine = rule_engine or RuleEngine(
+            cache_dir=settings.rule_cache_dir,
+            metrics_enabled=settings.rule_metrics_enabled,
+            metrics_sample_rate=settings.rule_metrics_sample_rate
+        )
+        self.ocr_service = ocr_service or OCRService(
+            paddle_executor=settings.ocr_paddle_executor,
+            tesseract_executor=settings.ocr_tesseract_executor,
+            max_workers=settings.ocr_max_workers or settings.max_workers,
+            mode=settings.ocr_mode,
+            confidence_threshold=settings.ocr_confidence_threshold,
+            cache=OCRCache(
+                max_entries=settings.ocr_cache_size,
+                ttl=settings.ocr_cache_ttl,
+                radius=settings.ocr_cache_radius,
+                path=settings.ocr_cache_path
+            ) if settings.ocr_cache_enabled else None,
+            preprocess=settings.ocr_preprocess_enabled,
+            max_side=settings.ocr_max_side
+        )
         self.llm_service = llm_service or LLMService(
             deepseek_api_key=settings.deepseek_api_key,
             openai_api_key=settings.openai_api_key,
@@ -63,20 +85,27 @@ class ModerationPipeline:
         
         self.confidence_threshold_high = settings.confidence_threshold_high
         self.confidence_threshold_low = settings.confidence_threshold_low
+        self.rule_scan_mode = settings.rule_scan_mode
 
-    async def execute(self, content_data: ContentData) -> Decision:
+    async def execute(
+        self,
+        content_data: ContentData,
+        rule_result: Optional[RuleResult] = None
+    ) -> Decision:
         """执行审核流程
         
         Args:
             content_data: 内容数据
+            rule_result: 已有的规则引擎结果（批量审核时由 check_texts 预先计算）
             
         Returns:
             Decision: 审核决策
         """
         start_time = datetime.now()
         
-        # Stage 1: 规则引擎预筛
-        rule_result = self.rule_engine.check_text(content_data.content)
+        # Stage 1: 规则引擎预筛（任一命中即拒绝；决策要带全部违规类型和证据，默认完整检测）
+        if rule_result is None:
+            rule_result = self.rule_engine.check_text(content_data.content, mode=self.rule_scan_mode)
         
         if rule_result.is_violated:
             # 规则命中，直接拒绝
@@ -88,15 +117,15 @@ class ModerationPipeline:
                 reasoning="规则引擎命中黑名单",
                 need_human_review=False,
                 stage="rule_engine",
-                costs={"tokens_used": 0, "api_cost": 0.0}
+                costs={"tokens_used": 0, "api_cost": 0.0},
+                spans=rule_result.snippets()
             )
 
         # Stage 2: OCR提取（如果是图像）
         if content_data.content_type == "image":
             try:
-                extracted_text = await self.ocr_service.extract_text_multi_engine(
-                    content_data.content
-                )
+                image = content_data.image_data if content_data.image_data is not None else content_data.content
+                extracted_text = await self.ocr_service.extract_text_multi_engine(image)
                 content_data.text += " " + extracted_text
             except Exception as e:
                 print(f"OCR提取失败: {e}")
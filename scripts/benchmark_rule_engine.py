@@ -0,0 +1,350 @@
+"""规则引擎基准测试脚本
+
+生成不同规模的合成规则集（10 ~ 100k 条）和不同长度的文本（10 字 ~ 100 KB），
+测量规则编译耗时与内存、check_text 延迟分位数和吞吐、check_texts 批量吞吐，
+结果写入 JSON（键有序、随机种子固定），便于在不同提交之间对比。
+
+    # 默认矩阵
+    python scripts/benchmark_rule_engine.py --output data/benchmarks/rule_engine.json
+
+    # 快速运行，并与基线对比
+    python scripts/benchmark_rule_engine.py --quick --compare data/benchmarks/baseline.json
+"""
+import argparse
+import gc
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import yaml
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.rule_engine import RuleEngine
+
+
+DEFAULT_RULE_COUNTS = [10, 100, 1000, 10000, 100000]
+DEFAULT_TEXT_SIZES = [10, 100, 1000, 10000, 100000]
+QUICK_RULE_COUNTS = [10, 1000]
+QUICK_TEXT_SIZES = [100, 10000]
+
+# 合成规则构成：带字面量的组合正则比例，以及无字面量正则的数量上限
+# （无字面量正则在真实规则集中很少，且全部合并进同一个正则）
+COMPOUND_RULE_RATIO = 0.15
+MAX_LITERAL_FREE_RULES = 20
+
+# 合成文本中植入命中关键词的密度（每多少个字符一个）
+HIT_INTERVAL = 200
+
+# 批量检测每批的总字符数上限与条数上限
+BATCH_CHARS = 256 * 1024
+MAX_BATCH_SIZE = 256
+
+SEVERITIES = ["low", "medium", "high", "critical"]
+LITERAL_FREE_PATTERNS = [r"\d{{{n}}}", r"[A-Z]{{{n}}}\d", r"[a-z]{{2,{n}}}号"]
+
+# 合成文本使用的常用汉字（CJK 基本区前段）
+ALPHABET = [chr(code) for code in range(0x4E00, 0x4E00 + 3000)]
+
+
+def generate_rules(count: int, rng: random.Random) -> tuple:
+    """生成合成规则
+
+    Args:
+        count: 规则条数
+        rng: 随机数生成器
+
+    Returns:
+        tuple: (按类别分组的黑名单规则, 关键词列表)
+    """
+    keywords = set()
+    while len(keywords) < count:
+        keywords.add("".join(rng.choices(ALPHABET, k=rng.randint(2, 4))))
+    keywords = sorted(keywords)
+    rng.shuffle(keywords)
+
+    literal_free = min(MAX_LITERAL_FREE_RULES, count // 10)
+    compound = int(count * COMPOUND_RULE_RATIO)
+    blacklist: Dict[str, List[Dict]] = {}
+    for index, keyword in enumerate(keywords):
+        if index < literal_free:
+            template = LITERAL_FREE_PATTERNS[index % len(LITERAL_FREE_PATTERNS)]
+            pattern = template.format(n=6 + index)
+        elif index < literal_free + compound:
+            pattern = f"{keyword}.{{0,8}}{rng.choice(keywords)}"
+        else:
+            pattern = keyword
+        category = f"category_{index % 20}"
+        blacklist.setdefault(category, []).append({
+            "pattern": pattern,
+            "type": f"type_{index % 50}",
+            "severity": SEVERITIES[index % len(SEVERITIES)]
+        })
+    return blacklist, keywords
+
+
+def generate_text(size: int, keywords: List[str], rng: random.Random) -> str:
+    """生成合成文本，每 ``HIT_INTERVAL`` 个字符左右植入一个关键词
+
+    Args:
+        size: 文本长度（字符数）
+        keywords: 关键词
+        rng: 随机数生成器
+
+    Returns:
+        str: 文本
+    """
+    parts = []
+    length = 0
+    next_hit = HIT_INTERVAL
+    while length < size:
+        if length >= next_hit:
+            piece = rng.choice(keywords)
+            next_hit += HIT_INTERVAL
+        else:
+            piece = "".join(rng.choices(ALPHABET, k=min(8, size - length)))
+            if rng.random() < 0.2:
+                piece += "，"
+        parts.append(piece)
+        length += len(piece)
+    return "".join(parts)[:size]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """分位数（最近秩）"""
+    if not sorted_values:
+        return 0.0
+    rank = min(int(fraction * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[rank]
+
+
+def rss_bytes() -> Optional[int]:
+    """当前进程常驻内存（仅 Linux）"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        import resource
+        return pages * resource.getpagesize()
+    except (OSError, ImportError, ValueError):
+        return None
+
+
+def measure_build(rules_path: Path) -> tuple:
+    """测量规则编译耗时和内存
+
+    耗时与内存分两次编译测量，避免 tracemalloc 开销计入耗时；
+    tracemalloc 只统计 Python 分配，AC 自动机等 C 扩展内存体现在 RSS 增量中。
+
+    Returns:
+        tuple: (规则引擎, 编译统计)
+    """
+    gc.collect()
+    rss_before = rss_bytes()
+    start = time.perf_counter()
+    engine = RuleEngine(str(rules_path), metrics_enabled=True)
+    build_seconds = time.perf_counter() - start
+    rss_after = rss_bytes()
+
+    tracemalloc.start()
+    traced = RuleEngine(str(rules_path), metrics_enabled=True)
+    python_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del traced
+    gc.collect()
+
+    stats = engine.get_statistics()
+    return engine, {
+        "build_seconds": round(build_seconds, 4),
+        "python_bytes": python_bytes,
+        "rss_delta_bytes": rss_after - rss_before if rss_before is not None else None,
+        "total_rules": stats["total_rules"],
+        "rejected_rules": len(stats["rejected_rules"]),
+        "gated_rules": len(engine.gated_rules),
+        "merged_rules": len(engine.merged_rules),
+        "standalone_rules": len(engine.standalone_rules)
+    }
+
+
+def measure_check_text(engine: RuleEngine, text: str, min_time: float, min_runs: int) -> Dict:
+    """测量 check_text 延迟分位数和吞吐"""
+    engine.check_text(text)
+    latencies = []
+    deadline = time.perf_counter() + min_time
+    while len(latencies) < min_runs or time.perf_counter() < deadline:
+        start = time.perf_counter_ns()
+        engine.check_text(text)
+        latencies.append(time.perf_counter_ns() - start)
+
+    latencies.sort()
+    total_seconds = sum(latencies) / 1e9
+    return {
+        "runs": len(latencies),
+        "p50_us": round(percentile(latencies, 0.50) / 1000, 2),
+        "p90_us": round(percentile(latencies, 0.90) / 1000, 2),
+        "p99_us": round(percentile(latencies, 0.99) / 1000, 2),
+        "max_us": round(latencies[-1] / 1000, 2),
+        "texts_per_second": round(len(latencies) / total_seconds, 1),
+        "mb_per_second": round(len(text.encode("utf-8")) * len(latencies) / total_seconds / 1e6, 3)
+    }
+
+
+def measure_check_texts(engine: RuleEngine, texts: List[str], min_time: float, min_runs: int) -> Dict:
+    """测量 check_texts 批量吞吐"""
+    engine.check_texts(texts)
+    durations = []
+    deadline = time.perf_counter() + min_time
+    while len(durations) < min_runs or time.perf_counter() < deadline:
+        start = time.perf_counter_ns()
+        engine.check_texts(texts)
+        durations.append(time.perf_counter_ns() - start)
+
+    total_seconds = sum(durations) / 1e9
+    batch_bytes = sum(len(text.encode("utf-8")) for text in texts)
+    return {
+        "batch_size": len(texts),
+        "runs": len(durations),
+        "batch_p50_ms": round(percentile(sorted(durations), 0.50) / 1e6, 3),
+        "texts_per_second": round(len(texts) * len(durations) / total_seconds, 1),
+        "mb_per_second": round(batch_bytes * len(durations) / total_seconds / 1e6, 3)
+    }
+
+
+def run(args) -> Dict:
+    """执行基准测试矩阵"""
+    with open(args.rules, "r", encoding="utf-8") as f:
+        base_config = yaml.safe_load(f) or {}
+    # 合成规则集沿用当前配置中的白名单、归一化和防护设置，外部词库不参与
+    base_config["lexicons"] = []
+
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for rule_count in args.rule_counts:
+            rng = random.Random(f"{args.seed}:{rule_count}")
+            blacklist, keywords = generate_rules(rule_count, rng)
+            config = dict(base_config, blacklist=blacklist)
+            rules_path = Path(temp_dir) / f"rules-{rule_count}.yaml"
+            rules_path.write_text(yaml.safe_dump(config, allow_unicode=True), encoding="utf-8")
+
+            print(f"规则数 {rule_count}: 编译中...")
+            engine, build = measure_build(rules_path)
+            print(f"  编译 {build['build_seconds']}s, Python 内存 {build['python_bytes'] / 1e6:.1f}MB")
+
+            scans = []
+            for size in args.text_sizes:
+                text = generate_text(size, keywords, rng)
+                batch_size = max(1, min(MAX_BATCH_SIZE, BATCH_CHARS // size))
+                batch = [generate_text(size, keywords, rng) for _ in range(batch_size)]
+
+                single = measure_check_text(engine, text, args.min_time, args.min_runs)
+                batched = measure_check_texts(engine, batch, args.min_time, args.min_runs)
+                print(
+                    f"  文本 {size} 字: p50 {single['p50_us']}us, p99 {single['p99_us']}us, "
+                    f"单条 {single['mb_per_second']}MB/s, 批量 {batched['mb_per_second']}MB/s"
+                )
+                scans.append({"text_chars": size, "check_text": single, "check_texts": batched})
+
+            results.append({"rules": rule_count, "build": build, "scans": scans})
+            del engine
+            gc.collect()
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "min_time": args.min_time,
+            "rules_config": str(args.rules)
+        },
+        "results": results
+    }
+
+
+def git_commit() -> Optional[str]:
+    """当前提交（不在 git 仓库中时返回 None）"""
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=str(Path(__file__).parent.parent)
+        )
+        return output.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: Dict, baseline: Dict) -> None:
+    """打印与基线结果的对比（比值 > 1 表示变慢）"""
+    baseline_cells = {}
+    for item in baseline.get("results", []):
+        baseline_cells[(item["rules"], None)] = item["build"]
+        for scan in item["scans"]:
+            baseline_cells[(item["rules"], scan["text_chars"])] = scan
+
+    print("=" * 60)
+    print(f"对比基线: {baseline.get('meta', {}).get('commit')} -> {report['meta']['commit']}")
+    print("=" * 60)
+    for item in report["results"]:
+        build = baseline_cells.get((item["rules"], None))
+        if build and build["build_seconds"]:
+            ratio = item["build"]["build_seconds"] / build["build_seconds"]
+            print(f"规则数 {item['rules']}: 编译耗时 x{ratio:.2f}")
+        for scan in item["scans"]:
+            old = baseline_cells.get((item["rules"], scan["text_chars"]))
+            if not old:
+                continue
+            p99 = scan["check_text"]["p99_us"] / max(old["check_text"]["p99_us"], 1e-9)
+            batch = old["check_texts"]["mb_per_second"] / max(scan["check_texts"]["mb_per_second"], 1e-9)
+            print(f"  文本 {scan['text_chars']} 字: p99 延迟 x{p99:.2f}, 批量耗时 x{batch:.2f}")
+
+
+def main() -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="规则引擎基准测试")
+    parser.add_argument("--rules", default="config/rules.yaml", help="提供白名单和其他配置的规则文件")
+    parser.add_argument("--rule-counts", type=int, nargs="+", help="规则条数")
+    parser.add_argument("--text-sizes", type=int, nargs="+", help="文本长度（字符数）")
+    parser.add_argument("--quick", action="store_true", help="使用小矩阵快速运行")
+    parser.add_argument("--min-time", type=float, default=1.0, help="每项测量的最短时间（秒）")
+    parser.add_argument("--min-runs", type=int, default=5, help="每项测量的最少次数")
+    parser.add_argument("--seed", type=int, default=20240101, help="随机种子")
+    parser.add_argument("--output", help="结果 JSON 文件")
+    parser.add_argument("--compare", help="对比的基线结果 JSON 文件")
+    args = parser.parse_args()
+
+    if args.rule_counts is None:
+        args.rule_counts = QUICK_RULE_COUNTS if args.quick else DEFAULT_RULE_COUNTS
+    if args.text_sizes is None:
+        args.text_sizes = QUICK_TEXT_SIZES if args.quick else DEFAULT_TEXT_SIZES
+    if args.quick:
+        args.min_time = min(args.min_time, 0.2)
+
+    report = run(args)
+
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(
+            json.dumps(report, ensure_ascii=False, indent=2, sort_keys=True) + "\n",
+            encoding="utf-8"
+        )
+        print(f"结果已写入: {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(report, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""候选规则影响面评估脚本
+
+    # 从历史审核文本（JSONL，每行含 id 和 text/content 字段）构建索引
+    python scripts/rule_impact.py build --corpus data/history.jsonl
+
+    # 评估候选正则会命中多少历史文本
+    python scripts/rule_impact.py preview --pattern "(特效|神效)药"
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.corpus_index import DEFAULT_NGRAM, DEFAULT_PREVIEW_SAMPLES, CorpusIndex, read_corpus
+from services.rule_engine import RuleEngine
+
+
+DEFAULT_INDEX_PATH = "data/corpus_index.pkl"
+
+
+def build(args) -> int:
+    """构建语料索引"""
+    engine = RuleEngine(args.rules)
+    index = CorpusIndex(ngram=args.ngram, normalizer=engine.ruleset.normalizer)
+
+    start = time.perf_counter()
+    count = index.add_many(read_corpus(args.corpus))
+    index.save(args.index)
+
+    stats = index.get_statistics()
+    print(f"已索引文本数: {count}")
+    print(f"n-gram 数: {stats['grams']}")
+    print(f"倒排条目数: {stats['postings']}")
+    print(f"耗时: {time.perf_counter() - start:.2f}s")
+    print(f"索引文件: {args.index}")
+    return 0
+
+
+def preview(args) -> int:
+    """评估候选规则"""
+    engine = RuleEngine(args.rules)
+    index = CorpusIndex.load(args.index)
+
+    try:
+        result = index.preview(args.pattern, engine.ruleset, max_samples=args.samples)
+    except Exception as e:
+        print(f"候选规则无法使用: {e}")
+        return 1
+
+    print("=" * 60)
+    print(f"候选规则: {result['pattern']}")
+    print(f"必需字面量: {', '.join(result['literals']) or '无（全量扫描）'}")
+    if result["rewritten"]:
+        print("注意: 无界通配已按 regex_guard.max_gap 改写为有界窗口")
+    print(f"候选文本: {result['candidates']} / {result['total_documents']}")
+    if result["fuzzy"]:
+        print("注意: 已启用干扰字符/同音字/拼音容忍匹配，其余文本也做了容忍扫描")
+    print(f"命中文本: {result['hits']} ({result['hit_rate']:.2%})")
+    print(f"耗时: {result['elapsed_ms']}ms")
+    print("=" * 60)
+    for sample in result["samples"]:
+        print(f"[{sample['doc_id']}] {sample['match']} | ...{sample['context']}...")
+    return 0
+
+
+def main() -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="评估候选规则在历史语料上的命中情况")
+    parser.add_argument("--rules", default="config/rules.yaml", help="规则配置文件")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="语料索引文件")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="构建语料索引")
+    build_parser.add_argument("--corpus", required=True, help="JSONL 格式的历史语料")
+    build_parser.add_argument("--ngram", type=int, default=DEFAULT_NGRAM, help="最长索引子串长度")
+    build_parser.set_defaults(handler=build)
+
+    preview_parser = subparsers.add_parser("preview", help="评估候选规则")
+    preview_parser.add_argument("--pattern", required=True, help="候选规则正则")
+    preview_parser.add_argument("--samples", type=int, default=DEFAULT_PREVIEW_SAMPLES, help="样例数")
+    preview_parser.set_defaults(handler=preview)
+
+    args = parser.parse_args()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
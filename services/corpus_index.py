@@ -0,0 +1,290 @@
+"""历史审核语料索引（评估候选规则的影响面）"""
+import json
+import os
+import pickle
+import tempfile
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from services.rule_engine import CompiledRuleSet
+from utils.text_normalizer import TextNormalizer, map_span
+
+
+# 默认 n-gram 长度（中文按字切分，二元组区分度已足够）
+DEFAULT_NGRAM = 2
+
+# 预览结果中默认返回的样例数
+DEFAULT_PREVIEW_SAMPLES = 10
+
+# 样例中命中位置两侧保留的上下文字符数
+SAMPLE_CONTEXT = 20
+
+
+class CorpusIndex:
+    """历史文本的 n-gram 倒排索引
+
+    文本按规则引擎的归一化方式处理后，索引长度为 1 到 ``ngram`` 的所有子串，
+    每个子串对应一个递增的文档序号数组（``array('I')``）。评估候选规则时，
+    先用正则的必需字面量求出候选文档（字面量的各个 n-gram 倒排求交集，
+    多个字面量取并集），只在候选文档上执行正则确认。
+    无法提取必需字面量的正则退化为全量扫描。插入干扰字符、同音字和拼音写法的
+    命中不含字面量的 n-gram，候选规则启用了这些匹配时其余文档还要做一遍容忍扫描。
+    """
+
+    def __init__(self, ngram: int = DEFAULT_NGRAM, normalizer: Optional[TextNormalizer] = None):
+        """初始化空索引
+
+        Args:
+            ngram: 最长的索引子串长度
+            normalizer: 文本归一化器，应与规则引擎一致；为 None 时不归一化
+        """
+        self.ngram = max(int(ngram), 1)
+        self.normalizer = normalizer
+        self.doc_ids: List[str] = []
+        self.texts: List[str] = []
+        self.postings: Dict[str, array] = {}
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def _normalize(self, text: str) -> tuple:
+        """归一化文本，返回 (归一化文本, 偏移表)"""
+        if self.normalizer is None:
+            return text, None
+        return self.normalizer.normalize(text)
+
+    def add(self, doc_id: str, text: str) -> None:
+        """添加一条文本
+
+        Args:
+            doc_id: 文档ID（如审核任务ID）
+            text: 原始文本
+        """
+        index = len(self.texts)
+        self.doc_ids.append(str(doc_id))
+        self.texts.append(text)
+
+        normalized, _ = self._normalize(text)
+        grams = set()
+        for size in range(1, self.ngram + 1):
+            grams.update(normalized[i:i + size] for i in range(len(normalized) - size + 1))
+        for gram in grams:
+            posting = self.postings.get(gram)
+            if posting is None:
+                posting = self.postings[gram] = array("I")
+            posting.append(index)
+
+    def add_many(self, items: Iterable[Tuple[str, str]]) -> int:
+        """批量添加文本
+
+        Args:
+            items: (文档ID, 原始文本) 序列
+
+        Returns:
+            int: 添加的文本数
+        """
+        count = 0
+        for doc_id, text in items:
+            self.add(doc_id, text)
+            count += 1
+        return count
+
+    def candidates(self, literal: str) -> Optional[set]:
+        """可能包含某个（已归一化的）字面量的文档
+
+        Args:
+            literal: 字面量
+
+        Returns:
+            Optional[set]: 文档序号集合，空字面量返回 None（无法剪枝）
+        """
+        if not literal:
+            return None
+        size = min(len(literal), self.ngram)
+        grams = {literal[i:i + size] for i in range(len(literal) - size + 1)}
+        postings = sorted((self.postings.get(gram, ()) for gram in grams), key=len)
+        result = set(postings[0])
+        for posting in postings[1:]:
+            if not result:
+                break
+            result.intersection_update(posting)
+        return result
+
+    def candidates_for(self, literals: Optional[FrozenSet[str]]) -> Optional[List[int]]:
+        """满足必需字面量条件的候选文档
+
+        Args:
+            literals: 必需字面量（命中必然包含其中之一），为 None 时无法剪枝
+
+        Returns:
+            Optional[List[int]]: 递增的文档序号，无法剪枝时返回 None
+        """
+        if not literals:
+            return None
+        result = set()
+        for literal in literals:
+            docs = self.candidates(literal)
+            if docs is None:
+                return None
+            result.update(docs)
+        return sorted(result)
+
+    def preview(
+        self,
+        pattern: str,
+        ruleset: CompiledRuleSet,
+        max_samples: int = DEFAULT_PREVIEW_SAMPLES
+    ) -> Dict:
+        """评估候选规则在历史语料上的命中情况
+
+        候选规则按当前规则集的配置单独编译为一个规则集（归一化、复杂度检查、
+        通配改写、干扰字符容忍、同音字/拼音变体），候选文本先做白名单掩码再确认，
+        与规则引擎的检测结果一致。
+
+        Args:
+            pattern: 候选规则的正则
+            ruleset: 当前规则快照（提供归一化、白名单和规则配置）
+            max_samples: 返回的命中样例数
+
+        Returns:
+            Dict: 命中文档数、候选文档数、是否剪枝、是否容忍扫描、耗时和命中样例
+
+        Raises:
+            ValueError: 正则存在灾难性回溯风险
+            re.error: 正则无法编译
+        """
+        start = time.perf_counter()
+        compiled, literals, rewritten = ruleset.compile_pattern(pattern)
+        probe = CompiledRuleSet(
+            {"candidate": [{"pattern": pattern}]},
+            ruleset.whitelist,
+            **ruleset.layers[0].config
+        )
+        fuzzy = bool(probe.noise_automaton or probe.variant_automaton or probe.spelling_automaton)
+
+        docs = self.candidates_for(literals)
+        pruned = docs is not None
+        if docs is None:
+            docs = range(len(self.texts))
+        confirmed = set(docs) if pruned else None
+
+        hits = 0
+        samples = []
+        for index in range(len(self.texts)) if fuzzy else docs:
+            text = self.texts[index]
+            normalized, offsets = probe.normalize(text)
+            masked = probe.mask_whitelist(normalized)
+            restored, _ = probe.scan_variants(masked)
+
+            # 不在候选中的文档只有还原了同音字才可能被正则命中
+            span = None
+            if confirmed is None or index in confirmed or restored is not masked:
+                match = compiled.search(restored)
+                if match is not None:
+                    span = match.span()
+            if span is None:
+                obfuscations = probe.scan_obfuscations(restored)
+                if obfuscations:
+                    span = min((hit_start, hit_end) for _, hit_start, hit_end, _ in obfuscations)
+            if span is None:
+                continue
+
+            hits += 1
+            if len(samples) < max_samples:
+                match_start, match_end = map_span(offsets, span[0], span[1], len(text))
+                samples.append({
+                    "doc_id": self.doc_ids[index],
+                    "match": text[match_start:match_end],
+                    "start": match_start,
+                    "end": match_end,
+                    "context": text[max(match_start - SAMPLE_CONTEXT, 0):match_end + SAMPLE_CONTEXT]
+                })
+
+        return {
+            "pattern": pattern,
+            "total_documents": len(self.texts),
+            "candidates": len(docs),
+            "pruned": pruned,
+            "fuzzy": fuzzy,
+            "literals": sorted(literals) if literals else [],
+            "rewritten": rewritten,
+            "hits": hits,
+            "hit_rate": hits / len(self.texts) if self.texts else 0.0,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+            "samples": samples
+        }
+
+    def get_statistics(self) -> Dict:
+        """获取索引统计信息
+
+        Returns:
+            Dict: 统计信息
+        """
+        return {
+            "total_documents": len(self.texts),
+            "ngram": self.ngram,
+            "grams": len(self.postings),
+            "postings": sum(len(posting) for posting in self.postings.values())
+        }
+
+    def save(self, path: str) -> None:
+        """保存索引（先写临时文件再原子替换）
+
+        Args:
+            path: 索引文件路径
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> "CorpusIndex":
+        """加载索引
+
+        Args:
+            path: 索引文件路径
+
+        Returns:
+            CorpusIndex: 索引
+        """
+        with open(path, "rb") as f:
+            index = pickle.load(f)
+        if not isinstance(index, cls):
+            raise ValueError(f"不是语料索引文件: {path}")
+        return index
+
+
+def read_corpus(path: str) -> Iterable[Tuple[str, str]]:
+    """读取 JSONL 格式的历史语料
+
+    每行一个 JSON 对象，文本取 ``text`` 或 ``content`` 字段，
+    ID 取 ``id`` 或 ``task_id`` 字段（缺省时使用行号）。
+
+    Args:
+        path: 语料文件路径
+
+    Yields:
+        Tuple[str, str]: (文档ID, 文本)
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"语料行解析失败: {path}:{line_no}, 错误: {e}")
+                continue
+            text = item.get("text") or item.get("content") or ""
+            doc_id = item.get("id") or item.get("task_id") or line_no
+            yield str(doc_id), text
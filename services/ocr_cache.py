@@ -0,0 +1,204 @@
+"""OCR结果缓存（按图片哈希复用重复图片的识别结果）"""
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from utils.image_hash import HammingIndex
+
+
+# 默认最多缓存的图片数
+DEFAULT_CACHE_ENTRIES = 10000
+
+# 默认缓存有效期（秒）
+DEFAULT_CACHE_TTL = 7 * 24 * 3600
+
+# 默认汉明半径：只精确匹配。同一模板叠加不同文字的图片 dHash 距离可能只有 0~2，
+# 按近似图片复用识别文本会让违规文字沿用正常图片的结果
+DEFAULT_HASH_RADIUS = 0
+
+
+class OCRCache:
+    """以图片哈希为键的OCR结果缓存
+
+    查找时先按哈希精确匹配，半径大于 0 时再在汉明半径内找最近的已缓存图片
+    （多索引哈希，键为 dHash），重新编码、缩放后的同一张素材可以直接复用识别文本。
+    半径为 0 时键为像素内容哈希（见 ``hash_kind``）。
+    按最近使用顺序淘汰超出容量的条目，超过有效期的条目在访问时删除。
+    指定 ``path`` 时同时写入 SQLite 文件，重启后恢复未过期的条目。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_CACHE_ENTRIES,
+        ttl: Optional[float] = DEFAULT_CACHE_TTL,
+        radius: int = DEFAULT_HASH_RADIUS,
+        path: Optional[str] = None
+    ):
+        """初始化缓存
+
+        Args:
+            max_entries: 最多缓存的图片数
+            ttl: 有效期（秒），为 None 或 0 时不过期
+            radius: 视为同一张图片的最大汉明距离，0 表示只精确匹配
+            path: SQLite 缓存文件路径，为 None 时只缓存在内存中
+        """
+        self.max_entries = max(int(max_entries), 1)
+        self.ttl = ttl or None
+        self.radius = radius
+        # 键的类型：像素内容哈希只能精确匹配，近似匹配使用 dHash
+        self.hash_kind = "dhash" if radius > 0 else "pixel"
+        self.path = Path(path) if path else None
+
+        # 哈希 -> (识别文本, 写入时间)，按最近使用排序
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._index = HammingIndex(radius)
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        if self.path is not None:
+            self._open_store()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _open_store(self) -> None:
+        """打开磁盘缓存并加载未过期的条目（最近写入的优先）
+
+        只加载与当前哈希类型一致的条目；调整半径后，另一种哈希的条目不会被当作
+        当前类型的哈希参与匹配。
+        """
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_cache ("
+                "image_hash TEXT PRIMARY KEY, text TEXT NOT NULL, created_at REAL NOT NULL, "
+                "hash_kind TEXT NOT NULL DEFAULT 'dhash')"
+            )
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(ocr_cache)")}
+            if "hash_kind" not in columns:
+                # 旧版本的缓存文件只有 dHash
+                self._db.execute("ALTER TABLE ocr_cache ADD COLUMN hash_kind TEXT NOT NULL DEFAULT 'dhash'")
+            if self.ttl is not None:
+                self._db.execute("DELETE FROM ocr_cache WHERE created_at < ?", (time.time() - self.ttl,))
+            self._db.commit()
+            rows = self._db.execute(
+                "SELECT image_hash, text, created_at FROM ocr_cache WHERE hash_kind = ? "
+                "ORDER BY created_at DESC LIMIT ?",
+                (self.hash_kind, self.max_entries)
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"OCR缓存文件打开失败: {self.path}, 错误: {e}")
+            self._db = None
+            return
+
+        for image_hash, text, created_at in reversed(rows):
+            value = int(image_hash, 16)
+            self._entries[value] = (text, created_at)
+            self._index.add(value)
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def _delete(self, value: int) -> None:
+        """删除条目（调用方持有锁）"""
+        del self._entries[value]
+        self._index.remove(value)
+        if self._db is not None:
+            try:
+                self._db.execute("DELETE FROM ocr_cache WHERE image_hash = ?", (f"{value:016x}",))
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"OCR缓存删除失败: {e}")
+
+    def get(self, image_hash: int) -> Optional[str]:
+        """查找相同或近似图片的识别文本
+
+        Args:
+            image_hash: 图片哈希（类型见 ``hash_kind``）
+
+        Returns:
+            Optional[str]: 识别文本，未命中时返回 None
+        """
+        now = time.time()
+        with self._lock:
+            found = self._index.nearest(image_hash)
+            while found is not None and self._expired(self._entries[found[0]][1], now):
+                self._delete(found[0])
+                self.expirations += 1
+                found = self._index.nearest(image_hash)
+            if found is None:
+                self.misses += 1
+                return None
+
+            value, distance = found
+            self._entries.move_to_end(value)
+            if distance == 0:
+                self.hits += 1
+            else:
+                self.near_hits += 1
+            return self._entries[value][0]
+
+    def put(self, image_hash: int, text: str) -> None:
+        """写入识别文本，超出容量时淘汰最久未使用的条目
+
+        Args:
+            image_hash: 图片哈希（类型见 ``hash_kind``）
+            text: 识别文本
+        """
+        now = time.time()
+        with self._lock:
+            self._entries[image_hash] = (text, now)
+            self._entries.move_to_end(image_hash)
+            self._index.add(image_hash)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO ocr_cache (image_hash, text, created_at, hash_kind) "
+                        "VALUES (?, ?, ?, ?)",
+                        (f"{image_hash:016x}", text, now, self.hash_kind)
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"OCR缓存写入失败: {e}")
+            while len(self._entries) > self.max_entries:
+                self._delete(next(iter(self._entries)))
+                self.evictions += 1
+
+    def close(self) -> None:
+        """关闭磁盘缓存"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def get_statistics(self) -> Dict:
+        """获取缓存统计信息
+
+        Returns:
+            Dict: 统计信息
+        """
+        lookups = self.hits + self.near_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "radius": self.radius,
+            "hash_kind": self.hash_kind,
+            "persistent": self._db is not None,
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.near_hits) / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
@@ -1,10 +1,54 @@
 """OCR服务"""
 import asyncio
-from typing import List, Dict, Optional
+import importlib.util
+import multiprocessing
+import os
+import shutil
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Optional, Tuple, Union
 from dataclasses import dataclass
 from pathlib import Path
 import hashlib
 
+from services.ocr_cache import OCRCache
+from utils.image_hash import dhash, pixel_hash
+from utils.image_preprocess import DEFAULT_MAX_SIDE, ImageSource, PreprocessedImage, decode_gray, preprocess_gray
+
+# 识别引擎的输入：图片路径，或预处理后的图片
+ImageInput = Union[str, PreprocessedImage]
+
+
+# PaddleOCR 的执行方式：process 在独立进程中加载模型（CPU 密集，不占用事件循环所在进程的 GIL），
+# thread 在本进程加载模型，由单个后台线程执行（模型实例不是线程安全的）
+PADDLE_EXECUTORS = ("process", "thread")
+
+# Tesseract 的执行方式：thread 在线程池中调用 pytesseract，
+# subprocess 直接以异步子进程调用 tesseract 命令行
+TESSERACT_EXECUTORS = ("thread", "subprocess")
+
+# 默认并发上限（与 settings.max_workers 默认值一致）
+DEFAULT_OCR_WORKERS = 4
+
+# 多引擎识别模式：all 等待全部引擎后取置信度最高的结果；race 本地引擎同时启动，
+# 第一个达到置信度阈值的结果胜出并取消其余引擎；cascade 按成本顺序逐个执行，达到阈值即停止。
+# race/cascade 下兜底引擎（付费的云OCR）只在其余引擎都未达到阈值时才调用
+OCR_MODES = ("all", "race", "cascade")
+
+# 引擎按成本从低到高的顺序，以及只在兜底时调用的引擎
+ENGINE_ORDER = ("paddle", "tesseract", "cloud")
+FALLBACK_ENGINES = frozenset({"cloud"})
+
+# 竞速模式的默认置信度阈值（Tesseract 不提供置信度，固定的 0.8 不足以直接胜出）
+DEFAULT_RACE_CONFIDENCE = 0.85
+
+# Tesseract 识别语言
+TESSERACT_LANG = "chi_sim+eng"
+
+# PaddleOCR 工作进程内的模型实例
+_paddle_worker = None
+
 
 @dataclass
 class OCRResult:
@@ -14,42 +58,192 @@ class OCRResult:
     engine: str
 
 
+def _create_paddle_ocr():
+    """加载 PaddleOCR 模型"""
+    from paddleocr import PaddleOCR
+    return PaddleOCR(use_angle_cls=True, lang="ch", show_log=False)
+
+
+def _parse_paddle_result(result) -> List[tuple]:
+    """把 PaddleOCR 的识别结果整理为 [(文本, 置信度)]（可跨进程返回）"""
+    if not result or not result[0]:
+        return []
+    return [(line[1][0], line[1][1]) for line in result[0]]
+
+
+def _init_paddle_worker() -> None:
+    """PaddleOCR 工作进程初始化：每个进程加载一次模型"""
+    global _paddle_worker
+    _paddle_worker = _create_paddle_ocr()
+
+
+def _paddle_worker_ocr(image) -> List[tuple]:
+    """在 PaddleOCR 工作进程中识别图片（图片路径或灰度数组）"""
+    return _parse_paddle_result(_paddle_worker.ocr(image, cls=True))
+
+
+def _tesseract_image_to_string(tesseract, image: "ImageInput") -> str:
+    """调用 pytesseract 识别图片（在线程池中执行，解码后的图片按需使用二值化结果）"""
+    if isinstance(image, PreprocessedImage):
+        return tesseract.image_to_string(image.to_pil(binary=True), lang=TESSERACT_LANG)
+    from PIL import Image
+    with Image.open(image) as opened:
+        return tesseract.image_to_string(opened, lang=TESSERACT_LANG)
+
+
 class OCRService:
-    """OCR服务（多引擎并行）"""
+    """OCR服务（多引擎并行）
+
+    阻塞的识别调用放在专用执行器中运行，不占用事件循环：
+    PaddleOCR 默认使用进程池，Tesseract 默认使用线程池（也可直接以子进程调用）。
+    执行器在第一次识别时才创建。
+    """
+
+    def __init__(
+        self,
+        paddle_executor: str = "process",
+        tesseract_executor: str = "thread",
+        max_workers: int = DEFAULT_OCR_WORKERS,
+        mode: str = "all",
+        confidence_threshold: float = DEFAULT_RACE_CONFIDENCE,
+        cache: Optional[OCRCache] = None,
+        preprocess: bool = True,
+        max_side: int = DEFAULT_MAX_SIDE
+    ):
+        """初始化OCR服务
+
+        Args:
+            paddle_executor: PaddleOCR 执行方式（process、thread）
+            tesseract_executor: Tesseract 执行方式（thread、subprocess）
+            max_workers: 每个引擎的并发上限；PaddleOCR 进程数不超过 CPU 核数
+            mode: 多引擎识别模式（all、race、cascade）
+            confidence_threshold: race/cascade 模式下结果直接采用的置信度阈值
+            cache: 按图片哈希复用识别结果的缓存，为 None 时不缓存
+            preprocess: 识别前是否做图像预处理（缩小、灰度化、倾斜校正、二值化）
+            max_side: 预处理后图片长边的上限
+        """
+        if mode not in OCR_MODES:
+            raise ValueError(f"不支持的OCR识别模式: {mode}")
+        if paddle_executor not in PADDLE_EXECUTORS:
+            raise ValueError(f"不支持的PaddleOCR执行方式: {paddle_executor}")
+        if tesseract_executor not in TESSERACT_EXECUTORS:
+            raise ValueError(f"不支持的Tesseract执行方式: {tesseract_executor}")
 
-    def __init__(self):
-        """初始化OCR服务"""
         self.paddle_available = False
         self.tesseract_available = False
         self.cloud_available = False
-        
+
+        self.mode = mode
+        self.cache = cache
+        self.preprocess = preprocess
+        self.max_side = max_side
+        self.confidence_threshold = confidence_threshold
+        self.paddle_executor = paddle_executor
+        self.tesseract_executor = tesseract_executor
+        self.max_workers = max(int(max_workers), 1)
+        if paddle_executor == "process":
+            self.paddle_workers = max(1, min(self.max_workers, os.cpu_count() or 1))
+        else:
+            self.paddle_workers = 1
+        self.tesseract_workers = self.max_workers
+        self.tesseract_cmd = "tesseract"
+
+        self._paddle_pool: Optional[Executor] = None
+        self._tesseract_pool: Optional[Executor] = None
+        # 子进程方式的并发信号量（与创建它的事件循环绑定）
+        self._tesseract_slots: Optional[tuple] = None
+        self._pool_lock = threading.Lock()
+
+        # 竞速统计：各引擎胜出次数、被取消的识别数、调用兜底引擎的次数
+        self.race_wins: Dict[str, int] = {engine: 0 for engine in ENGINE_ORDER}
+        self.race_cancelled = 0
+        self.race_fallbacks = 0
+
         self._init_engines()
 
     def _init_engines(self):
         """初始化OCR引擎"""
-        # 尝试初始化PaddleOCR
-        try:
-            from paddleocr import PaddleOCR
-            self.paddle_ocr = PaddleOCR(use_angle_cls=True, lang="ch", show_log=False)
-            self.paddle_available = True
-        except Exception as e:
-            print(f"PaddleOCR初始化失败: {e}")
-            self.paddle_ocr = None
+        # 尝试初始化PaddleOCR（进程池方式只检查是否安装，模型在工作进程中加载）
+        self.paddle_ocr = None
+        if self.paddle_executor == "process":
+            if importlib.util.find_spec("paddleocr") is not None:
+                self.paddle_available = True
+            else:
+                print("PaddleOCR初始化失败: 未安装 paddleocr")
+        else:
+            try:
+                self.paddle_ocr = _create_paddle_ocr()
+                self.paddle_available = True
+            except Exception as e:
+                print(f"PaddleOCR初始化失败: {e}")
 
         # 尝试初始化Tesseract
-        try:
-            import pytesseract
-            self.tesseract = pytesseract
-            self.tesseract_available = True
-        except Exception as e:
-            print(f"Tesseract初始化失败: {e}")
-            self.tesseract = None
+        self.tesseract = None
+        if self.tesseract_executor == "subprocess":
+            if shutil.which(self.tesseract_cmd):
+                self.tesseract_available = True
+            else:
+                print(f"Tesseract初始化失败: 找不到命令 {self.tesseract_cmd}")
+        else:
+            try:
+                import pytesseract
+                self.tesseract = pytesseract
+                self.tesseract_available = True
+            except Exception as e:
+                print(f"Tesseract初始化失败: {e}")
+
+    def _get_paddle_pool(self) -> Executor:
+        """PaddleOCR 执行器（首次使用时创建）"""
+        with self._pool_lock:
+            if self._paddle_pool is None:
+                if self.paddle_executor == "process":
+                    # spawn 启动：避免 fork 复制事件循环和其他线程持有的锁
+                    self._paddle_pool = ProcessPoolExecutor(
+                        max_workers=self.paddle_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_paddle_worker
+                    )
+                else:
+                    self._paddle_pool = ThreadPoolExecutor(
+                        max_workers=1, thread_name_prefix="ocr-paddle"
+                    )
+            return self._paddle_pool
 
-    async def paddle_ocr_extract(self, image_path: str) -> OCRResult:
+    def _get_tesseract_pool(self) -> Executor:
+        """Tesseract 线程池（首次使用时创建）"""
+        with self._pool_lock:
+            if self._tesseract_pool is None:
+                self._tesseract_pool = ThreadPoolExecutor(
+                    max_workers=self.tesseract_workers, thread_name_prefix="ocr-tesseract"
+                )
+            return self._tesseract_pool
+
+    def _get_tesseract_slots(self) -> asyncio.Semaphore:
+        """子进程方式的并发信号量（按当前事件循环创建）"""
+        loop = asyncio.get_running_loop()
+        if self._tesseract_slots is None or self._tesseract_slots[0] is not loop:
+            self._tesseract_slots = (loop, asyncio.Semaphore(self.tesseract_workers))
+        return self._tesseract_slots[1]
+
+    def shutdown(self, wait: bool = True) -> None:
+        """关闭OCR执行器
+
+        Args:
+            wait: 是否等待正在执行的识别完成
+        """
+        with self._pool_lock:
+            pools = [self._paddle_pool, self._tesseract_pool]
+            self._paddle_pool = None
+            self._tesseract_pool = None
+        for pool in pools:
+            if pool is not None:
+                pool.shutdown(wait=wait)
+
+    async def paddle_ocr_extract(self, image: ImageInput) -> OCRResult:
         """使用PaddleOCR提取文本
         
         Args:
-            image_path: 图片路径
+            image: 图片路径，或解码后的图片（直接传入灰度数组，检测模型不需要二值化）
             
         Returns:
             OCRResult: 识别结果
@@ -57,21 +251,23 @@ class OCRService:
         if not self.paddle_available:
             return OCRResult(text="", confidence=0.0, engine="paddle")
 
+        source = image.gray if isinstance(image, PreprocessedImage) else image
         try:
-            result = self.paddle_ocr.ocr(image_path, cls=True)
-            
-            if not result or not result[0]:
+            loop = asyncio.get_running_loop()
+            if self.paddle_executor == "process":
+                lines = await loop.run_in_executor(self._get_paddle_pool(), _paddle_worker_ocr, source)
+            else:
+                lines = await loop.run_in_executor(
+                    self._get_paddle_pool(),
+                    lambda: _parse_paddle_result(self.paddle_ocr.ocr(source, cls=True))
+                )
+
+            if not lines:
                 return OCRResult(text="", confidence=0.0, engine="paddle")
-            
-            texts = []
-            confidences = []
-            
-            for line in result[0]:
-                text = line[1][0]
-                conf = line[1][1]
-                texts.append(text)
-                confidences.append(conf)
-            
+
+            texts = [text for text, _ in lines]
+            confidences = [conf for _, conf in lines]
+
             merged_text = " ".join(texts)
             avg_confidence = sum(confidences) / len(confidences) if confidences else 0.0
             
@@ -80,15 +276,21 @@ class OCRService:
                 confidence=avg_confidence,
                 engine="paddle"
             )
+        except BrokenProcessPool as e:
+            # 工作进程无法加载模型或异常退出，停用该引擎
+            print(f"PaddleOCR工作进程异常，已停用: {e}")
+            self.paddle_available = False
+            self.shutdown(wait=False)
+            return OCRResult(text="", confidence=0.0, engine="paddle")
         except Exception as e:
             print(f"PaddleOCR识别失败: {e}")
             return OCRResult(text="", confidence=0.0, engine="paddle")
 
-    async def tesseract_ocr_extract(self, image_path: str) -> OCRResult:
+    async def tesseract_ocr_extract(self, image: ImageInput) -> OCRResult:
         """使用Tesseract提取文本
         
         Args:
-            image_path: 图片路径
+            image: 图片路径，或解码后的图片（预处理时使用二值化结果）
             
         Returns:
             OCRResult: 识别结果
@@ -97,10 +299,14 @@ class OCRService:
             return OCRResult(text="", confidence=0.0, engine="tesseract")
 
         try:
-            from PIL import Image
-            image = Image.open(image_path)
-            text = self.tesseract.image_to_string(image, lang="chi_sim+eng")
-            
+            if self.tesseract_executor == "subprocess":
+                text = await self._tesseract_subprocess(image)
+            else:
+                loop = asyncio.get_running_loop()
+                text = await loop.run_in_executor(
+                    self._get_tesseract_pool(), _tesseract_image_to_string, self.tesseract, image
+                )
+
             # Tesseract不直接提供置信度，使用固定值
             return OCRResult(
                 text=text.strip(),
@@ -111,11 +317,45 @@ class OCRService:
             print(f"Tesseract识别失败: {e}")
             return OCRResult(text="", confidence=0.0, engine="tesseract")
 
-    async def cloud_ocr_extract(self, image_path: str) -> OCRResult:
+    async def _tesseract_subprocess(self, image: ImageInput) -> str:
+        """以异步子进程调用 tesseract 命令行
+
+        Args:
+            image: 图片路径，或解码后的图片（编码为 PNG 后从标准输入传入）
+
+        Returns:
+            str: 识别文本
+        """
+        data = None
+        source = image
+        if isinstance(image, PreprocessedImage):
+            loop = asyncio.get_running_loop()
+            data = await loop.run_in_executor(self._get_tesseract_pool(), image.to_png, True)
+            source = "stdin"
+
+        async with self._get_tesseract_slots():
+            process = await asyncio.create_subprocess_exec(
+                self.tesseract_cmd, source, "stdout", "-l", TESSERACT_LANG,
+                stdin=asyncio.subprocess.PIPE if data is not None else None,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            try:
+                stdout, stderr = await process.communicate(data)
+            except asyncio.CancelledError:
+                # 竞速中被取消时结束子进程，释放并发名额
+                process.kill()
+                await process.wait()
+                raise
+        if process.returncode != 0:
+            raise RuntimeError(stderr.decode("utf-8", errors="ignore").strip())
+        return stdout.decode("utf-8", errors="ignore")
+
+    async def cloud_ocr_extract(self, image: ImageInput) -> OCRResult:
         """使用云OCR提取文本
         
         Args:
-            image_path: 图片路径
+            image: 图片路径，或解码后的图片
             
         Returns:
             OCRResult: 识别结果
@@ -146,44 +386,197 @@ class OCRService:
         best_result = max(valid_results, key=lambda x: x.confidence)
         return best_result.text
 
-    async def extract_text_multi_engine(self, image_path: str) -> str:
-        """使用多引擎并行提取文本
-        
+    async def extract_text_multi_engine(self, image: ImageSource, mode: Optional[str] = None) -> str:
+        """使用多引擎提取文本
+
+        图片只解码一次，得到的只读灰度数组由感知哈希、预处理和各引擎共用；
+        上传内容可以直接以字节传入，无需先写临时文件。
+
         Args:
-            image_path: 图片路径
-            
+            image: 图片路径、图片数据（PNG/JPEG 等字节）或像素数组
+            mode: 识别模式（all、race、cascade），为 None 时使用初始化时的模式
+
         Returns:
             str: 提取的文本
         """
-        # 并行调用多个引擎
-        tasks = [
-            self.paddle_ocr_extract(image_path),
-            self.tesseract_ocr_extract(image_path),
-            self.cloud_ocr_extract(image_path)
-        ]
-        
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # 过滤异常结果
-        valid_results = [r for r in results if isinstance(r, OCRResult)]
-        
+        mode = mode or self.mode
+        if mode not in OCR_MODES:
+            raise ValueError(f"不支持的OCR识别模式: {mode}")
+
+        loop = asyncio.get_running_loop()
+        decoded, image_hash = await loop.run_in_executor(self._get_tesseract_pool(), self._decode, image)
+        if decoded is None and not isinstance(image, str):
+            return ""
+
+        # 重复上传的素材直接复用之前的识别结果（缓存可能读写 SQLite，不在事件循环中执行）
+        if image_hash is not None:
+            cached = await loop.run_in_executor(None, self.cache.get, image_hash)
+            if cached is not None:
+                return cached
+
+        # 倾斜校正一次，各引擎共用（大图缩小后识别耗时大幅下降）；
+        # 图片路径无法解码时交给各引擎自行读取
+        if decoded is not None and self.preprocess:
+            image = await loop.run_in_executor(
+                self._get_tesseract_pool(), preprocess_gray,
+                decoded.gray, decoded.scale, decoded.original_size
+            )
+        elif decoded is not None:
+            image = decoded
+
+        if mode == "all":
+            # 并行调用多个引擎（识别在各自的执行器中进行，不阻塞事件循环）
+            tasks = [
+                self.paddle_ocr_extract(image),
+                self.tesseract_ocr_extract(image),
+                self.cloud_ocr_extract(image)
+            ]
+
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+
+            # 过滤异常结果
+            valid_results = [r for r in results if isinstance(r, OCRResult)]
+        else:
+            valid_results = await self._extract_until_confident(image, mode)
+
         # 融合结果
         merged_text = self.merge_ocr_results(valid_results)
-        
+
+        # 只缓存识别出文本的结果（空结果可能来自引擎故障）
+        if image_hash is not None and merged_text:
+            await loop.run_in_executor(None, self.cache.put, image_hash, merged_text)
+
         return merged_text
 
-    def preprocess_image(self, image_path: str) -> str:
+    def _decode(self, image: ImageSource) -> Tuple[Optional[PreprocessedImage], Optional[int]]:
+        """解码图片，启用缓存时同时计算图片哈希（在线程池中执行）
+
+        预处理时缩小到长边不超过 ``max_side``，否则保持原尺寸、不做二值化。
+
+        Args:
+            image: 图片路径、图片数据或像素数组
+
+        Returns:
+            Tuple[Optional[PreprocessedImage], Optional[int]]: (解码后的图片, 缓存键)，无法解码时均为 None
+        """
+        try:
+            gray, scale, original_size = decode_gray(image, self.max_side if self.preprocess else None)
+        except Exception as e:
+            name = image if isinstance(image, str) else type(image).__name__
+            print(f"图片解码失败: {name}, 错误: {e}")
+            return None, None
+
+        decoded = PreprocessedImage(
+            gray=gray, scale=scale, angle=0.0, original_size=original_size, binarize=self.preprocess
+        )
+        image_hash = None
+        if self.cache is not None:
+            # 默认按像素内容精确复用；配置了汉明半径时才按 dHash 复用近似图片
+            if self.cache.hash_kind == "dhash":
+                image_hash = dhash(decoded.to_pil())
+            else:
+                image_hash = pixel_hash(decoded.gray)
+        return decoded, image_hash
+
+    def _available_engines(self) -> List[tuple]:
+        """按成本顺序排列的可用引擎 [(引擎名, 识别方法)]"""
+        engines = {
+            "paddle": (self.paddle_available, self.paddle_ocr_extract),
+            "tesseract": (self.tesseract_available, self.tesseract_ocr_extract),
+            "cloud": (self.cloud_available, self.cloud_ocr_extract)
+        }
+        return [(name, engines[name][1]) for name in ENGINE_ORDER if engines[name][0]]
+
+    async def _extract_until_confident(self, image: ImageInput, mode: str) -> List[OCRResult]:
+        """race/cascade 模式：得到达到置信度阈值的结果后立即返回
+
+        Args:
+            image: 图片路径或预处理后的图片
+            mode: race 或 cascade
+
+        Returns:
+            List[OCRResult]: 胜出的结果；没有结果达到阈值时返回全部已得到的结果
+        """
+        engines = self._available_engines()
+        primary = [engine for engine in engines if engine[0] not in FALLBACK_ENGINES]
+        fallback = [engine for engine in engines if engine[0] in FALLBACK_ENGINES]
+
+        results: List[OCRResult] = []
+        for stage in (primary, fallback):
+            if not stage:
+                continue
+            if stage is fallback:
+                self.race_fallbacks += 1
+            if mode == "race":
+                winner = await self._race(image, stage, results)
+            else:
+                winner = None
+                for name, extract in stage:
+                    result = await extract(image)
+                    results.append(result)
+                    if result.confidence >= self.confidence_threshold:
+                        winner = result
+                        break
+            if winner is not None:
+                self.race_wins[winner.engine] = self.race_wins.get(winner.engine, 0) + 1
+                return [winner]
+        return results
+
+    async def _race(self, image: ImageInput, engines: List[tuple], results: List[OCRResult]) -> Optional[OCRResult]:
+        """同时启动多个引擎，第一个达到置信度阈值的结果胜出，其余引擎取消
+
+        Args:
+            image: 图片路径或预处理后的图片
+            engines: [(引擎名, 识别方法)]
+            results: 收集已完成的结果
+
+        Returns:
+            Optional[OCRResult]: 胜出的结果，没有结果达到阈值时返回 None
+        """
+        pending = {asyncio.ensure_future(extract(image)) for _, extract in engines}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = None
+                for task in done:
+                    if task.cancelled() or task.exception() is not None:
+                        continue
+                    result = task.result()
+                    results.append(result)
+                    if result.confidence >= self.confidence_threshold and (
+                        winner is None or result.confidence > winner.confidence
+                    ):
+                        winner = result
+                if winner is not None:
+                    return winner
+            return None
+        finally:
+            # 胜出或调用方取消时，取消仍在执行的引擎（未开始的执行器任务随之撤销）
+            for task in pending:
+                task.cancel()
+            if pending:
+                self.race_cancelled += len(pending)
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    def preprocess_image(self, image: ImageSource) -> Union[ImageInput, ImageSource]:
         """图像预处理
-        
+
+        缩小到长边不超过 ``max_side``、灰度化、倾斜校正，结果保存在内存中；
+        二值化在 Tesseract 使用时才计算。
+
         Args:
-            image_path: 图片路径
-            
+            image: 图片路径、图片数据或像素数组
+
         Returns:
-            str: 预处理后的图片路径
+            预处理后的图片，图片无法解码时返回原输入
         """
-        # 实现图像预处理（灰度化、二值化、去噪等）
-        # 这里简化处理，直接返回原路径
-        return image_path
+        try:
+            gray, scale, original_size = decode_gray(image, self.max_side)
+            return preprocess_gray(gray, scale, original_size)
+        except Exception as e:
+            name = image if isinstance(image, str) else type(image).__name__
+            print(f"图像预处理失败: {name}, 错误: {e}")
+            return image
 
     def get_statistics(self) -> Dict:
         """获取统计信息
@@ -194,5 +587,15 @@ class OCRService:
         return {
             "paddle_available": self.paddle_available,
             "tesseract_available": self.tesseract_available,
-            "cloud_available": self.cloud_available
+            "cloud_available": self.cloud_available,
+            "paddle_executor": self.paddle_executor,
+            "paddle_workers": self.paddle_workers,
+            "tesseract_executor": self.tesseract_executor,
+            "tesseract_workers": self.tesseract_workers,
+            "mode": self.mode,
+            "confidence_threshold": self.confidence_threshold,
+            "race_wins": dict(self.race_wins),
+            "race_cancelled": self.race_cancelled,
+            "race_fallbacks": self.race_fallbacks,
+            "cache": self.cache.get_statistics() if self.cache is not None else None
         }
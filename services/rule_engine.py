@@ -1,177 +1,2674 @@
 """规则引擎服务"""
+import copy
+import gc
+import hashlib
+import heapq
+import os
+import pickle
 import re
+import tempfile
+import itertools
+import json
+import multiprocessing
+import threading
+import time
 import yaml
+from collections import OrderedDict, deque
 from pathlib import Path
-from typing import List, Dict, Optional
+from array import array
+from typing import Iterable, Iterator, List, Dict, Optional
 from dataclasses import dataclass
 from datetime import datetime
 import ahocorasick
 
+from utils.regex_analysis import (
+    bound_wildcards,
+    extract_exact_literals,
+    extract_required_literals,
+    find_redos_risks,
+    max_match_width
+)
+from utils.pinyin_index import PYPINYIN_AVAILABLE, VariantKeyer
+from utils.rule_metrics import DEFAULT_SAMPLE_RATE, RuleMetrics
+from utils.text_normalizer import TextNormalizer, char_class, map_span
+
+
+# 严重程度排序
+SEVERITY_ORDER = {"none": 0, "low": 1, "medium": 2, "high": 3, "critical": 4}
+
+# 白名单命中区间的掩码字符（保持文本长度不变，位置仍对应原文）
+WHITELIST_MASK = "\x00"
+
+# 检测模式：all 收集全部命中；first_critical 命中 critical 规则即停止；any 任一命中即停止
+SCAN_MODES = ("all", "first_critical", "any")
+
+# 短路模式下规则顺序按运行时统计重新排序的间隔（检测文本数）
+RULE_ORDER_REFRESH = 1000
+
+# 没有耗时采样的规则按该耗时估计（纳秒）
+DEFAULT_RULE_COST_NS = 1000
+
+# 批量检测时拼接文本用的分隔符（不能出现在任何关键词或白名单词中）
+BATCH_SEPARATOR = "\x1e"
+
+# 多进程批量扫描每个任务块的文本数，以及每个工作进程最多排队的任务块数
+BULK_CHUNK_SIZE = 256
+BULK_PENDING_PER_WORKER = 2
+
+# 命中片段两侧保留的上下文字符数
+SNIPPET_CONTEXT = 20
+
+# 编译产物格式版本（编译逻辑变化时递增，使旧缓存失效）
+ARTIFACT_VERSION = 17
+
+# 正则安全防护默认配置（rules.yaml 的 regex_guard 可覆盖）
+DEFAULT_REGEX_GUARD = {
+    "max_gap": 64,           # .* / .+ 改写后最多跨越的字符数，0 表示不改写
+    "time_budget_ms": 50,    # 单条正则在单条文本上的时间预算（只在分段之间检查）
+    "segment_size": 4096,    # 超过该长度的文本分段执行正则；不超过的文本不检查预算
+}
+
+# 分段执行时相邻段的重叠长度
+GUARD_SEGMENT_OVERLAP = 256
+
+# 合并正则的规则子集最多缓存的编译结果数
+SUBSET_PATTERN_CACHE = 64
+
+# 关键词间干扰字符容忍默认配置（rules.yaml 的 noise_tolerance 可覆盖）
+DEFAULT_NOISE_TOLERANCE = {
+    "enabled": True,
+    "max_gap": 2,            # 相邻两个关键词字符之间最多允许的干扰字符数
+    "min_length": 3,         # 参与容忍的字面量最短字数（两字词拆开后太常见，容易误报）
+}
+
+# 干扰字符：空白、符号、表情等非文字字符；句读标点视为分隔不算干扰，
+# 白名单掩码和批量分隔符也不能被跳过
+_GAP_NOISE_CHAR = r"(?:(?![,.!?;:，。！？；：、\n\r])[^\w\x00\x1e]|_)"
+_GAP_NOISE_RE = re.compile(_GAP_NOISE_CHAR + "+")
+
+# 拼音拼写只可能出现在含英文字母的文本中
+_ASCII_ALPHA_RE = re.compile(r"[A-Za-z]")
+
+# 租户规则按键覆盖的配置段（覆盖后不能与基础规则共用编译结果）
+RULE_CONFIG_SECTIONS = ("normalization", "regex_guard", "noise_tolerance", "variant_index")
+
+# 同音字/拼音变体索引默认配置（rules.yaml 的 variant_index 可覆盖）
+DEFAULT_VARIANT_INDEX = {
+    "enabled": True,
+    "tone_sensitive": True,       # 同音字是否要求声调相同
+    "min_spelling_length": 6,     # 拼音拼写的最短字母数（过短容易误报）
+    "aliases": {},                # 额外的替换字 -> 标准字（如 V -> 微）
+    "homophones": "",             # 同音替换字候选（与关键词用字同音才生效）
+}
+
+# 大写字母转小写（逐字映射，长度不变）
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+_ASCII_LETTERS = frozenset("abcdefghijklmnopqrstuvwxyz")
+
+# 含有反向引用的正则无法并入合并正则（分组编号会变化）
+_BACKREF_RE = re.compile(r"\\[1-9]|\(\?P=")
+
+
+# 未命中时各扫描步骤返回的共享空结果（避免干净文本每次分配空列表和集合）
+_NO_HITS: tuple = ()
+_NO_RULES: frozenset = frozenset()
+
 
 @dataclass
+class RuleMatch:
+    """单条命中记录（原文中的左闭右开区间）"""
+    __slots__ = ("rule_id", "violation_type", "severity", "category", "start", "end", "keyword")
+
+    rule_id: Optional[int]
+    violation_type: str
+    severity: str
+    category: str
+    start: int
+    end: int
+    keyword: str
+
+
 class RuleResult:
-    """规则检测结果"""
-    is_violated: bool
-    violation_types: List[str]
-    matched_keywords: List[str]
-    matched_positions: List[tuple]
+    """规则检测结果
+
+    命中信息紧凑保存：违规类型和命中关键词为按首次出现顺序去重的元组，
+    命中区间为起止位置交替存放的 ``array('l')``，证据文本按需生成，
+    第一次访问对应属性时才转换为列表（之后返回同一个列表）。
+    未命中的文本共用同一个空结果 ``EMPTY_RESULT``，其列表属性每次返回新的空列表。
+
+    由规则引擎生成的结果还保留逐条命中记录和原文引用，
+    用于生成 ``matches``、``snippets()`` 和 ``focus_windows()``。
+    """
+
+    __slots__ = (
+        "is_violated", "severity", "_types", "_keywords", "_spans", "_evidence", "_records", "_text"
+    )
+
+    def __init__(
+        self,
+        is_violated: bool,
+        violation_types: List[str],
+        matched_keywords: List[str],
+        matched_positions: List[tuple],
+        severity: str,
+        evidence: str
+    ):
+        self.is_violated = is_violated
+        self.severity = severity
+        self._types = violation_types
+        self._keywords = matched_keywords
+        self._spans = matched_positions
+        self._evidence = evidence
+        self._records = _NO_HITS
+        self._text = ""
+
+    @classmethod
+    def _compact(
+        cls,
+        types: tuple,
+        keywords: tuple,
+        spans: array,
+        severity: str,
+        records: tuple = _NO_HITS,
+        text: str = ""
+    ) -> "RuleResult":
+        """由扫描结果直接构建（跳过参数处理，证据延后生成）
+
+        Args:
+            records: 命中记录 (规则ID, 类型, 严重程度, 类别, 起始位置, 结束位置)
+            text: 原文
+        """
+        result = cls.__new__(cls)
+        result.is_violated = bool(types)
+        result.severity = severity
+        result._types = types
+        result._keywords = keywords
+        result._spans = spans
+        result._evidence = None
+        result._records = records
+        result._text = text
+        return result
+
+    @property
+    def violation_types(self) -> List[str]:
+        """违规类型（去重）"""
+        if type(self._types) is not list:
+            if not self._types:
+                return []
+            self._types = list(self._types)
+        return self._types
+
+    @property
+    def matched_keywords(self) -> List[str]:
+        """命中关键词（去重，取原文片段）"""
+        if type(self._keywords) is not list:
+            if not self._keywords:
+                return []
+            self._keywords = list(self._keywords)
+        return self._keywords
+
+    @property
+    def matched_positions(self) -> List[tuple]:
+        """命中区间 [(起始位置, 结束位置)]，左闭右开"""
+        if type(self._spans) is not list:
+            spans = self._spans
+            if not spans:
+                return []
+            self._spans = list(zip(spans[::2], spans[1::2]))
+        return self._spans
+
+    @property
+    def evidence(self) -> str:
+        """证据文本"""
+        if self._evidence is None:
+            keywords = self._keywords
+            self._evidence = f"检测到违规关键词: {', '.join(keywords[:5])}" if keywords else ""
+        return self._evidence
+
+    @property
+    def matches(self) -> List[RuleMatch]:
+        """逐条命中记录（关键词词典命中没有规则ID）"""
+        text = self._text
+        return [
+            RuleMatch(
+                rule_id=rule_id,
+                violation_type=vtype,
+                severity=severity,
+                category=category,
+                start=start,
+                end=end,
+                keyword=text[start:end]
+            )
+            for rule_id, vtype, severity, category, start, end in self._records
+        ]
+
+    def snippets(self, context: int = SNIPPET_CONTEXT) -> List[Dict]:
+        """命中片段（可直接由接口返回）
+
+        Args:
+            context: 命中位置两侧保留的上下文字符数
+
+        Returns:
+            List[Dict]: 每条命中的规则ID、类型、严重程度、区间、关键词及前后文
+        """
+        text = self._text
+        return [
+            {
+                "rule_id": rule_id,
+                "type": vtype,
+                "severity": severity,
+                "category": category,
+                "start": start,
+                "end": end,
+                "keyword": text[start:end],
+                "before": text[max(start - context, 0):start],
+                "after": text[end:end + context]
+            }
+            for rule_id, vtype, severity, category, start, end in self._records
+        ]
+
+    def focus_windows(self, context: int = SNIPPET_CONTEXT) -> List[str]:
+        """命中位置附近的原文窗口（重叠的窗口合并，按位置排序）
+
+        只需复核命中附近内容时（如交给大模型），可以用这些窗口代替全文。
+
+        Args:
+            context: 命中位置两侧保留的上下文字符数
+
+        Returns:
+            List[str]: 原文窗口
+        """
+        text = self._text
+        windows = []
+        for start, end in sorted((record[4], record[5]) for record in self._records):
+            start = max(start - context, 0)
+            end = min(end + context, len(text))
+            if windows and start <= windows[-1][1]:
+                windows[-1][1] = max(windows[-1][1], end)
+            else:
+                windows.append([start, end])
+        return [text[start:end] for start, end in windows]
+
+    def _fields(self) -> tuple:
+        return (
+            self.is_violated, self.violation_types, self.matched_keywords,
+            self.matched_positions, self.severity, self.evidence
+        )
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return (
+            f"RuleResult(is_violated={self.is_violated!r}, violation_types={self.violation_types!r}, "
+            f"matched_keywords={self.matched_keywords!r}, matched_positions={self.matched_positions!r}, "
+            f"severity={self.severity!r}, evidence={self.evidence!r})"
+        )
+
+
+# 未命中文本共用的检测结果
+EMPTY_RESULT = RuleResult._compact(_NO_HITS, _NO_HITS, array("l"), "none")
+
+
+@dataclass
+class StreamMatch:
+    """流式检测命中"""
+    __slots__ = ("violation_type", "severity", "category", "start", "end", "keyword")
+
+    violation_type: str
     severity: str
-    evidence: str
+    category: str
+    start: int
+    end: int
+    keyword: str
+
+
+@dataclass
+class BulkScanReport:
+    """多进程批量扫描的吞吐统计（扫描过程中逐块更新）"""
+    workers: int = 0
+    chunks: int = 0
+    texts: int = 0
+    chars: int = 0
+    violations: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def texts_per_second(self) -> float:
+        """每秒检测文本数"""
+        return self.texts / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def chars_per_second(self) -> float:
+        """每秒检测字符数"""
+        return self.chars / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class CompiledRuleSet:
+    """编译后的规则集快照
+
+    构建完成并发布后只读：热更新时构建新的快照整体替换，
+    正在检测的请求继续使用它开始时拿到的快照。
+    """
+
+    def __init__(
+        self,
+        blacklist_rules: Dict,
+        whitelist: List[str],
+        content_hash: Optional[str] = None,
+        normalization: Optional[Dict] = None,
+        regex_guard: Optional[Dict] = None,
+        noise_tolerance: Optional[Dict] = None,
+        variant_index: Optional[Dict] = None,
+        lexicons: Optional[List[Dict]] = None,
+        rule_id_base: int = 0
+    ):
+        """编译规则集
+
+        Args:
+            blacklist_rules: 黑名单规则（按类别分组）
+            whitelist: 白名单
+            content_hash: 规则文件内容哈希
+            normalization: 文本归一化配置（enabled、char_map、removed_chars、remove_ascii_symbols）
+            regex_guard: 正则安全防护配置（max_gap、time_budget_ms、segment_size）
+            noise_tolerance: 干扰字符容忍配置（enabled、max_gap、min_length）
+            variant_index: 同音字/拼音变体索引配置（enabled、tone_sensitive、
+                min_spelling_length、aliases、homophones）
+            lexicons: 外部词库，每项包含 category、type、severity、terms
+            rule_id_base: 第一条规则的ID（租户增量规则接在基础规则之后编号）
+        """
+        self.blacklist_rules = blacklist_rules
+        self.whitelist = whitelist
+        self.rule_id_base = rule_id_base
+        # 配置段原样保留（租户增量规则沿用基础规则的配置）
+        self.config = {
+            "normalization": normalization,
+            "regex_guard": regex_guard,
+            "noise_tolerance": noise_tolerance,
+            "variant_index": variant_index
+        }
+        self.lexicons = [
+            {key: value for key, value in lexicon.items() if key != "terms"}
+            for lexicon in lexicons or []
+        ]
+        self.content_hash = content_hash
+        self.version = 0
+
+        # 运行时统计（不随编译产物缓存，由规则引擎在发布快照时挂载）
+        self.metrics: Optional[RuleMetrics] = None
+
+        # 文本归一化（规则与文本使用同一张映射表）
+        normalization = normalization or {}
+        self.normalizer: Optional[TextNormalizer] = None
+        if normalization.get("enabled", True):
+            self.normalizer = TextNormalizer(
+                extra_map=normalization.get("char_map"),
+                extra_removed=normalization.get("removed_chars", ""),
+                remove_ascii_symbols=bool(normalization.get("remove_ascii_symbols", False))
+            )
+
+        # 正则安全防护
+        guard = dict(DEFAULT_REGEX_GUARD)
+        guard.update(regex_guard or {})
+        self.max_gap = int(guard["max_gap"])
+        self.time_budget_ns = int(float(guard["time_budget_ms"]) * 1_000_000)
+        self.segment_size = max(int(guard["segment_size"]), GUARD_SEGMENT_OVERLAP)
+        self.rejected_rules: List[Dict] = []
+        self.rewritten_rules: List[str] = []
+
+        # 关键词间干扰字符容忍
+        tolerance = dict(DEFAULT_NOISE_TOLERANCE)
+        tolerance.update(noise_tolerance or {})
+        self.noise_max_gap = int(tolerance["max_gap"]) if tolerance["enabled"] else 0
+        self.noise_min_length = max(int(tolerance["min_length"]), 2)
+
+        self.variant_config = dict(DEFAULT_VARIANT_INDEX)
+        self.variant_config.update(variant_index or {})
+
+        # 编译正则表达式（同时提取必需字面量）
+        self._compile_regex_patterns()
+
+        # 构建AC自动机（用于精确匹配和正则预筛）
+        self._build_automaton(lexicons or [])
+        self._build_whitelist_automaton()
+        self._build_noise_automaton()
+        self._build_variant_index()
+
+    def __getstate__(self) -> Dict:
+        state = dict(self.__dict__)
+        state["metrics"] = None
+        return state
+
+    @property
+    def scan_rules(self) -> List[Dict]:
+        """参与检测的规则"""
+        return self.rules
+
+    @property
+    def layers(self) -> tuple:
+        """组成快照的编译规则集"""
+        return (self,)
+
+    def normalize(self, text: str) -> tuple:
+        """归一化文本
+
+        Args:
+            text: 原始文本
+
+        Returns:
+            tuple: (归一化文本, 偏移表)，未启用归一化时原样返回
+        """
+        if self.normalizer is None:
+            return text, None
+        return self.normalizer.normalize(text)
+
+    def _normalize_keyword(self, keyword: str) -> str:
+        """归一化关键词/字面量"""
+        if self.normalizer is None:
+            return keyword
+        return self.normalizer.normalize_keyword(keyword)
+
+    def _compile_regex_patterns(self) -> None:
+        """编译正则表达式模式
+
+        能提取出必需字面量的规则交给AC自动机预筛，只有字面量出现时才执行正则确认。
+        其余规则合并为一个带命名分组的多选分支正则 ``(?P<r0>...)|(?P<r1>...)``，
+        每段文本只需扫描一遍，再通过命中的分组还原规则的类型和严重程度。
+        含反向引用等无法合并的规则单独编译扫描。
+
+        编译前先做复杂度检查：无界量词嵌套的规则可能灾难性回溯，直接拒绝并记录；
+        ``.*`` / ``.+`` 改写为最多跨越 ``max_gap`` 个字符的有界窗口。
+        """
+        self.regex_patterns = {}
+        self.rules = []
+        self.gated_rules = []
+        self.merged_rules = []
+        self.standalone_rules = []
+        branches = []
+
+        for category, rules in self.blacklist_rules.items():
+            self.regex_patterns[category] = []
+            for rule in rules:
+                original = rule.get("pattern", "")
+                try:
+                    compiled, literals, rewritten = self.compile_pattern(original)
+                except re.error as e:
+                    print(f"正则表达式编译失败: {original}, 错误: {e}")
+                    continue
+                except ValueError as e:
+                    print(f"正则存在灾难性回溯风险，已跳过: {original}, 原因: {e}")
+                    self.rejected_rules.append({
+                        "category": category,
+                        "type": rule.get("type"),
+                        "pattern": original,
+                        "reason": str(e)
+                    })
+                    continue
+                if rewritten:
+                    self.rewritten_rules.append(original)
+                pattern = compiled.pattern
+
+                pattern_info = {
+                    "pattern": compiled,
+                    "type": rule.get("type"),
+                    "severity": rule.get("severity"),
+                    "original": original,
+                    "category": category,
+                    "literals": literals,
+                    "id": self.rule_id_base + len(self.rules)
+                }
+                self.rules.append(pattern_info)
+                self.regex_patterns[category].append(pattern_info)
+
+                if pattern_info["literals"]:
+                    self.gated_rules.append(pattern_info)
+                    continue
+
+                branch = f"(?P<r{len(self.merged_rules)}>{pattern})"
+                if self._is_mergeable(pattern, branch):
+                    self.merged_rules.append(pattern_info)
+                    branches.append(branch)
+                else:
+                    self.standalone_rules.append(pattern_info)
+
+        self.combined_pattern = re.compile("|".join(branches)) if branches else None
+
+        # 分组编号 -> 规则序号，命中时用 lastindex 直接定位规则
+        self.group_rules = {}
+        if self.combined_pattern is not None:
+            self.group_rules = self._group_rules(self.combined_pattern)
+
+        # 规则子集 -> (合并正则, 分组编号 -> 规则序号)，扫描时按需编译
+        self._subset_patterns: Dict[tuple, tuple] = {}
+
+    @staticmethod
+    def _group_rules(pattern: re.Pattern) -> Dict[int, int]:
+        """合并正则的分组编号 -> 规则序号"""
+        return {
+            index: int(name[1:])
+            for name, index in pattern.groupindex.items()
+            if name.startswith("r") and name[1:].isdigit()
+        }
+
+    def _combined_subset(self, rule_ids: tuple) -> tuple:
+        """只含部分规则的合并正则
+
+        Args:
+            rule_ids: 合并正则中的规则序号（递增）
+
+        Returns:
+            tuple: (合并正则, 分组编号 -> 规则序号)
+        """
+        if len(rule_ids) == len(self.merged_rules):
+            return self.combined_pattern, self.group_rules
+        cached = self._subset_patterns.get(rule_ids)
+        if cached is None:
+            pattern = re.compile("|".join(
+                f"(?P<r{rule_id}>{self.merged_rules[rule_id]['pattern'].pattern})" for rule_id in rule_ids
+            ))
+            cached = (pattern, self._group_rules(pattern))
+            if len(self._subset_patterns) < SUBSET_PATTERN_CACHE:
+                self._subset_patterns[rule_ids] = cached
+        return cached
+
+    def compile_pattern(self, original: str) -> tuple:
+        """按本规则集的配置编译单条规则正则
+
+        依次做归一化、复杂度检查、无界通配改写，再提取必需字面量。
+
+        Args:
+            original: 规则中的原始正则
+
+        Returns:
+            tuple: (编译后的正则, 归一化后的必需字面量或 None, 是否改写了通配)
+
+        Raises:
+            ValueError: 正则存在灾难性回溯风险
+            re.error: 正则无法编译
+        """
+        pattern = original
+        if self.normalizer is not None:
+            pattern = self.normalizer.normalize_pattern(original)
+
+        risks = find_redos_risks(pattern)
+        if risks:
+            raise ValueError("; ".join(risks))
+
+        rewritten = False
+        if self.max_gap > 0:
+            bounded = bound_wildcards(pattern, self.max_gap)
+            if bounded != pattern:
+                pattern = bounded
+                rewritten = True
+
+        compiled = re.compile(pattern)
+
+        literals = extract_required_literals(pattern)
+        if literals:
+            literals = frozenset(self._normalize_keyword(item) for item in literals)
+            if "" in literals:
+                literals = None
+        return compiled, literals, rewritten
+
+    @staticmethod
+    def _is_mergeable(pattern: str, branch: str) -> bool:
+        """判断规则能否并入合并正则
+
+        Args:
+            pattern: 原始正则
+            branch: 包装为命名分组后的正则
+
+        Returns:
+            bool: 是否可以合并
+        """
+        if _BACKREF_RE.search(pattern):
+            return False
+        try:
+            # 全局内联标志（如 (?i)）等只能出现在整个正则开头
+            re.compile(f"(?:){branch}")
+        except re.error:
+            return False
+        return True
+
+    def _build_automaton(self, lexicons: List[Dict]) -> None:
+        """构建AC自动机用于快速多模式匹配
+
+        自动机中包含精确匹配的关键词（规则中的纯文本和外部词库）以及各正则规则的
+        必需字面量。载荷只存整数词条ID，词条的关键词规则、正则规则序号和词长存放在
+        ``array`` 表中（按词条ID偏移索引），不为每个词创建 Python 对象：
+        词库增大时内存只随自动机本身增长，fork 出的子进程也能写时复制共享。
+
+        Args:
+            lexicons: 外部词库，每项包含 category、type、severity、terms
+        """
+        self.automaton = ahocorasick.Automaton(ahocorasick.STORE_INTS)
+
+        # 关键词规则元数据（类别, 类型, 严重程度），去重后按序号引用
+        self.keyword_meta: List[tuple] = []
+        meta_ids: Dict[tuple, int] = {}
+
+        entries: Dict[str, int] = {}
+        entry_meta: List[List[int]] = []
+        entry_rules: List[List[int]] = []
+
+        def entry_for(word: str) -> int:
+            entry = entries.get(word)
+            if entry is None:
+                entry = entries[word] = len(entry_meta)
+                entry_meta.append([])
+                entry_rules.append([])
+            return entry
+
+        def add_keyword(word: str, meta: tuple) -> None:
+            meta_id = meta_ids.get(meta)
+            if meta_id is None:
+                meta_id = meta_ids[meta] = len(self.keyword_meta)
+                self.keyword_meta.append(meta)
+            metas = entry_meta[entry_for(word)]
+            if meta_id not in metas:
+                metas.append(meta_id)
+
+        # 添加所有需要精确匹配的关键词
+        for category, rules in self.blacklist_rules.items():
+            for rule in rules:
+                pattern = rule.get("pattern", "")
+                # 如果不是正则表达式（不包含特殊字符），添加到AC自动机
+                if pattern and not any(char in pattern for char in r"()[]{}.*+?|^\$\\"):
+                    keyword = self._normalize_keyword(pattern)
+                    if keyword:
+                        add_keyword(keyword, (category, rule.get("type"), rule.get("severity")))
+
+        # 添加外部词库
+        self.lexicon_terms = 0
+        for lexicon in lexicons:
+            meta = (lexicon.get("category"), lexicon.get("type"), lexicon.get("severity"))
+            for term in lexicon.get("terms", ()):
+                keyword = self._normalize_keyword(term)
+                if keyword:
+                    add_keyword(keyword, meta)
+                    self.lexicon_terms += 1
+
+        # 添加正则规则的必需字面量
+        for rule_id, pattern_info in enumerate(self.gated_rules):
+            for literal in pattern_info["literals"]:
+                entry_rules[entry_for(literal)].append(rule_id)
+
+        self.entry_lengths = array("I")
+        self.entry_meta_offsets = array("I", [0])
+        self.entry_meta = array("I")
+        self.entry_rule_offsets = array("I", [0])
+        self.entry_rules = array("I")
+        for word, entry in entries.items():
+            self.automaton.add_word(word, entry)
+            self.entry_lengths.append(len(word))
+            self.entry_meta.extend(entry_meta[entry])
+            self.entry_meta_offsets.append(len(self.entry_meta))
+            self.entry_rules.extend(entry_rules[entry])
+            self.entry_rule_offsets.append(len(self.entry_rules))
+
+        # 只有添加了词后才调用 make_automaton
+        if entries:
+            self.automaton.make_automaton()
+        self.max_keyword_length = max(self.entry_lengths, default=0)
+
+        # 关键词含分隔符时拼接扫描会跨条匹配，退化为逐条检测
+        self.separator_conflict = any(
+            BATCH_SEPARATOR in word for word in itertools.chain(entries, self.whitelist)
+        )
+
+    def entry_payload(self, entry: int) -> tuple:
+        """自动机词条的载荷
+
+        Args:
+            entry: 词条ID
+
+        Returns:
+            tuple: (关键词规则列表 [(类别, 类型, 严重程度)], 正则规则序号, 词长)
+        """
+        meta = self.keyword_meta
+        keyword_rules = [
+            meta[meta_id]
+            for meta_id in self.entry_meta[self.entry_meta_offsets[entry]:self.entry_meta_offsets[entry + 1]]
+        ]
+        rule_ids = self.entry_rules[self.entry_rule_offsets[entry]:self.entry_rule_offsets[entry + 1]]
+        return keyword_rules, rule_ids, self.entry_lengths[entry]
+
+    def _build_whitelist_automaton(self) -> None:
+        """构建白名单AC自动机，一次扫描找出所有豁免区间"""
+        self.whitelist_automaton = ahocorasick.Automaton()
+        self.max_whitelist_length = 0
+        for item in self.whitelist:
+            item = self._normalize_keyword(item) if item else item
+            if item:
+                self.whitelist_automaton.add_word(item, len(item))
+                self.max_whitelist_length = max(self.max_whitelist_length, len(item))
+        if len(self.whitelist_automaton) > 0:
+            self.whitelist_automaton.make_automaton()
+
+    def _build_noise_automaton(self) -> None:
+        """构建容忍干扰字符的关键词自动机
+
+        能精确展开为有限字面量集合的规则（如 ``(祖传秘方|神医|包治)``），
+        把每个字面量去掉干扰字符后加入自动机，负载为 (规则ID元组, 长度)。
+        短于 ``noise_min_length`` 的字面量不加入：两字词拆开后的两个字在
+        正常文本中很常见（如 ``钱包 治愈`` 中的 ``包 治``），容忍间隔误报太多。
+        """
+        self.noise_automaton = ahocorasick.Automaton()
+        self.noise_re = None
+        self.max_noise_span = 0
+        if self.noise_max_gap <= 0:
+            return
+
+        payloads: Dict[str, List[int]] = {}
+        for pattern_info in self.rules:
+            literals = extract_exact_literals(pattern_info["pattern"].pattern)
+            if not literals:
+                continue
+            for literal in literals:
+                word = _GAP_NOISE_RE.sub("", self._normalize_keyword(literal))
+                if len(word) < self.noise_min_length:
+                    continue
+                rule_ids = payloads.setdefault(word, [])
+                if pattern_info["id"] not in rule_ids:
+                    rule_ids.append(pattern_info["id"])
+
+        for word, rule_ids in payloads.items():
+            self.noise_automaton.add_word(word, (tuple(rule_ids), len(word)))
+        if payloads:
+            self.noise_automaton.make_automaton()
+            # 预检查：容忍命中必有某个关键词字符（末字除外）紧接干扰字符
+            gap_chars = {ord(char) for word in payloads for char in word[:-1]}
+            self.noise_re = re.compile(char_class(gap_chars) + _GAP_NOISE_CHAR)
+            longest = max(len(word) for word in payloads)
+            self.max_noise_span = longest + (longest - 1) * self.noise_max_gap
+
+    def _build_variant_index(self) -> None:
+        """构建同音字/拼音变体索引
+
+        同音字：正则预筛字面量逐字映射为读音键，键串加入自动机，负载为
+        (字面量, 预筛规则序号元组)。文本用同一张表映射后扫描一遍，命中处把
+        变体还原为字面量，再交给正则确认，命中仍归属原规则。
+        拼音拼写：能精确展开的规则，其字面量的无声调拼音加入拼写自动机，
+        负载为 (规则ID元组, 拼写长度)。
+        """
+        self.variant_table: Dict[int, str] = {}
+        self.variant_re = None
+        self.variant_chars: frozenset = frozenset()
+        self.variant_automaton = ahocorasick.Automaton()
+        self.spelling_automaton = ahocorasick.Automaton()
+        if not self.variant_config["enabled"]:
+            return
+
+        literal_rules: Dict[str, List[int]] = {}
+        for rule_id, pattern_info in enumerate(self.gated_rules):
+            for literal in pattern_info["literals"]:
+                if len(literal) >= 2:
+                    literal_rules.setdefault(literal, []).append(rule_id)
+
+        aliases = {
+            self._normalize_keyword(str(source)): self._normalize_keyword(str(target))
+            for source, target in (self.variant_config.get("aliases") or {}).items()
+        }
+        # 同音替换字候选可以写成一个字符串或字符串列表
+        homophones = self.variant_config.get("homophones") or ()
+        if isinstance(homophones, str):
+            homophones = [homophones]
+        keyer = VariantKeyer(
+            literal_rules,
+            aliases=aliases,
+            tone_sensitive=self.variant_config["tone_sensitive"],
+            homophones=[self._normalize_keyword(str(chars)) for chars in homophones]
+        )
+        self.variant_table = keyer.table
+
+        # 没有替换字时不可能出现变体，不构建同音字自动机
+        variant_chars = keyer.variant_chars()
+        self.variant_chars = frozenset(variant_chars)
+        if not variant_chars:
+            literal_rules = {}
+
+        variants: Dict[str, tuple] = {}
+        for literal, rule_ids in literal_rules.items():
+            key = keyer.keys(literal)
+            if key == literal:
+                continue
+            if key in variants:
+                # 同音的字面量共用一个键，还原为先出现的字面量，规则合并触发
+                first, merged = variants[key]
+                variants[key] = (first, tuple(sorted(set(merged) | set(rule_ids))))
+            else:
+                variants[key] = (literal, tuple(rule_ids))
+        for key, payload in variants.items():
+            self.variant_automaton.add_word(key, payload)
+        if variants:
+            self.variant_automaton.make_automaton()
+            self.variant_re = re.compile(char_class(ord(char) for char in variant_chars))
+
+        spellings: Dict[str, List[int]] = {}
+        min_length = int(self.variant_config["min_spelling_length"])
+        for pattern_info in self.rules:
+            literals = extract_exact_literals(pattern_info["pattern"].pattern)
+            for literal in literals or ():
+                spelling = keyer.spell(literal)
+                if spelling and len(spelling) >= min_length:
+                    rule_ids = spellings.setdefault(spelling, [])
+                    if pattern_info["id"] not in rule_ids:
+                        rule_ids.append(pattern_info["id"])
+        for spelling, rule_ids in spellings.items():
+            self.spelling_automaton.add_word(spelling, (tuple(rule_ids), len(spelling)))
+        if spellings:
+            self.spelling_automaton.make_automaton()
+
+    def mask_whitelist(self, text: str) -> str:
+        """将白名单豁免区间替换为掩码字符
+
+        与逐词 ``str.replace`` 不同，掩码后文本长度不变，命中位置仍对应原文；
+        扫描代价与白名单规模无关。
+
+        Args:
+            text: 原始文本
+
+        Returns:
+            str: 掩码后的文本（无豁免区间时返回原对象）
+        """
+        if not self.whitelist_automaton:
+            return text
+
+        hits = None
+        for end_index, length in self.whitelist_automaton.iter(text):
+            if hits is None:
+                hits = []
+            hits.append((end_index - length + 1, end_index + 1))
+        if hits is None:
+            return text
+        hits.sort()
+
+        # 合并重叠的豁免区间
+        spans = [list(hits[0])]
+        for start, end in hits[1:]:
+            if start <= spans[-1][1]:
+                spans[-1][1] = max(spans[-1][1], end)
+            else:
+                spans.append([start, end])
+
+        pieces = []
+        pos = 0
+        for start, end in spans:
+            pieces.append(text[pos:start])
+            pieces.append(WHITELIST_MASK * (end - start))
+            pos = end
+        pieces.append(text[pos:])
+        return "".join(pieces)
+
+    def scan_automaton(self, text: str) -> tuple:
+        """用AC自动机扫描文本
+
+        Args:
+            text: 待检测文本
+
+        Returns:
+            tuple: (关键词命中列表 [(起始位置, 结束位置, 类别, 类型, 严重程度)], 被触发的正则规则序号集合)，
+                区间为左闭右开
+        """
+        keyword_hits = _NO_HITS
+        triggered = _NO_RULES
+
+        # 只有在自动机已构建时才匹配；命中后才分配列表和集合
+        if self.automaton:
+            try:
+                for end_index, entry in self.automaton.iter(text):
+                    keyword_rules, rule_ids, length = self.entry_payload(entry)
+                    if keyword_rules:
+                        if keyword_hits is _NO_HITS:
+                            keyword_hits = []
+                        start = end_index - length + 1
+                        for category, vtype, severity in keyword_rules:
+                            keyword_hits.append((start, end_index + 1, category, vtype, severity))
+                    if rule_ids:
+                        if triggered is _NO_RULES:
+                            triggered = set()
+                        triggered.update(rule_ids)
+            except AttributeError:
+                # 如果自动机未构建，跳过
+                pass
+
+        return keyword_hits, triggered
+
+    def iter_keywords(self, text: str) -> Iterator[tuple]:
+        """逐个产出AC自动机命中（按结束位置递增）
+
+        Args:
+            text: 待检测文本
+
+        Returns:
+            Iterator[tuple]: (结束位置, 关键词规则列表, 预筛规则序号, 词长)
+        """
+        if not self.automaton:
+            return
+        entry_payload = self.entry_payload
+        for end_index, entry in self.automaton.iter(text):
+            yield (end_index, *entry_payload(entry))
+
+    def scan_noise(self, text: str, compact: Optional[str] = None, offsets=None) -> List[tuple]:
+        """匹配字符之间插入了干扰字符的关键词（如 ``祖-传-秘-方``、``祖 传 秘 方``）
+
+        先删除干扰字符得到压缩文本，用AC自动机线性扫描；命中后通过偏移表
+        映射回原位置，检查相邻字符之间的干扰字符数不超过 ``noise_max_gap``。
+        只由空白构成的间隔视为分词空格而不是干扰，除非间隔一侧的字是被拆开的
+        单字（前后都不紧接文字），如 ``祖 传 秘 方`` 算命中，``祖传 秘方`` 不算。
+        没有间隔的命中已由常规扫描覆盖，不重复报告。
+
+        Args:
+            text: 归一化并做白名单掩码后的文本
+            compact: 删除干扰字符后的文本（None 时现场计算）
+            offsets: 压缩文本到原文的偏移表（None 时在有命中时计算）
+
+        Returns:
+            List[tuple]: (规则信息, 起始位置, 结束位置, 命中文本) 列表
+        """
+        if not self.noise_automaton:
+            return _NO_HITS
+
+        if compact is None:
+            compact = _GAP_NOISE_RE.sub("", text)
+        if len(compact) == len(text):
+            return _NO_HITS
+
+        hits = []
+        max_gap = self.noise_max_gap
+        for end_index, (rule_ids, length) in self.noise_automaton.iter(compact):
+            if offsets is None:
+                # 偏移表只在有命中时构建
+                offsets = _noise_offsets(text)
+
+            positions = offsets[end_index - length + 1:end_index + 1]
+            start = positions[0]
+            end = positions[-1] + 1
+            if end - start == length:
+                continue
+            if not all(
+                right - left - 1 <= max_gap
+                and (right - left == 1 or not text[left + 1:right].isspace()
+                     or _isolated_char(text, left) or _isolated_char(text, right))
+                for left, right in zip(positions, positions[1:])
+            ):
+                continue
+
+            for rule_id in rule_ids:
+                hits.append((self.rules[rule_id - self.rule_id_base], start, end, text[start:end]))
+
+        return hits
+
+    def scan_variants(self, text: str) -> tuple:
+        """把同音字、替换字写成的规则字面量还原（如 ``威信号`` -> ``微信号``）
+
+        文本逐字映射为读音键后用AC自动机扫描一遍，长度不变，位置仍对应原文。
+        变体命中中与字面量不同的字必须都是替换字（关键词用字之间不互相替换），
+        文本中没有替换字时不做映射（干净文本不复制）。
+
+        Args:
+            text: 归一化并做白名单掩码后的文本
+
+        Returns:
+            tuple: (还原后的文本, 需要确认的预筛规则序号集合)
+        """
+        if not self.variant_automaton or self.variant_re.search(text) is None:
+            return text, _NO_RULES
+
+        repairs = None
+        triggered = _NO_RULES
+        for end_index, (literal, rule_ids) in self.variant_automaton.iter(text.translate(self.variant_table)):
+            start = end_index - len(literal) + 1
+            if any(
+                char != expected and char not in self.variant_chars
+                for char, expected in zip(text[start:end_index + 1], literal)
+            ) or text.startswith(literal, start):
+                continue
+            if repairs is None:
+                repairs = []
+                triggered = set()
+            repairs.append((start, literal))
+            triggered.update(rule_ids)
+
+        if repairs is None:
+            return text, triggered
+
+        chars = list(text)
+        for start, literal in repairs:
+            chars[start:start + len(literal)] = literal
+        return "".join(chars), triggered
+
+    def scan_spellings(self, text: str, compact: Optional[str] = None, offsets=None) -> List[tuple]:
+        """匹配用拼音拼写的关键词（如 ``shen yi`` -> ``神医``）
+
+        删除干扰字符并转小写后用AC自动机扫描，命中前后不能紧接其他字母，
+        避免命中英文单词或更长拼音的一部分。
+
+        Args:
+            text: 归一化并做白名单掩码后的文本
+            compact: 删除干扰字符后的文本（None 时现场计算）
+            offsets: 压缩文本到原文的偏移表（None 时在有命中时计算）
+
+        Returns:
+            List[tuple]: (规则信息, 起始位置, 结束位置, 命中文本) 列表
+        """
+        if not self.spelling_automaton:
+            return _NO_HITS
+
+        if compact is None:
+            compact = _GAP_NOISE_RE.sub("", text)
+        shifted = len(compact) != len(text)
+        compact = compact.translate(_ASCII_LOWER)
+
+        hits = []
+        for end_index, (rule_ids, length) in self.spelling_automaton.iter(compact):
+            start_index = end_index - length + 1
+            if start_index > 0 and compact[start_index - 1] in _ASCII_LETTERS:
+                continue
+            if end_index + 1 < len(compact) and compact[end_index + 1] in _ASCII_LETTERS:
+                continue
+
+            if not shifted:
+                start, end = start_index, end_index + 1
+            else:
+                if offsets is None:
+                    offsets = _noise_offsets(text)
+                start, end = offsets[start_index], offsets[end_index] + 1
+            for rule_id in rule_ids:
+                hits.append((self.rules[rule_id - self.rule_id_base], start, end, text[start:end]))
+
+        return hits
+
+    def scan_obfuscations(self, text: str) -> List[tuple]:
+        """扫描插入干扰字符和拼音拼写的关键词
+
+        两种扫描共用同一份压缩文本，且各自先做廉价的预检查：没有关键词字符
+        紧接干扰字符的文本不做干扰扫描，没有英文字母的文本不做拼写扫描，
+        两者都不需要时不压缩文本。
+
+        Args:
+            text: 归一化并做白名单掩码后的文本
+
+        Returns:
+            List[tuple]: (规则信息, 起始位置, 结束位置, 命中文本) 列表
+        """
+        noisy = self.noise_re is not None and self.noise_re.search(text) is not None
+        spelled = bool(self.spelling_automaton) and _ASCII_ALPHA_RE.search(text) is not None
+        if not noisy and not spelled:
+            return _NO_HITS
+
+        compact = _GAP_NOISE_RE.sub("", text) if noisy or _GAP_NOISE_RE.search(text) else text
+        noise_hits = self.scan_noise(text, compact) if noisy else _NO_HITS
+        spelling_hits = self.scan_spellings(text, compact) if spelled else _NO_HITS
+        if not spelling_hits:
+            return noise_hits
+        if not noise_hits:
+            return spelling_hits
+        return noise_hits + spelling_hits
+
+    def scan_regex(
+        self,
+        text: str,
+        triggered: set,
+        metrics: Optional[RuleMetrics] = None,
+        timed: bool = False
+    ) -> List[tuple]:
+        """执行正则匹配
+
+        预筛触发的规则逐条确认；无字面量的规则先用合并正则找出会命中的规则：
+        每次 ``search`` 得到最靠前的命中及其规则，把该规则移出合并正则后从同一位置
+        继续查找（其余规则在更靠前的位置不可能匹配），直到没有命中。查找次数为
+        命中规则数加一，与命中个数无关。之后只对命中的规则执行 ``finditer``，
+        每条规则的结果与单独 ``finditer`` 一致（同一规则的匹配互不重叠）。
+
+        超过 ``segment_size`` 的长文本分段执行，每段之后检查时间预算，
+        超出预算的规则放弃剩余文本并计数，不会拖住整个请求。预算不能中断单次匹配：
+        不超过 ``segment_size`` 的文本（以及每一段内部）不受时间限制，灾难性回溯
+        只靠加载时的静态检查（``find_redos_risks``）排除。
+
+        Args:
+            text: 待检测文本
+            triggered: AC自动机预筛触发的规则序号
+            metrics: 统计计数器（None 表示不统计）
+            timed: 是否记录每条正则的耗时（采样时为 True）
+
+        Returns:
+            List[tuple]: (规则信息, 起始位置, 结束位置, 命中文本) 列表
+        """
+        if not triggered and self.combined_pattern is None and not self.standalone_rules:
+            return _NO_HITS
+
+        hits = []
+        timer = metrics if timed else None
+        clock = time.perf_counter_ns
+
+        for rule_id in sorted(triggered):
+            pattern_info = self.gated_rules[rule_id]
+            began = clock() if timer is not None else 0
+            for match in self._finditer(pattern_info, text, metrics):
+                hits.append((pattern_info, match.start(), match.end(), match.group()))
+            if timer is not None:
+                timer.record_regex_time(pattern_info["id"], clock() - began)
+
+        if self.combined_pattern is not None:
+            began = clock()
+            deadline = began + self.time_budget_ns if len(text) > self.segment_size else None
+            remaining = tuple(range(len(self.merged_rules)))
+            fired = []
+            pos = 0
+            while remaining:
+                pattern, group_rules = self._combined_subset(remaining)
+                match = pattern.search(text, pos)
+                if match is None:
+                    break
+                winner = group_rules[match.lastindex]
+                fired.append(winner)
+                remaining = tuple(rule_id for rule_id in remaining if rule_id != winner)
+                pos = match.start()
+                if deadline is not None and remaining and clock() > deadline:
+                    if metrics is not None:
+                        metrics.record_budget_exceeded(metrics.combined_slot)
+                    break
+
+            for rule_id in sorted(fired):
+                pattern_info = self.merged_rules[rule_id]
+                for match in self._finditer(pattern_info, text, metrics):
+                    hits.append((pattern_info, match.start(), match.end(), match.group()))
+
+            if timer is not None:
+                timer.record_regex_time(timer.combined_slot, clock() - began)
+
+        for pattern_info in self.standalone_rules:
+            began = clock() if timer is not None else 0
+            for match in self._finditer(pattern_info, text, metrics):
+                hits.append((pattern_info, match.start(), match.end(), match.group()))
+            if timer is not None:
+                timer.record_regex_time(pattern_info["id"], clock() - began)
+
+        return hits
+
+    def _finditer(self, pattern_info: Dict, text: str, metrics: Optional[RuleMetrics]):
+        """执行单条规则的正则，长文本分段执行并检查时间预算（短文本不检查）
+
+        相邻段重叠 ``GUARD_SEGMENT_OVERLAP`` 个字符，起点落在本段的命中在重叠区内
+        匹配完整；下一段从上一个命中的结束位置之后开始，命中互不重叠。
+
+        Args:
+            pattern_info: 规则信息
+            text: 待检测文本
+            metrics: 统计计数器（None 表示不统计）
+
+        Returns:
+            Iterable[re.Match]: 匹配结果
+        """
+        pattern = pattern_info["pattern"]
+        length = len(text)
+        if length <= self.segment_size:
+            return pattern.finditer(text)
+        return self._finditer_segmented(pattern_info, text, metrics)
+
+    def _finditer_segmented(self, pattern_info: Dict, text: str, metrics: Optional[RuleMetrics]):
+        """分段执行正则（见 ``_finditer``）"""
+        pattern = pattern_info["pattern"]
+        length = len(text)
+        deadline = time.perf_counter_ns() + self.time_budget_ns
+        pos = 0
+        last_end = 0
+        while pos < length:
+            limit = pos + self.segment_size
+            for match in pattern.finditer(text, pos, min(limit + GUARD_SEGMENT_OVERLAP, length)):
+                if match.start() >= limit:
+                    break
+                yield match
+                last_end = match.end()
+            pos = max(limit, last_end)
+            if pos < length and time.perf_counter_ns() > deadline:
+                if metrics is not None:
+                    metrics.record_budget_exceeded(pattern_info["id"])
+                return
+
+
+def _first_match(ruleset: "CompiledRuleSet", pattern_info: Dict, text: str, metrics: Optional[RuleMetrics]):
+    """单条规则的第一个匹配（长文本同样分段执行并受时间预算约束）"""
+    return next(iter(ruleset._finditer(pattern_info, text, metrics)), None)
+
+
+# 规则文件内容哈希 -> 编译前就要用到的规则信息，命中时不解析 YAML
+RULE_SOURCE_CACHE_SIZE = 256
+_rule_sources: "OrderedDict[str, Dict]" = OrderedDict()
+_rule_sources_lock = threading.Lock()
+
+
+def _parse_rules(raw: bytes) -> Dict:
+    """解析规则文件内容"""
+    return yaml.safe_load(raw.decode("utf-8")) or {}
+
+
+def _rule_source(raw: bytes, cache_dir: Optional[Path]):
+    """规则文件中计算内容哈希、组装快照所需的信息（词库配置、禁用类别等）
+
+    按文件内容哈希缓存在进程内和缓存目录中，命中时不解析 YAML。
+
+    Args:
+        raw: 规则文件内容
+        cache_dir: 编译产物缓存目录
+
+    Returns:
+        tuple: (规则信息, 解析后的规则配置)，命中缓存时规则配置为 None
+    """
+    key = hashlib.sha256(raw).hexdigest()
+    path = cache_dir / f"rules-src-{key}.json" if cache_dir is not None else None
+    with _rule_sources_lock:
+        source = _rule_sources.get(key)
+        if source is not None:
+            _rule_sources.move_to_end(key)
+    if source is not None:
+        if path is not None and not path.exists():
+            _save_rule_source(source, path)
+        return source, None
+
+    rules_data = None
+    if path is not None and path.exists():
+        try:
+            source = json.loads(path.read_text(encoding="utf-8"))
+        except Exception as e:
+            print(f"规则信息缓存加载失败: {path}, 错误: {e}")
+    if source is None:
+        rules_data = _parse_rules(raw)
+        source = {
+            "lexicons": [
+                {
+                    "path": str(item["path"]),
+                    "category": item.get("category"),
+                    "type": item.get("type"),
+                    "severity": item.get("severity", "medium")
+                }
+                for item in rules_data.get("lexicons") or []
+            ],
+            "disabled_categories": list(rules_data.get("disabled_categories") or []),
+            "overrides_config": any(rules_data.get(section) for section in RULE_CONFIG_SECTIONS)
+        }
+        if path is not None:
+            _save_rule_source(source, path)
+
+    with _rule_sources_lock:
+        _rule_sources[key] = source
+        while len(_rule_sources) > RULE_SOURCE_CACHE_SIZE:
+            _rule_sources.popitem(last=False)
+    return source, rules_data
+
+
+def _save_rule_source(source: Dict, path: Path) -> None:
+    """写入规则信息缓存（先写临时文件再原子替换）"""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(source, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"规则信息缓存写入失败: {path}, 错误: {e}")
+
+
+def _hash_lexicons(digest, lexicons: List[Dict]) -> None:
+    """把词库文件内容计入哈希（内容暂存在 data 中，编译时再解析）"""
+    for lexicon in lexicons:
+        data = lexicon["path"].read_bytes()
+        digest.update(f"\n{lexicon['path'].name}:{len(data)}\n".encode("utf-8"))
+        digest.update(data)
+        lexicon["data"] = data
+
+
+def _load_lexicons(lexicons: List[Dict]) -> List[Dict]:
+    """解析暂存的词库内容（编译规则集时使用）"""
+    for lexicon in lexicons:
+        lexicon["terms"] = _parse_lexicon(lexicon.pop("data"))
+        lexicon["path"] = str(lexicon["path"])
+    return lexicons
+
+
+def _parse_lexicon(data: bytes) -> List[str]:
+    """解析词库文件：每行一个词，空行和 # 开头的行忽略"""
+    terms = []
+    for line in data.decode("utf-8-sig").splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            terms.append(line)
+    return terms
+
+
+def merge_rule_overlay(base: Dict, overlay: Dict, overlay_dir: Path) -> Dict:
+    """把租户规则叠加到基础规则上
+
+    - ``blacklist``：同名类别的规则追加在基础规则之后，新类别直接加入
+    - ``disabled_categories``：从合并结果中移除的类别
+    - ``whitelist``：与基础白名单合并去重
+    - ``lexicons``：追加，相对路径以租户规则文件所在目录为基准
+    - ``normalization`` 等配置段：按键覆盖基础配置
+
+    Args:
+        base: 基础规则配置
+        overlay: 租户规则配置
+        overlay_dir: 租户规则文件所在目录
+
+    Returns:
+        Dict: 合并后的规则配置（不修改输入）
+    """
+    merged = dict(base)
+
+    blacklist = {category: list(rules or []) for category, rules in (base.get("blacklist") or {}).items()}
+    for category, rules in (overlay.get("blacklist") or {}).items():
+        blacklist.setdefault(category, []).extend(rules or [])
+    for category in overlay.get("disabled_categories") or []:
+        blacklist.pop(category, None)
+    merged["blacklist"] = blacklist
+
+    merged["whitelist"] = list(dict.fromkeys(
+        itertools.chain(base.get("whitelist") or [], overlay.get("whitelist") or [])
+    ))
+
+    lexicons = list(base.get("lexicons") or [])
+    for item in overlay.get("lexicons") or []:
+        item = dict(item)
+        path = Path(item["path"])
+        if not path.is_absolute():
+            item["path"] = str((overlay_dir / path).resolve())
+        lexicons.append(item)
+    merged["lexicons"] = lexicons
+
+    for section in RULE_CONFIG_SECTIONS:
+        if overlay.get(section):
+            config = dict(base.get(section) or {})
+            config.update(overlay[section])
+            merged[section] = config
+
+    return merged
+
+
+class LayeredRuleSet:
+    """基础规则集叠加租户增量规则集的快照
+
+    租户规则只追加规则和词库、停用类别、补充白名单时，不必把基础规则重新
+    编译一遍：基础规则集在所有租户之间共享，租户只编译自己的增量规则（规则ID
+    接在基础规则之后，白名单为两者合并，配置段沿用基础规则）。检测时两层各扫描
+    一遍，停用类别的命中被过滤掉。对外提供与 ``CompiledRuleSet`` 相同的扫描接口，
+    预筛规则序号中增量规则接在基础规则之后。
+    """
+
+    def __init__(
+        self,
+        base: CompiledRuleSet,
+        overlay: CompiledRuleSet,
+        disabled_categories: Iterable[str] = (),
+        content_hash: Optional[str] = None
+    ):
+        """组合两层规则集
+
+        Args:
+            base: 基础规则集
+            overlay: 租户增量规则集（rule_id_base 为基础规则数）
+            disabled_categories: 停用的类别
+            content_hash: 组合后的内容哈希
+        """
+        self.base = base
+        self.overlay = overlay
+        self.disabled_categories = frozenset(disabled_categories)
+        self.content_hash = content_hash
+        self.version = 0
+        self.metrics: Optional[RuleMetrics] = None
+
+        disabled = self.disabled_categories
+        self.rules = base.rules + overlay.rules
+        self.scan_rules = [rule for rule in self.rules if rule["category"] not in disabled]
+        self.gated_rules = base.gated_rules + overlay.gated_rules
+        self.merged_rules = base.merged_rules + overlay.merged_rules
+        self.standalone_rules = base.standalone_rules + overlay.standalone_rules
+        self._gated_offset = len(base.gated_rules)
+        self._disabled_gated = frozenset(
+            rule_id for rule_id, rule in enumerate(base.gated_rules) if rule["category"] in disabled
+        )
+
+        self.blacklist_rules: Dict = {}
+        self.regex_patterns: Dict = {}
+        for layer in (base, overlay):
+            for category, rules in layer.blacklist_rules.items():
+                if category not in disabled:
+                    self.blacklist_rules.setdefault(category, []).extend(rules or [])
+            for category, rules in layer.regex_patterns.items():
+                if category not in disabled:
+                    self.regex_patterns.setdefault(category, []).extend(rules)
+
+        self.whitelist = overlay.whitelist
+        self.whitelist_automaton = overlay.whitelist_automaton
+        self.max_whitelist_length = overlay.max_whitelist_length
+        self.automaton = base.automaton
+        self.combined_pattern = base.combined_pattern
+        self.max_keyword_length = max(base.max_keyword_length, overlay.max_keyword_length)
+        self.max_noise_span = max(base.max_noise_span, overlay.max_noise_span)
+        self.separator_conflict = base.separator_conflict or overlay.separator_conflict
+        self.lexicons = base.lexicons + overlay.lexicons
+        self.lexicon_terms = base.lexicon_terms + overlay.lexicon_terms
+        self.rewritten_rules = base.rewritten_rules + overlay.rewritten_rules
+        self.rejected_rules = base.rejected_rules + overlay.rejected_rules
+
+    def __getstate__(self) -> Dict:
+        state = dict(self.__dict__)
+        state["metrics"] = None
+        return state
+
+    @property
+    def layers(self) -> tuple:
+        """组成快照的编译规则集"""
+        return (self.base, self.overlay)
+
+    def normalize(self, text: str) -> tuple:
+        """归一化文本（两层配置相同）"""
+        return self.base.normalize(text)
+
+    def mask_whitelist(self, text: str) -> str:
+        """白名单掩码（增量规则集的白名单已包含基础白名单）"""
+        return self.overlay.mask_whitelist(text)
+
+    def _finditer(self, pattern_info: Dict, text: str, metrics: Optional[RuleMetrics] = None):
+        """单条规则的匹配（两层的正则防护配置相同）"""
+        return self.base._finditer(pattern_info, text, metrics)
+
+    def _active_hits(self, hits: List[tuple]) -> List[tuple]:
+        """过滤停用类别的 (规则信息, 起始, 结束, 命中文本) 命中"""
+        if not hits or not self.disabled_categories:
+            return hits
+        return [hit for hit in hits if hit[0]["category"] not in self.disabled_categories]
+
+    def _combine_rules(self, base_rules: set, overlay_rules: set) -> set:
+        """合并两层的预筛规则序号（增量规则序号后移）"""
+        if base_rules and self._disabled_gated:
+            base_rules = base_rules - self._disabled_gated
+        if not overlay_rules:
+            return base_rules
+        offset = self._gated_offset
+        return set(base_rules) | {rule_id + offset for rule_id in overlay_rules}
+
+    def scan_automaton(self, text: str) -> tuple:
+        """两层各扫描一遍AC自动机（见 CompiledRuleSet.scan_automaton）"""
+        keyword_hits, triggered = self.base.scan_automaton(text)
+        overlay_hits, overlay_triggered = self.overlay.scan_automaton(text)
+        if keyword_hits and self.disabled_categories:
+            keyword_hits = [hit for hit in keyword_hits if hit[2] not in self.disabled_categories]
+        if overlay_hits:
+            keyword_hits = keyword_hits + overlay_hits if keyword_hits else overlay_hits
+        return keyword_hits or _NO_HITS, self._combine_rules(triggered, overlay_triggered)
+
+    def iter_keywords(self, text: str) -> Iterator[tuple]:
+        """逐个产出两层的AC自动机命中（按结束位置递增）"""
+        disabled = self.disabled_categories
+        offset = self._gated_offset
+        for end_index, keyword_rules, rule_ids, length, layer in heapq.merge(
+            ((*hit, 0) for hit in self.base.iter_keywords(text)),
+            ((*hit, 1) for hit in self.overlay.iter_keywords(text)),
+            key=lambda hit: hit[0]
+        ):
+            if layer:
+                rule_ids = [rule_id + offset for rule_id in rule_ids]
+            elif disabled:
+                keyword_rules = [rule for rule in keyword_rules if rule[0] not in disabled]
+                rule_ids = [rule_id for rule_id in rule_ids if rule_id not in self._disabled_gated]
+            yield end_index, keyword_rules, rule_ids, length
+
+    def scan_variants(self, text: str) -> tuple:
+        """依次还原两层的同音字/替换字（见 CompiledRuleSet.scan_variants）"""
+        text, triggered = self.base.scan_variants(text)
+        text, overlay_triggered = self.overlay.scan_variants(text)
+        return text, self._combine_rules(triggered, overlay_triggered)
+
+    def scan_regex(
+        self,
+        text: str,
+        triggered: set,
+        metrics: Optional[RuleMetrics] = None,
+        timed: bool = False
+    ) -> List[tuple]:
+        """两层各执行正则确认（见 CompiledRuleSet.scan_regex）"""
+        offset = self._gated_offset
+        base_rules = {rule_id for rule_id in triggered if rule_id < offset}
+        overlay_rules = {rule_id - offset for rule_id in triggered if rule_id >= offset}
+        hits = self._active_hits(self.base.scan_regex(text, base_rules, metrics, timed))
+        overlay_hits = self.overlay.scan_regex(text, overlay_rules, metrics, timed)
+        if not overlay_hits:
+            return hits
+        return hits + overlay_hits if hits else overlay_hits
+
+    def scan_obfuscations(self, text: str) -> List[tuple]:
+        """两层各扫描干扰字符和拼音拼写（见 CompiledRuleSet.scan_obfuscations）"""
+        hits = self._active_hits(self.base.scan_obfuscations(text))
+        overlay_hits = self.overlay.scan_obfuscations(text)
+        if not overlay_hits:
+            return hits
+        return hits + overlay_hits if hits else overlay_hits
+
+
+class RulesetCache:
+    """按内容哈希去重的编译规则集缓存（LRU 淘汰）
+
+    规则内容相同的租户共用同一份编译结果（自动机、``array`` 表、已编译正则），
+    各规则引擎发布的快照是它的浅拷贝，只有版本号和统计计数器各自独立。
+    被淘汰的编译结果在没有规则引擎引用后即可回收。
+    """
+
+    def __init__(self, capacity: int = 32):
+        """初始化缓存
+
+        Args:
+            capacity: 最多缓存的编译规则集数量
+        """
+        self.capacity = max(int(capacity), 1)
+        self._items: "OrderedDict[str, CompiledRuleSet]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, content_hash: str) -> bool:
+        return content_hash in self._items
+
+    def get(self, content_hash: str) -> Optional["CompiledRuleSet"]:
+        """按内容哈希查找编译规则集（命中时标记为最近使用）"""
+        with self._lock:
+            ruleset = self._items.get(content_hash)
+            if ruleset is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(content_hash)
+            self.hits += 1
+            return ruleset
+
+    def put(self, ruleset: "CompiledRuleSet") -> None:
+        """加入编译规则集，超出容量时淘汰最久未使用的"""
+        with self._lock:
+            self._items[ruleset.content_hash] = ruleset
+            self._items.move_to_end(ruleset.content_hash)
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def get_statistics(self) -> Dict:
+        """获取缓存统计信息
+
+        Returns:
+            Dict: 统计信息
+        """
+        return {
+            "size": len(self._items),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+def _isolated_char(text: str, index: int) -> bool:
+    """该位置的字前后都不紧接文字（被空白等拆开的单字）"""
+    return (
+        (index == 0 or not text[index - 1].isalnum())
+        and (index + 1 >= len(text) or not text[index + 1].isalnum())
+    )
+
+
+def _noise_offsets(text: str) -> array:
+    """删除干扰字符后的文本中每个字符在原文中的位置"""
+    offsets = array("I")
+    pos = 0
+    for match in _GAP_NOISE_RE.finditer(text):
+        offsets.extend(range(pos, match.start()))
+        pos = match.end()
+    offsets.extend(range(pos, len(text)))
+    return offsets
+
+
+class RuleStreamScanner:
+    """流式规则扫描器
+
+    用于直播字幕、弹幕等增量到达的文本。AC自动机的匹配状态跨 ``feed`` 调用保留，
+    正则只在有界的回看窗口内执行，每次调用的开销只与新增文本相关。
+    命中位置为整个流中的全局偏移（对应原文）。
+
+    白名单词可能跨越分片，最后 ``最长白名单词长度 - 1`` 个字符会暂缓扫描，
+    直到后续分片到达或调用 ``close``。正则命中要等到后续文本不可能再改变它才上报：
+    有限字面量规则检查是否有字面量可能从不晚于命中起点的位置延伸到未扫描文本，
+    其余规则要求起点加上最大匹配长度不超过已扫描位置（无界正则按窗口长度计）。
+
+    同音字还原、干扰字符容忍和拼音拼写与 ``check_text`` 一样在窗口文本上执行，
+    命中只要完整落在回看窗口内，结果与整段检测一致。
+    """
+
+    def __init__(self, ruleset: CompiledRuleSet, window: int = 256):
+        """初始化扫描器
+
+        Args:
+            ruleset: 规则快照（扫描期间固定使用该快照）
+            window: 正则回看窗口长度（字符数）
+        """
+        self.ruleset = ruleset
+        # 窗口至少容纳最长关键词和最长的干扰字符容忍命中（外加一个前导字符）
+        self.window = max(window, ruleset.max_keyword_length, ruleset.max_noise_span + 1)
+        self.matches: List[StreamMatch] = []
+        self._holdback = max(ruleset.max_whitelist_length - 1, 0)
+        self._closed = False
+
+        # 原文尾部，用于截取命中文本
+        self._original = ""
+        self._original_base = 0
+        self._original_length = 0
+
+        # 已归一化、等待白名单判定的文本及其原文位置
+        self._pending = ""
+        self._pending_offsets = array("I")
+        self._normalized_length = 0
+        self._mask_spans: List[List[int]] = []
+
+        # 已扫描文本的回看窗口（归一化并掩码后）及其原文位置
+        self._window_text = ""
+        self._window_offsets = array("I")
+        self._window_base = 0
+        self._scanned_length = 0
+
+        # 白名单扫描保留的已归一化文本尾部（可能是跨分片白名单词的开头）
+        self._whitelist_tail = ""
+        # 预筛触发的正则规则 -> 最近一次字面量命中的结束位置
+        self._active: Dict[int, int] = {}
+        # 规则 -> 已上报命中的结束位置（同一规则的命中互不重叠）
+        self._last_end: Dict[int, int] = {}
+        # 已上报的命中 (类型, 起始, 结束)，窗口滑过后丢弃
+        self._reported: set = set()
+        # 规则 -> (有限字面量集合, 最长字面量长度)，或一次匹配的最大长度（不超过窗口长度）
+        self._match_limits: Dict[int, object] = {}
+
+    def feed(self, chunk: str) -> List[StreamMatch]:
+        """输入一个文本分片
+
+        Args:
+            chunk: 新到达的文本
+
+        Returns:
+            List[StreamMatch]: 本次新产生的命中
+        """
+        if self._closed:
+            raise RuntimeError("流已关闭")
+        if not chunk:
+            return []
+
+        original_start = self._original_length
+        self._original += chunk
+        self._original_length += len(chunk)
+
+        normalized, offsets = self.ruleset.normalize(chunk)
+        if offsets is None:
+            self._pending_offsets.extend(range(original_start, original_start + len(chunk)))
+        else:
+            self._pending_offsets.extend(offset + original_start for offset in offsets)
+        self._pending += normalized
+        self._normalized_length += len(normalized)
+        self._scan_whitelist(normalized)
+
+        return self._advance(self._normalized_length - self._holdback, final=False)
+
+    def close(self) -> List[StreamMatch]:
+        """结束输入，扫描暂缓的剩余文本
+
+        Returns:
+            List[StreamMatch]: 本次新产生的命中
+        """
+        if self._closed:
+            return []
+        matches = self._advance(self._normalized_length, final=True)
+        self._closed = True
+        return matches
+
+    @property
+    def is_violated(self) -> bool:
+        return bool(self.matches)
+
+    @property
+    def severity(self) -> str:
+        """目前为止的最高严重程度"""
+        max_severity = "none"
+        for match in self.matches:
+            if SEVERITY_ORDER.get(match.severity, 0) > SEVERITY_ORDER.get(max_severity, 0):
+                max_severity = match.severity
+        return max_severity
+
+    def _scan_whitelist(self, normalized: str) -> None:
+        """继续白名单扫描，记录豁免区间
+
+        连同上次保留的尾部一起扫描，只记录结束于新文本的命中。
+        """
+        automaton = self.ruleset.whitelist_automaton
+        if not automaton or not normalized:
+            return
+        tail = self._whitelist_tail
+        text = tail + normalized
+        base = self._normalized_length - len(text)
+        for end_index, length in automaton.iter(text):
+            if end_index < len(tail):
+                continue
+            self._mask_spans.append([base + end_index - length + 1, base + end_index + 1])
+        self._whitelist_tail = text[max(len(text) - self._holdback, 0):] if self._holdback else ""
+
+    def _apply_masks(self, segment: str, start: int) -> str:
+        """对即将扫描的片段应用白名单掩码"""
+        end = start + len(segment)
+        for span_start, span_end in self._mask_spans:
+            if span_start < end and span_end > start:
+                left = max(span_start, start) - start
+                right = min(span_end, end) - start
+                segment = segment[:left] + WHITELIST_MASK * (right - left) + segment[right:]
+        return segment
+
+    def _advance(self, limit: int, final: bool) -> List[StreamMatch]:
+        """扫描到全局归一化位置 limit 为止
+
+        Args:
+            limit: 扫描截止位置
+            final: 是否为流的结尾（否则延后上报紧贴扫描边界的正则命中，
+                避免贪婪量词在后续分片到达前被截断）
+        """
+        count = limit - self._scanned_length
+        if count <= 0 and not final:
+            return []
+
+        segment = self._apply_masks(self._pending[:count], self._scanned_length)
+        self._window_offsets.extend(self._pending_offsets[:count])
+        self._pending = self._pending[count:]
+        del self._pending_offsets[:count]
+        self._window_text += segment
+        self._scanned_length += count
+
+        new_matches: List[StreamMatch] = []
+
+        # AC自动机从新片段前 ``最长关键词长度 - 1`` 个字符开始扫描，只取结束于新片段的命中
+        # （不用 ``iter().set()`` 保留状态：pyahocorasick 在切换到不同宽度的字符串
+        # 时会破坏内存，如含表情的分片）
+        if segment:
+            overlap = min(self.ruleset.max_keyword_length - 1, len(self._window_text) - len(segment))
+            text = self._window_text[len(self._window_text) - len(segment) - overlap:]
+            base = self._scanned_length - len(text)
+            for end_index, keyword_rules, rule_ids, length in self.ruleset.iter_keywords(text):
+                if end_index < overlap:
+                    continue
+                end_index += base
+                for category, vtype, severity in keyword_rules:
+                    self._emit(new_matches, category, vtype, severity,
+                               end_index - length + 1, end_index + 1)
+                for rule_id in rule_ids:
+                    self._active[rule_id] = end_index + 1
+
+        # 字面量仍在窗口内的规则保持激活
+        self._active = {
+            rule_id: end for rule_id, end in self._active.items() if end > self._window_base
+        }
+
+        # 同音字/替换字先还原，再在回看窗口内执行正则
+        window_text, variant_triggered = self.ruleset.scan_variants(self._window_text)
+        triggered = set(self._active)
+        if variant_triggered:
+            triggered |= variant_triggered
+        for pattern_info, start, end, _ in self.ruleset.scan_regex(window_text, triggered):
+            start += self._window_base
+            end += self._window_base
+            key = id(pattern_info)
+            if start < self._last_end.get(key, 0):
+                continue
+            # 贪婪量词（如改写后的 ``.{0,64}``）可能被后续分片延长，匹配不可能再变化时才上报
+            if not final and (end >= self._scanned_length or not self._settled(pattern_info, start, window_text)):
+                continue
+            self._last_end[key] = end
+            self._emit(new_matches, pattern_info["category"], pattern_info["type"],
+                       pattern_info["severity"], start, end)
+
+        # 插入了干扰字符、用拼音拼写的关键词；紧贴扫描边界的命中同样延后上报
+        # （下一个字符决定拼写是否独立、被拆开的字是否孤立）
+        for pattern_info, start, end, _ in self.ruleset.scan_obfuscations(window_text):
+            start += self._window_base
+            end += self._window_base
+            if end >= self._scanned_length and not final:
+                continue
+            self._emit(new_matches, pattern_info["category"], pattern_info["type"],
+                       pattern_info["severity"], start, end)
+
+        self._trim()
+        self.matches.extend(new_matches)
+        return new_matches
+
+    def _settled(self, pattern_info: Dict, start: int, window_text: str) -> bool:
+        """起点为 start 的正则命中是否不会再被后续文本改变
+
+        Args:
+            pattern_info: 规则信息
+            start: 命中起点（全局归一化位置）
+            window_text: 执行正则的窗口文本
+        """
+        key = id(pattern_info)
+        limit = self._match_limits.get(key)
+        if limit is None:
+            pattern = pattern_info["pattern"].pattern
+            limit = extract_exact_literals(pattern)
+            if limit is not None:
+                limit = (limit, max(len(literal) for literal in limit))
+            else:
+                width = max_match_width(pattern)
+                limit = self.window if width is None else min(width, self.window)
+            self._match_limits[key] = limit
+
+        scanned = self._scanned_length
+        if isinstance(limit, int):
+            return start + limit <= scanned
+
+        # 字面量从 position 开始、越过已扫描位置，且已扫描部分与字面量开头一致
+        literals, longest = limit
+        for position in range(max(scanned - longest + 1, self._window_base), start + 1):
+            known = window_text[position - self._window_base:]
+            if any(len(literal) > len(known) and literal.startswith(known) for literal in literals):
+                return False
+        return True
+
+    def _emit(
+        self,
+        matches: List[StreamMatch],
+        category: str,
+        vtype: str,
+        severity: str,
+        start: int,
+        end: int
+    ) -> None:
+        """把窗口内的命中映射回原文并记录（同一区间同一类型只上报一次）"""
+        record = (vtype, start, end)
+        if record in self._reported:
+            return
+        self._reported.add(record)
+
+        original_start = self._window_offsets[start - self._window_base]
+        original_end = self._window_offsets[end - 1 - self._window_base] + 1
+        keyword = self._original[original_start - self._original_base:original_end - self._original_base]
+        matches.append(StreamMatch(
+            violation_type=vtype,
+            severity=severity,
+            category=category,
+            start=original_start,
+            end=original_end,
+            keyword=keyword
+        ))
+
+    def _trim(self) -> None:
+        """裁剪回看窗口和原文缓冲区"""
+        excess = len(self._window_text) - self.window
+        if excess > 0:
+            self._window_text = self._window_text[excess:]
+            del self._window_offsets[:excess]
+            self._window_base += excess
+
+        if self._window_offsets:
+            keep_from = self._window_offsets[0]
+        elif self._pending_offsets:
+            keep_from = self._pending_offsets[0]
+        else:
+            keep_from = self._original_length
+        drop = keep_from - self._original_base
+        if drop > 0:
+            self._original = self._original[drop:]
+            self._original_base = keep_from
+
+        self._mask_spans = [span for span in self._mask_spans if span[1] > self._scanned_length]
+        if self._reported:
+            self._reported = {record for record in self._reported if record[2] > self._window_base}
 
 
 class RuleEngine:
     """规则引擎"""
 
-    def __init__(self, rules_path: str = "config/rules.yaml"):
+    def __init__(
+        self,
+        rules_path: str = "config/rules.yaml",
+        cache_dir: Optional[str] = None,
+        metrics_enabled: bool = True,
+        metrics_sample_rate: int = DEFAULT_SAMPLE_RATE,
+        ruleset: Optional[CompiledRuleSet] = None,
+        overlay_path: Optional[str] = None,
+        ruleset_cache: Optional[RulesetCache] = None
+    ):
         """初始化规则引擎
-        
+
         Args:
             rules_path: 规则配置文件路径
+            cache_dir: 编译产物缓存目录，为 None 时不使用缓存
+            metrics_enabled: 是否统计规则命中和正则耗时
+            metrics_sample_rate: 每多少条文本采样一次正则耗时
+            ruleset: 已编译的规则快照，传入时直接使用而不读取规则文件
+                （批量扫描的工作进程使用）
+            overlay_path: 叠加在基础规则上的租户规则文件（见 merge_rule_overlay）
+            ruleset_cache: 多个规则引擎共享的编译规则集缓存
         """
         self.rules_path = Path(rules_path)
-        self.blacklist_rules: Dict = {}
-        self.whitelist: List[str] = []
-        self.automaton = None
-        self.regex_patterns: Dict = {}
+        self.overlay_path = Path(overlay_path) if overlay_path else None
+        self.ruleset_cache = ruleset_cache
+        self.cache_dir = Path(cache_dir) if cache_dir else None
         self.last_reload_time: Optional[datetime] = None
-        
-        self.load_rules()
-
-    def load_rules(self) -> None:
-        """从YAML文件加载规则"""
-        if not self.rules_path.exists():
-            raise FileNotFoundError(f"规则文件不存在: {self.rules_path}")
-
-        with open(self.rules_path, "r", encoding="utf-8") as f:
-            rules_data = yaml.safe_load(f)
-
-        self.blacklist_rules = rules_data.get("blacklist", {})
-        self.whitelist = rules_data.get("whitelist", [])
-        
-        # 构建AC自动机（用于精确匹配）
-        self._build_automaton()
-        
-        # 编译正则表达式
-        self._compile_regex_patterns()
-        
-        self.last_reload_time = datetime.now()
+        self.metrics_enabled = metrics_enabled
+        self.metrics_sample_rate = metrics_sample_rate
 
-    def _build_automaton(self) -> None:
-        """构建AC自动机用于快速多模式匹配"""
-        self.automaton = ahocorasick.Automaton()
-        
-        # 添加所有需要精确匹配的关键词
-        has_words = False
-        for category, rules in self.blacklist_rules.items():
-            for rule in rules:
-                pattern = rule.get("pattern", "")
-                # 如果不是正则表达式（不包含特殊字符），添加到AC自动机
-                if not any(char in pattern for char in r"()[]{}.*+?|^\\$\\\\"):
-                    self.automaton.add_word(
-                        pattern,
-                        (category, rule.get("type"), rule.get("severity"))
+        # 当前规则快照，热更新时整体替换（单次属性赋值，读者无需加锁）
+        self._ruleset: Optional[CompiledRuleSet] = None
+        self._version = 0
+        self._reload_lock = threading.Lock()
+
+        # 短路模式的规则顺序缓存：模式 -> (规则快照, 排序时的检测文本数, 规则顺序)
+        self._rule_orders: Dict[str, tuple] = {}
+
+        # 外部词库文件（随规则文件一起监听）
+        self._lexicon_paths: List[Path] = []
+
+        # 规则文件监听
+        self._watch_thread: Optional[threading.Thread] = None
+        self._watch_stop = threading.Event()
+
+        if ruleset is not None:
+            self._ruleset = ruleset
+            self._version = ruleset.version
+        else:
+            self.load_rules()
+
+    @property
+    def ruleset(self) -> CompiledRuleSet:
+        """当前规则快照"""
+        return self._ruleset
+
+    @property
+    def version(self) -> int:
+        """当前规则版本号（每次发布新快照递增）"""
+        return self._ruleset.version
+
+    @property
+    def content_hash(self) -> Optional[str]:
+        return self._ruleset.content_hash if self._ruleset else None
+
+    @property
+    def blacklist_rules(self) -> Dict:
+        return self._ruleset.blacklist_rules
+
+    @property
+    def whitelist(self) -> List[str]:
+        return self._ruleset.whitelist
+
+    @property
+    def automaton(self):
+        return self._ruleset.automaton
+
+    @property
+    def whitelist_automaton(self):
+        return self._ruleset.whitelist_automaton
+
+    @property
+    def regex_patterns(self) -> Dict:
+        return self._ruleset.regex_patterns
+
+    @property
+    def gated_rules(self) -> List[Dict]:
+        return self._ruleset.gated_rules
+
+    @property
+    def merged_rules(self) -> List[Dict]:
+        return self._ruleset.merged_rules
+
+    @property
+    def standalone_rules(self) -> List[Dict]:
+        return self._ruleset.standalone_rules
+
+    @property
+    def combined_pattern(self) -> Optional[re.Pattern]:
+        return self._ruleset.combined_pattern
+
+    def load_rules(self, force: bool = False) -> bool:
+        """从YAML文件加载规则
+
+        以规则文件内容哈希为键：内容未变化时直接返回；共享缓存或缓存目录中已有
+        对应编译产物时直接复用，否则重新编译并写入缓存。
+        配置了租户规则文件时，基础规则集按基础规则的哈希共享，租户规则单独编译为
+        增量规则集（哈希覆盖基础规则哈希和租户规则文件），两层组合为
+        ``LayeredRuleSet``；租户规则覆盖了归一化等配置段时，两层无法共用配置，
+        退回到合并后整体编译。
+        新快照构建完成后才替换当前快照，构建期间检测请求不受影响。
+
+        Args:
+            force: 内容未变化时也强制重新编译
+
+        Returns:
+            bool: 规则是否发生了变化
+        """
+        with self._reload_lock:
+            if not self.rules_path.exists():
+                raise FileNotFoundError(f"规则文件不存在: {self.rules_path}")
+
+            # 先按文件内容计算哈希，只有编译产物未命中时才解析 YAML
+            raw = self.rules_path.read_bytes()
+            source, rules_data = _rule_source(raw, self.cache_dir)
+
+            # 编译结果与 pypinyin 是否可用有关；租户规则和外部词库内容也计入哈希
+            prefix = f"v{ARTIFACT_VERSION}:{int(PYPINYIN_AVAILABLE)}:".encode("utf-8")
+            digest = hashlib.sha256(prefix + raw)
+            lexicons = self._lexicon_specs(source["lexicons"], self.rules_path.parent)
+            layered = merged = False
+            if self.overlay_path is not None:
+                if not self.overlay_path.exists():
+                    raise FileNotFoundError(f"租户规则文件不存在: {self.overlay_path}")
+                overlay_raw = self.overlay_path.read_bytes()
+                overlay_source, overlay_data = _rule_source(overlay_raw, self.cache_dir)
+                overlay_lexicons = self._lexicon_specs(overlay_source["lexicons"], self.overlay_path.parent)
+                if overlay_source["overrides_config"]:
+                    digest.update(f"\noverlay:{len(overlay_raw)}\n".encode("utf-8"))
+                    digest.update(overlay_raw)
+                    lexicons += overlay_lexicons
+                    merged = True
+                else:
+                    layered = True
+            _hash_lexicons(digest, lexicons)
+            base_hash = content_hash = digest.hexdigest()
+
+            if layered:
+                digest = hashlib.sha256(prefix + f"layer:{base_hash}\n".encode("utf-8") + overlay_raw)
+                _hash_lexicons(digest, overlay_lexicons)
+                content_hash = digest.hexdigest()
+                self._lexicon_paths = [lexicon["path"] for lexicon in lexicons + overlay_lexicons]
+            else:
+                self._lexicon_paths = [lexicon["path"] for lexicon in lexicons]
+
+            if not force and content_hash == self.content_hash:
+                return False
+
+            def build_base() -> CompiledRuleSet:
+                data = rules_data if rules_data is not None else _parse_rules(raw)
+                if merged:
+                    data = merge_rule_overlay(
+                        data,
+                        overlay_data if overlay_data is not None else _parse_rules(overlay_raw),
+                        self.overlay_path.parent
                     )
-                    has_words = True
-        
-        # 只有添加了词后才调用 make_automaton
-        if has_words:
-            self.automaton.make_automaton()
+                return CompiledRuleSet(
+                    data.get("blacklist", {}),
+                    data.get("whitelist", []),
+                    base_hash,
+                    data.get("normalization"),
+                    data.get("regex_guard"),
+                    data.get("noise_tolerance"),
+                    data.get("variant_index"),
+                    _load_lexicons(lexicons)
+                )
 
-    def _compile_regex_patterns(self) -> None:
-        """编译正则表达式模式"""
-        self.regex_patterns = {}
-        
-        for category, rules in self.blacklist_rules.items():
-            self.regex_patterns[category] = []
-            for rule in rules:
-                pattern = rule.get("pattern", "")
-                try:
-                    compiled = re.compile(pattern)
-                    self.regex_patterns[category].append({
-                        "pattern": compiled,
-                        "type": rule.get("type"),
-                        "severity": rule.get("severity"),
-                        "original": pattern
-                    })
-                except re.error as e:
-                    print(f"正则表达式编译失败: {pattern}, 错误: {e}")
+            ruleset = self._compiled_ruleset(base_hash, force, build_base)
+
+            if layered:
+                # 增量规则集：白名单包含基础白名单，配置段沿用基础规则。
+                # 增量规则集不是完整快照，编译产物使用单独的键，不能被当作组合快照加载
+                base = ruleset
+                overlay_hash = hashlib.sha256(f"overlay:{content_hash}".encode("utf-8")).hexdigest()
+
+                def build_overlay() -> CompiledRuleSet:
+                    data = overlay_data if overlay_data is not None else _parse_rules(overlay_raw)
+                    return CompiledRuleSet(
+                        data.get("blacklist") or {},
+                        list(dict.fromkeys(itertools.chain(base.whitelist, data.get("whitelist") or []))),
+                        overlay_hash,
+                        lexicons=_load_lexicons(overlay_lexicons),
+                        rule_id_base=len(base.rules),
+                        **base.config
+                    )
+
+                overlay = self._compiled_ruleset(overlay_hash, force, build_overlay)
+                ruleset = LayeredRuleSet(
+                    base, overlay, overlay_source["disabled_categories"], content_hash
+                )
+            elif self.ruleset_cache is not None:
+                # 共享的编译结果保持不变，发布浅拷贝（版本号和统计各自独立）
+                ruleset = copy.copy(ruleset)
+
+            self._version += 1
+            ruleset.version = self._version
+
+            # 统计计数器挂在快照上（规则ID随快照变化），未修改的规则保留累计值
+            ruleset.metrics = RuleMetrics(
+                [(rule["category"], rule["type"], rule["original"]) for rule in ruleset.rules],
+                self.metrics_sample_rate
+            )
+            if self._ruleset is not None:
+                ruleset.metrics.inherit(self._ruleset.metrics)
+
+            # 原子替换
+            self._ruleset = ruleset
+            self.last_reload_time = datetime.now()
+            return True
+
+    def _compiled_ruleset(self, content_hash: str, force: bool, build) -> CompiledRuleSet:
+        """按内容哈希获取编译规则集：共享缓存、编译产物文件，都没有时编译并写入
+
+        Args:
+            content_hash: 内容哈希
+            force: 不使用缓存，重新编译
+            build: 编译函数
+
+        Returns:
+            CompiledRuleSet: 编译规则集（共享，不可修改）
+        """
+        ruleset = None
+        if not force:
+            if self.ruleset_cache is not None:
+                ruleset = self.ruleset_cache.get(content_hash)
+            if ruleset is None:
+                ruleset = self._load_artifact(content_hash)
+                if ruleset is not None and self.ruleset_cache is not None:
+                    self.ruleset_cache.put(ruleset)
+        if ruleset is None:
+            ruleset = build()
+            self._save_artifact(ruleset)
+            if self.ruleset_cache is not None:
+                self.ruleset_cache.put(ruleset)
+        return ruleset
+
+    def _lexicon_specs(self, items: List[Dict], base_dir: Path) -> List[Dict]:
+        """外部词库配置，相对路径以所在规则文件的目录为基准"""
+        lexicons = []
+        for item in items:
+            path = Path(item["path"])
+            if not path.is_absolute():
+                path = base_dir / path
+            lexicons.append({
+                "path": path,
+                "category": item.get("category"),
+                "type": item.get("type"),
+                "severity": item["severity"]
+            })
+        return lexicons
+
+    def prepare_for_fork(self) -> None:
+        """在 fork 工作进程之前调用
+
+        把已加载的对象移出垃圾回收跟踪（``gc.freeze``），子进程做垃圾回收时
+        不会改写这些对象，编译好的自动机和 ``array`` 表所在的内存页保持共享。
+        规则需要在父进程中加载，子进程各自热更新后的快照不再共享。
+        """
+        gc.collect()
+        gc.freeze()
+
+    def _artifact_path(self, content_hash: str) -> Optional[Path]:
+        """编译产物文件路径"""
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / f"rules-{content_hash}.pkl"
+
+    def _load_artifact(self, content_hash: str) -> Optional[CompiledRuleSet]:
+        """从缓存加载编译产物
+
+        Args:
+            content_hash: 规则文件内容哈希
 
-    def check_text(self, text: str) -> RuleResult:
+        Returns:
+            Optional[CompiledRuleSet]: 规则快照，缓存不存在或损坏时返回 None
+        """
+        path = self._artifact_path(content_hash)
+        if path is None or not path.exists():
+            return None
+
+        try:
+            with open(path, "rb") as f:
+                ruleset = pickle.load(f)
+            if not isinstance(ruleset, CompiledRuleSet) or ruleset.content_hash != content_hash:
+                return None
+            return ruleset
+        except Exception as e:
+            print(f"规则编译产物加载失败: {path}, 错误: {e}")
+            return None
+
+    def _save_artifact(self, ruleset: CompiledRuleSet, path: Optional[Path] = None) -> None:
+        """写入编译产物（先写临时文件再原子替换，避免并发进程读到半个文件）
+
+        Args:
+            ruleset: 规则快照
+            path: 写入路径，默认为缓存目录中的产物路径
+        """
+        path = path or self._artifact_path(ruleset.content_hash)
+        if path is None:
+            return
+
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(ruleset, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, path)
+            except Exception:
+                os.unlink(tmp_path)
+                raise
+        except Exception as e:
+            print(f"规则编译产物写入失败: {path}, 错误: {e}")
+
+    def check_text(self, text: str, mode: str = "all") -> RuleResult:
         """检查文本是否违规
-        
+
         Args:
             text: 待检测文本
-            
+            mode: 检测模式。all 收集全部命中（证据展示用）；first_critical 命中
+                critical 规则即停止；any 任一命中即停止。短路模式下每条规则只取
+                第一个匹配，命中列表不完整
+
         Returns:
             RuleResult: 检测结果
         """
+        if mode not in SCAN_MODES:
+            raise ValueError(f"不支持的检测模式: {mode}")
         if not text:
-            return RuleResult(
-                is_violated=False,
-                violation_types=[],
-                matched_keywords=[],
-                matched_positions=[],
-                severity="none",
-                evidence=""
+            return self._empty_result()
+
+        # 整个检测过程使用同一个快照，热更新不会导致结果不一致
+        ruleset = self._ruleset
+
+        # 归一化（全角、繁体、零宽字符等），偏移表用于映射回原文
+        normalized, offsets = ruleset.normalize(text)
+
+        # 白名单豁免区间原位掩码，命中位置不变
+        masked = ruleset.mask_whitelist(normalized)
+
+        # 使用AC自动机进行快速匹配，同时得到需要确认的正则规则
+        keyword_hits, triggered = ruleset.scan_automaton(masked)
+
+        metrics = ruleset.metrics if self.metrics_enabled else None
+        timed = metrics is not None and metrics.record_text(text)
+
+        return self._build_result(
+            ruleset, text, masked, offsets, keyword_hits, triggered, metrics, timed, mode
+        )
+
+    def stream(self, window: int = 256) -> RuleStreamScanner:
+        """创建流式扫描器（使用当前规则快照）
+
+        Args:
+            window: 正则回看窗口长度（字符数）
+
+        Returns:
+            RuleStreamScanner: 流式扫描器
+        """
+        return RuleStreamScanner(self._ruleset, window)
+
+    def check_texts(
+        self,
+        texts: List[str],
+        concat: bool = True,
+        mode: str = "all"
+    ) -> List[RuleResult]:
+        """批量检查文本
+
+        用分隔符把整批文本拼接后，白名单掩码和AC自动机各只扫描一遍，
+        再按偏移量把命中分配回各条文本，摊薄逐条调用的开销。
+
+        Args:
+            texts: 待检测文本列表
+            concat: 是否拼接后共享自动机扫描，为 False 时逐条调用 check_text
+            mode: 检测模式（见 check_text）
+
+        Returns:
+            List[RuleResult]: 与输入一一对应的检测结果
+        """
+        if mode not in SCAN_MODES:
+            raise ValueError(f"不支持的检测模式: {mode}")
+        ruleset = self._ruleset
+        if not concat or ruleset.separator_conflict:
+            return [self.check_text(text, mode) for text in texts]
+
+        results: List[Optional[RuleResult]] = [None] * len(texts)
+        indices = []
+        normalized_texts = []
+        offset_maps = []
+        starts = []
+        ends = []
+        pos = 0
+        for index, text in enumerate(texts):
+            if not text:
+                results[index] = self._empty_result()
+                continue
+            normalized, offsets = ruleset.normalize(text)
+            indices.append(index)
+            normalized_texts.append(normalized)
+            offset_maps.append(offsets)
+            starts.append(pos)
+            ends.append(pos + len(normalized))
+            pos += len(normalized) + len(BATCH_SEPARATOR)
+
+        if not indices:
+            return results
+
+        buffer = BATCH_SEPARATOR.join(normalized_texts)
+        masked = ruleset.mask_whitelist(buffer)
+
+        # 单次自动机扫描，命中按结束位置递增，顺序分配给各条文本
+        keyword_hits = [_NO_HITS] * len(indices)
+        triggered = [_NO_RULES] * len(indices)
+        item = 0
+        for end_index, keyword_rules, rule_ids, length in ruleset.iter_keywords(masked):
+            while end_index >= ends[item]:
+                item += 1
+            local_end = end_index - starts[item] + 1
+            if keyword_rules:
+                if keyword_hits[item] is _NO_HITS:
+                    keyword_hits[item] = []
+                for category, vtype, severity in keyword_rules:
+                    keyword_hits[item].append((local_end - length, local_end, category, vtype, severity))
+            if rule_ids:
+                if triggered[item] is _NO_RULES:
+                    triggered[item] = set()
+                triggered[item].update(rule_ids)
+
+        metrics = ruleset.metrics if self.metrics_enabled else None
+        for item, index in enumerate(indices):
+            if masked is buffer:
+                text = normalized_texts[item]
+            else:
+                text = masked[starts[item]:ends[item]]
+            timed = metrics is not None and metrics.record_text(texts[index])
+            results[index] = self._build_result(
+                ruleset, texts[index], text, offset_maps[item],
+                keyword_hits[item], triggered[item], metrics, timed, mode
+            )
+
+        return results
+
+    def check_bulk(
+        self,
+        texts: Iterable[str],
+        workers: Optional[int] = None,
+        chunk_size: int = BULK_CHUNK_SIZE,
+        mode: str = "all",
+        report: Optional[BulkScanReport] = None
+    ) -> Iterator[RuleResult]:
+        """多进程批量检测（规则变更后回扫历史语料）
+
+        文本按 ``chunk_size`` 分块发给进程池，每块在工作进程内走 check_texts。
+        工作进程不重新编译规则：支持 fork 时直接继承父进程的规则快照
+        （先 ``prepare_for_fork`` 保持内存页共享），否则从编译产物文件加载。
+        输入按需读取，在途任务块数有上限，可以处理不能一次装入内存的语料。
+        工作进程不更新父进程的规则统计。
+
+        Args:
+            texts: 待检测文本（可以是生成器）
+            workers: 工作进程数，默认为 CPU 核数；不大于 1 时在当前进程中分块检测
+            chunk_size: 每个任务块的文本数
+            mode: 检测模式（见 check_text）
+            report: 吞吐统计，传入时随扫描进度更新
+
+        Returns:
+            Iterator[RuleResult]: 与输入顺序一致的检测结果
+        """
+        if mode not in SCAN_MODES:
+            raise ValueError(f"不支持的检测模式: {mode}")
+        workers = workers or os.cpu_count() or 1
+        report = report if report is not None else BulkScanReport()
+        report.workers = max(workers, 1)
+        return self._iter_bulk(_chunked(texts, max(chunk_size, 1)), workers, mode, report)
+
+    def _iter_bulk(
+        self,
+        chunks: Iterator[List[str]],
+        workers: int,
+        mode: str,
+        report: BulkScanReport
+    ) -> Iterator[RuleResult]:
+        """按输入顺序产出批量检测结果（见 check_bulk）"""
+        start = time.perf_counter()
+
+        def collect(chunk: List[str], results: List[RuleResult]) -> List[RuleResult]:
+            report.chunks += 1
+            report.texts += len(chunk)
+            report.chars += sum(len(text) for text in chunk if text)
+            report.violations += sum(1 for result in results if result.is_violated)
+            report.elapsed = time.perf_counter() - start
+            return results
+
+        if workers <= 1:
+            for chunk in chunks:
+                yield from collect(chunk, self.check_texts(chunk, mode=mode))
+            return
+
+        global _bulk_parent_ruleset
+        ruleset = self._ruleset
+        context = _bulk_context()
+        artifact_path = None
+        temp_dir = None
+        frozen = False
+        try:
+            if context.get_start_method() == "fork":
+                _bulk_parent_ruleset = ruleset
+                self.prepare_for_fork()
+                frozen = True
+            else:
+                # 写出当前快照本身（缓存目录中的产物可能只是组合快照的一层）
+                temp_dir = tempfile.TemporaryDirectory()
+                artifact_path = Path(temp_dir.name) / f"rules-{ruleset.content_hash}.pkl"
+                self._save_artifact(ruleset, artifact_path)
+                # 工作进程初始化失败时进程池会不断重建工作进程，先在父进程中确认产物可用
+                _load_bulk_snapshot(str(artifact_path), ruleset.content_hash)
+
+            pool = context.Pool(
+                workers,
+                initializer=_init_bulk_worker,
+                initargs=(str(artifact_path) if artifact_path else None, ruleset.content_hash, mode)
             )
+            with pool:
+                if frozen:
+                    gc.unfreeze()
+                    frozen = False
+                pending = deque()
+                for chunk in chunks:
+                    pending.append((chunk, pool.apply_async(_bulk_check_chunk, (chunk,))))
+                    if len(pending) >= workers * BULK_PENDING_PER_WORKER:
+                        chunk, result = pending.popleft()
+                        yield from collect(chunk, result.get())
+                while pending:
+                    chunk, result = pending.popleft()
+                    yield from collect(chunk, result.get())
+        finally:
+            if frozen:
+                gc.unfreeze()
+            _bulk_parent_ruleset = None
+            if temp_dir is not None:
+                temp_dir.cleanup()
 
-        # 检查白名单
-        for whitelist_item in self.whitelist:
-            if whitelist_item in text:
-                text = text.replace(whitelist_item, "")
+    def _empty_result(self) -> RuleResult:
+        """空文本的检测结果"""
+        return EMPTY_RESULT
 
-        violation_types = []
-        matched_keywords = []
-        matched_positions = []
+    def _build_result(
+        self,
+        ruleset: CompiledRuleSet,
+        original_text: str,
+        text: str,
+        offsets,
+        keyword_hits: List[tuple],
+        triggered: set,
+        metrics: Optional[RuleMetrics] = None,
+        timed: bool = False,
+        mode: str = "all"
+    ) -> RuleResult:
+        """执行正则确认并汇总检测结果
+
+        Args:
+            ruleset: 规则快照
+            original_text: 原始文本
+            text: 归一化并做白名单掩码后的文本
+            offsets: 归一化偏移表（None 表示位置与原文一一对应）
+            keyword_hits: AC自动机关键词命中
+            triggered: 预筛触发的正则规则序号
+            metrics: 统计计数器（None 表示不统计）
+            timed: 是否对本条文本的正则计时
+            mode: 检测模式（见 check_text）
+
+        Returns:
+            RuleResult: 检测结果，无命中时返回共享的 ``EMPTY_RESULT``
+        """
+        # 命中记录在第一次命中时才分配，按 (类型, 起始, 结束) 去重并保持首次出现顺序
+        records = None
         max_severity = "none"
-        
-        severity_order = {"none": 0, "low": 1, "medium": 2, "high": 3, "critical": 4}
+        severity_order = SEVERITY_ORDER
+        original_length = len(original_text)
 
-        # 使用AC自动机进行快速匹配（只有在自动机已构建时）
-        if self.automaton:
-            try:
-                for end_index, (category, vtype, severity) in self.automaton.iter(text):
-                    violation_types.append(vtype)
-                    matched_positions.append((end_index - len(text) + 1, end_index))
-                    if severity_order.get(severity, 0) > severity_order.get(max_severity, 0):
-                        max_severity = severity
-            except AttributeError:
-                # 如果自动机未构建，跳过
-                pass
+        if keyword_hits:
+            records = {}
+            for start, end, category, vtype, severity in keyword_hits:
+                start, end = map_span(offsets, start, end, original_length)
+                records[(vtype, start, end)] = (None, vtype, severity, category, start, end)
+                if severity_order.get(severity, 0) > severity_order.get(max_severity, 0):
+                    max_severity = severity
+
+        # 同音字/替换字写成的字面量先还原（长度不变，位置仍对应原文）
+        text, variant_triggered = ruleset.scan_variants(text)
+        if variant_triggered:
+            triggered = triggered | variant_triggered
+
+        # 正则确认，以及插入了干扰字符、用拼音拼写的关键词
+        if mode == "all":
+            rule_hits = (
+                ruleset.scan_regex(text, triggered, metrics, timed),
+                ruleset.scan_obfuscations(text)
+            )
+        else:
+            rule_hits = (self._short_circuit_hits(
+                ruleset, text, keyword_hits, triggered, metrics, timed, mode
+            ),)
+        for hits in rule_hits:
+            if not hits:
+                continue
+            if records is None:
+                records = {}
+            for pattern_info, start, end, keyword in hits:
+                if metrics is not None:
+                    metrics.hits[pattern_info["id"]] += 1
+
+                # 位置映射回原文；与关键词命中重合时以带规则ID的记录为准
+                start, end = map_span(offsets, start, end, original_length)
+                vtype = pattern_info["type"]
+                severity = pattern_info["severity"]
+                records[(vtype, start, end)] = (
+                    pattern_info["id"], vtype, severity, pattern_info["category"], start, end
+                )
+                if severity_order.get(severity, 0) > severity_order.get(max_severity, 0):
+                    max_severity = severity
 
-        # 使用正则表达式匹配
-        for category, patterns in self.regex_patterns.items():
-            for pattern_info in patterns:
-                matches = pattern_info["pattern"].finditer(text)
-                for match in matches:
-                    keyword = match.group()
-                    matched_keywords.append(keyword)
-                    violation_types.append(pattern_info["type"])
-                    matched_positions.append((match.start(), match.end()))
-                    
-                    severity = pattern_info["severity"]
-                    if severity_order.get(severity, 0) > severity_order.get(max_severity, 0):
-                        max_severity = severity
-
-        # 去重
-        violation_types = list(set(violation_types))
-        matched_keywords = list(set(matched_keywords))
-
-        is_violated = len(violation_types) > 0
-        evidence = f"检测到违规关键词: {', '.join(matched_keywords[:5])}" if matched_keywords else ""
-
-        return RuleResult(
-            is_violated=is_violated,
-            violation_types=violation_types,
-            matched_keywords=matched_keywords,
-            matched_positions=matched_positions,
-            severity=max_severity,
-            evidence=evidence
+        if not records:
+            return EMPTY_RESULT
+
+        records = tuple(records.values())
+        matched_positions = array("l")
+        for record in records:
+            matched_positions.append(record[4])
+            matched_positions.append(record[5])
+        return RuleResult._compact(
+            tuple(dict.fromkeys(record[1] for record in records)),
+            tuple(dict.fromkeys(original_text[record[4]:record[5]] for record in records)),
+            matched_positions,
+            max_severity,
+            records,
+            original_text
         )
 
+    def _short_circuit_hits(
+        self,
+        ruleset: CompiledRuleSet,
+        text: str,
+        keyword_hits: List[tuple],
+        triggered: set,
+        metrics: Optional[RuleMetrics],
+        timed: bool,
+        mode: str
+    ) -> List[tuple]:
+        """短路模式：按规则顺序逐条确认，出现决定结论的命中后立即停止
+
+        Returns:
+            List[tuple]: (规则信息, 起始位置, 结束位置, 命中文本) 列表
+        """
+        if mode == "any":
+            def decisive(severity: str) -> bool:
+                return True
+        else:
+            def decisive(severity: str) -> bool:
+                return severity == "critical"
+
+        # 关键词命中由自动机免费得到
+        if any(decisive(severity) for *_, severity in keyword_hits):
+            return _NO_HITS
+
+        candidates = {ruleset.gated_rules[rule_id]["id"] for rule_id in triggered}
+        hits = []
+        clock = time.perf_counter_ns
+        for pattern_info in self._rule_order(ruleset, mode):
+            # 有字面量的规则只在预筛触发时执行
+            if pattern_info["literals"] and pattern_info["id"] not in candidates:
+                continue
+            began = clock() if timed else 0
+            match = _first_match(ruleset, pattern_info, text, metrics)
+            if timed:
+                metrics.record_regex_time(pattern_info["id"], clock() - began)
+            if match is None:
+                continue
+            hits.append((pattern_info, match.start(), match.end(), match.group()))
+            if decisive(pattern_info["severity"]):
+                return hits
+
+        for hit in ruleset.scan_obfuscations(text):
+            hits.append(hit)
+            if decisive(hit[0]["severity"]):
+                break
+        return hits
+
+    def _rule_order(self, ruleset: CompiledRuleSet, mode: str) -> List[Dict]:
+        """短路模式的规则顺序
+
+        命中率高、耗时低的规则排在前面（命中次数 / 平均正则耗时，来自运行时统计），
+        first_critical 模式下 critical 规则整体优先。每检测 ``RULE_ORDER_REFRESH``
+        条文本重新排序一次，统计关闭时按严重程度和规则顺序。
+
+        Args:
+            ruleset: 规则快照
+            mode: 检测模式
+
+        Returns:
+            List[Dict]: 排序后的规则信息
+        """
+        metrics = ruleset.metrics if self.metrics_enabled else None
+        scanned = metrics.texts_scanned if metrics is not None else 0
+        cached = self._rule_orders.get(mode)
+        if cached is not None and cached[0] is ruleset and scanned - cached[1] < RULE_ORDER_REFRESH:
+            return cached[2]
+
+        def priority(pattern_info: Dict) -> tuple:
+            rule_id = pattern_info["id"]
+            score = 0.0
+            if metrics is not None:
+                samples = metrics.regex_samples[rule_id]
+                cost = metrics.regex_time_ns[rule_id] / samples if samples else DEFAULT_RULE_COST_NS
+                score = (metrics.hits[rule_id] + 1) / max(cost, 1)
+            severity_rank = SEVERITY_ORDER.get(pattern_info["severity"], 0) if mode == "first_critical" else 0
+            return (-severity_rank, -score, rule_id)
+
+        order = sorted(ruleset.scan_rules, key=priority)
+        self._rule_orders[mode] = (ruleset, scanned, order)
+        return order
+
     def hot_reload(self) -> bool:
         """热更新规则（不重启服务）
-        
+
+        规则文件内容未变化时不做任何处理。
+
         Returns:
             bool: 是否更新成功
         """
@@ -182,17 +2679,165 @@ class RuleEngine:
             print(f"规则热更新失败: {e}")
             return False
 
+    def hot_reload_async(self) -> threading.Thread:
+        """在后台线程中热更新规则
+
+        Returns:
+            threading.Thread: 执行热更新的线程
+        """
+        thread = threading.Thread(target=self.hot_reload, name="rule-reload", daemon=True)
+        thread.start()
+        return thread
+
+    def start_watching(self, interval: float = 2.0) -> None:
+        """启动规则文件监听
+
+        按修改时间轮询规则文件，变化时在监听线程中编译新快照并替换。
+
+        Args:
+            interval: 轮询间隔（秒）
+        """
+        if self._watch_thread is not None and self._watch_thread.is_alive():
+            return
+
+        self._watch_stop.clear()
+        self._watch_thread = threading.Thread(
+            target=self._watch_loop,
+            args=(interval, self._get_file_signature()),
+            name="rule-watcher",
+            daemon=True
+        )
+        self._watch_thread.start()
+
+    def stop_watching(self) -> None:
+        """停止规则文件监听"""
+        self._watch_stop.set()
+        if self._watch_thread is not None:
+            self._watch_thread.join()
+            self._watch_thread = None
+
+    def _watch_loop(self, interval: float, last_signature: Optional[tuple]) -> None:
+        """规则文件监听循环"""
+        while not self._watch_stop.wait(interval):
+            signature = self._get_file_signature()
+            if signature is not None and signature != last_signature:
+                last_signature = signature
+                # 内容哈希未变化时 hot_reload 为空操作
+                self.hot_reload()
+
+    def _get_file_signature(self) -> Optional[tuple]:
+        """规则文件、租户规则文件和外部词库的签名（修改时间和大小）"""
+        try:
+            signature = []
+            paths = [self.rules_path] + self._lexicon_paths
+            if self.overlay_path is not None:
+                paths.append(self.overlay_path)
+            for path in paths:
+                stat = path.stat()
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            return tuple(signature)
+        except OSError:
+            return None
+
     def get_statistics(self) -> Dict:
         """获取规则统计信息
-        
+
         Returns:
             Dict: 统计信息
         """
-        total_rules = sum(len(rules) for rules in self.blacklist_rules.values())
-        
+        ruleset = self._ruleset
+        total_rules = sum(len(rules) for rules in ruleset.blacklist_rules.values())
+
         return {
             "total_rules": total_rules,
-            "categories": list(self.blacklist_rules.keys()),
-            "whitelist_count": len(self.whitelist),
-            "last_reload_time": self.last_reload_time.isoformat() if self.last_reload_time else None
+            "categories": list(ruleset.blacklist_rules.keys()),
+            "whitelist_count": len(ruleset.whitelist),
+            "lexicons": list(ruleset.lexicons),
+            "lexicon_terms": ruleset.lexicon_terms,
+            "version": ruleset.version,
+            "content_hash": ruleset.content_hash,
+            "last_reload_time": self.last_reload_time.isoformat() if self.last_reload_time else None,
+            "metrics_enabled": self.metrics_enabled,
+            "variant_index": {
+                "pinyin_available": PYPINYIN_AVAILABLE,
+                "variant_terms": sum(len(layer.variant_automaton) for layer in ruleset.layers),
+                "spelling_terms": sum(len(layer.spelling_automaton) for layer in ruleset.layers)
+            },
+            "rewritten_rules": list(ruleset.rewritten_rules),
+            "rejected_rules": list(ruleset.rejected_rules)
         }
+
+    def get_metrics(self) -> Dict:
+        """获取规则命中和正则耗时统计
+
+        Returns:
+            Dict: 统计快照，包含每条规则的命中次数、平均正则耗时和从未命中的规则
+        """
+        ruleset = self._ruleset
+        snapshot = ruleset.metrics.snapshot()
+        snapshot["enabled"] = self.metrics_enabled
+        snapshot["version"] = ruleset.version
+        return snapshot
+
+    def render_metrics(self) -> str:
+        """以 Prometheus 文本格式导出统计
+
+        Returns:
+            str: Prometheus 文本格式的指标
+        """
+        return self._ruleset.metrics.render_prometheus()
+
+
+# 批量扫描：fork 前由父进程设置，工作进程直接继承编译好的规则快照
+_bulk_parent_ruleset: Optional[CompiledRuleSet] = None
+
+# 批量扫描工作进程内的 (规则引擎, 检测模式)
+_bulk_worker: Optional[tuple] = None
+
+
+def _bulk_context():
+    """批量扫描的进程上下文，支持 fork 时优先使用以共享规则快照"""
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context("spawn")
+
+
+def _load_bulk_snapshot(artifact_path: str, content_hash: str):
+    """加载批量扫描的规则快照文件
+
+    Raises:
+        RuntimeError: 文件无法读取或与当前规则不一致
+    """
+    try:
+        with open(artifact_path, "rb") as f:
+            ruleset = pickle.load(f)
+    except Exception as e:
+        raise RuntimeError(f"规则编译产物无法加载: {artifact_path}, 错误: {e}") from e
+    if not isinstance(ruleset, (CompiledRuleSet, LayeredRuleSet)) or ruleset.content_hash != content_hash:
+        raise RuntimeError(f"规则编译产物与当前规则不一致: {artifact_path}")
+    return ruleset
+
+
+def _init_bulk_worker(artifact_path: Optional[str], content_hash: str, mode: str) -> None:
+    """批量扫描工作进程初始化：使用继承的规则快照，或从编译产物加载"""
+    global _bulk_worker
+    ruleset = _bulk_parent_ruleset
+    if ruleset is None:
+        ruleset = _load_bulk_snapshot(artifact_path, content_hash)
+    _bulk_worker = (RuleEngine(ruleset=ruleset, metrics_enabled=False), mode)
+
+
+def _bulk_check_chunk(texts: List[str]) -> List[RuleResult]:
+    """在工作进程中检测一个任务块"""
+    engine, mode = _bulk_worker
+    return engine.check_texts(texts, mode=mode)
+
+
+def _chunked(texts: Iterable[str], size: int) -> Iterator[List[str]]:
+    """按块读取文本"""
+    iterator = iter(texts)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
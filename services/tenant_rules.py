@@ -0,0 +1,227 @@
+"""多租户规则集（在共享的基础规则上叠加租户规则）"""
+import threading
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from services.rule_engine import RuleEngine, RulesetCache
+from utils.rule_metrics import DEFAULT_SAMPLE_RATE
+
+
+# 共享缓存中最多保留的编译规则集数量（按内容哈希去重）
+DEFAULT_RULESET_CACHE_SIZE = 32
+
+# 最多同时加载的租户规则引擎数量（最久未使用的先卸载）
+DEFAULT_MAX_TENANTS = 256
+
+# 租户规则文件扩展名（文件名即租户ID）
+TENANT_RULE_SUFFIXES = (".yaml", ".yml")
+
+
+class TenantRuleRegistry:
+    """按租户获取规则引擎
+
+    租户规则文件放在 ``tenants_dir`` 下，文件名（不含扩展名）即租户ID，
+    内容按 ``merge_rule_overlay`` 叠加在基础规则上；没有规则文件的租户使用基础规则。
+    租户规则引擎首次请求时才加载，超过 ``max_tenants`` 时卸载最久未使用的；
+    编译结果由共享的 ``RulesetCache`` 按内容哈希去重，规则相同的租户只保留一份自动机。
+    """
+
+    def __init__(
+        self,
+        rules_path: str = "config/rules.yaml",
+        tenants_dir: Optional[str] = "config/tenants",
+        cache_dir: Optional[str] = None,
+        metrics_enabled: bool = True,
+        metrics_sample_rate: int = DEFAULT_SAMPLE_RATE,
+        cache_size: int = DEFAULT_RULESET_CACHE_SIZE,
+        max_tenants: int = DEFAULT_MAX_TENANTS
+    ):
+        """初始化租户规则注册表
+
+        Args:
+            rules_path: 基础规则文件路径
+            tenants_dir: 租户规则目录，为 None 时所有租户使用基础规则
+            cache_dir: 编译产物缓存目录
+            metrics_enabled: 是否统计规则命中和正则耗时
+            metrics_sample_rate: 每多少条文本采样一次正则耗时
+            cache_size: 共享缓存中最多保留的编译规则集数量
+            max_tenants: 最多同时加载的租户规则引擎数量
+        """
+        self.rules_path = rules_path
+        self.tenants_dir = Path(tenants_dir) if tenants_dir else None
+        self.cache_dir = cache_dir
+        self.metrics_enabled = metrics_enabled
+        self.metrics_sample_rate = metrics_sample_rate
+        self.max_tenants = max(int(max_tenants), 1)
+        self.ruleset_cache = RulesetCache(cache_size)
+
+        self.base = self._create_engine(None)
+
+        # 租户ID -> 租户规则文件；已加载的租户规则引擎按最近使用排序
+        self._overlays: Dict[str, Path] = {}
+        self._engines: "OrderedDict[str, RuleEngine]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+        # 规则文件监听
+        self._watch_thread: Optional[threading.Thread] = None
+        self._watch_stop = threading.Event()
+
+        self.refresh()
+
+    def _create_engine(self, overlay_path: Optional[Path]) -> RuleEngine:
+        """创建使用共享缓存的规则引擎"""
+        return RuleEngine(
+            self.rules_path,
+            cache_dir=self.cache_dir,
+            metrics_enabled=self.metrics_enabled,
+            metrics_sample_rate=self.metrics_sample_rate,
+            overlay_path=str(overlay_path) if overlay_path else None,
+            ruleset_cache=self.ruleset_cache
+        )
+
+    @property
+    def tenants(self) -> List[str]:
+        """配置了租户规则的租户ID"""
+        return sorted(self._overlays)
+
+    def refresh(self) -> int:
+        """重新扫描租户规则目录
+
+        规则文件被删除的租户卸载其规则引擎，之后使用基础规则。
+
+        Returns:
+            int: 配置了租户规则的租户数
+        """
+        overlays = {}
+        if self.tenants_dir is not None and self.tenants_dir.is_dir():
+            for path in sorted(self.tenants_dir.iterdir()):
+                if path.suffix in TENANT_RULE_SUFFIXES and path.is_file():
+                    overlays.setdefault(path.stem, path)
+
+        with self._lock:
+            self._overlays = overlays
+            for tenant_id in list(self._engines):
+                if self._engines[tenant_id].overlay_path != overlays.get(tenant_id):
+                    del self._engines[tenant_id]
+        return len(overlays)
+
+    def get(self, tenant_id: Optional[str] = None) -> RuleEngine:
+        """获取租户的规则引擎
+
+        Args:
+            tenant_id: 租户ID，为空或未配置租户规则时返回基础规则引擎
+
+        Returns:
+            RuleEngine: 规则引擎
+        """
+        if not tenant_id:
+            return self.base
+        overlay_path = self._overlays.get(tenant_id)
+        if overlay_path is None:
+            return self.base
+
+        with self._lock:
+            engine = self._engines.get(tenant_id)
+            if engine is not None:
+                self._engines.move_to_end(tenant_id)
+                return engine
+
+        # 在锁外加载（可能需要编译），并发加载同一租户时保留先完成的
+        engine = self._create_engine(overlay_path)
+        with self._lock:
+            engine = self._engines.setdefault(tenant_id, engine)
+            self._engines.move_to_end(tenant_id)
+            while len(self._engines) > self.max_tenants:
+                self._engines.popitem(last=False)
+                self.evictions += 1
+        return engine
+
+    def hot_reload(self) -> bool:
+        """重新扫描租户规则目录，并热更新基础规则和已加载的租户规则
+
+        Returns:
+            bool: 是否全部更新成功
+        """
+        self.refresh()
+        with self._lock:
+            engines = list(self._engines.values())
+        success = self.base.hot_reload()
+        for engine in engines:
+            success = engine.hot_reload() and success
+        return success
+
+    def start_watching(self, interval: float = 2.0) -> None:
+        """启动规则文件监听
+
+        按修改时间轮询租户规则目录、基础规则文件和已加载租户的规则文件，
+        只热更新文件发生变化的规则引擎。
+
+        Args:
+            interval: 轮询间隔（秒）
+        """
+        if self._watch_thread is not None and self._watch_thread.is_alive():
+            return
+
+        self._watch_stop.clear()
+        self._watch_thread = threading.Thread(
+            target=self._watch_loop,
+            args=(interval,),
+            name="tenant-rule-watcher",
+            daemon=True
+        )
+        self._watch_thread.start()
+
+    def stop_watching(self) -> None:
+        """停止规则文件监听"""
+        self._watch_stop.set()
+        if self._watch_thread is not None:
+            self._watch_thread.join()
+            self._watch_thread = None
+
+    def _watch_loop(self, interval: float) -> None:
+        """规则文件监听循环"""
+        # 卸载的规则引擎不再监听
+        signatures = weakref.WeakKeyDictionary()
+        with self._lock:
+            engines = [self.base] + list(self._engines.values())
+        for engine in engines:
+            signatures[engine] = engine._get_file_signature()
+
+        while not self._watch_stop.wait(interval):
+            self.refresh()
+            with self._lock:
+                engines = [self.base] + list(self._engines.values())
+            for engine in engines:
+                signature = engine._get_file_signature()
+                if engine not in signatures:
+                    # 监听开始后才加载的租户，加载时已是最新规则
+                    signatures[engine] = signature
+                elif signature is not None and signature != signatures[engine]:
+                    signatures[engine] = signature
+                    engine.hot_reload()
+
+    def get_statistics(self) -> Dict:
+        """获取租户规则统计信息
+
+        Returns:
+            Dict: 统计信息
+        """
+        with self._lock:
+            engines = list(self._engines.items())
+        return {
+            "base": {
+                "version": self.base.version,
+                "content_hash": self.base.content_hash
+            },
+            "tenants": len(self._overlays),
+            "loaded_tenants": {
+                tenant_id: {"version": engine.version, "content_hash": engine.content_hash}
+                for tenant_id, engine in engines
+            },
+            "max_tenants": self.max_tenants,
+            "evictions": self.evictions,
+            "ruleset_cache": self.ruleset_cache.get_statistics()
+        }
@@ -0,0 +1,113 @@
+"""历史语料索引 - 单元测试"""
+import json
+import re
+
+import pytest
+import yaml
+
+from services.corpus_index import CorpusIndex, read_corpus
+from services.rule_engine import RuleEngine
+
+
+CORPUS = [
+    ("t1", "这款特效药效果很好"),
+    ("t2", "特 效 药限时优惠"),
+    ("t3", "正常的广告文案"),
+    ("t4", "獲得國家級證書的產品"),
+    ("t5", "国家级专家推荐的特效药"),
+    ("t6", "联系ＱＱ：１２３４５６"),
+    ("t7", "加威信号咨询"),
+    ("t8", "texiaoyao 便宜"),
+]
+
+
+@pytest.fixture
+def ruleset():
+    """当前规则快照"""
+    return RuleEngine("config/rules.yaml").ruleset
+
+
+@pytest.fixture
+def index(ruleset):
+    """语料索引"""
+    corpus_index = CorpusIndex(normalizer=ruleset.normalizer)
+    corpus_index.add_many(CORPUS)
+    return corpus_index
+
+
+def test_preview_prunes_candidates(index, ruleset):
+    """测试必需字面量剪枝"""
+    result = index.preview("特效药", ruleset)
+    assert result["pruned"] is True
+    assert result["literals"] == ["特效药"]
+    assert result["candidates"] == 2
+    assert result["samples"][0]["match"] == "特效药"
+
+
+def test_preview_matches_rule_engine(index, ruleset):
+    """测试预览结果与规则引擎一致（归一化、白名单）"""
+    # 繁体原文归一化后命中，但“国家级证书”在白名单中被豁免
+    result = index.preview("国家级", ruleset)
+    assert result["candidates"] == 2
+    assert [sample["doc_id"] for sample in result["samples"]] == ["t5"]
+
+    # 全角数字归一化后命中，样例为原文片段
+    result = index.preview(r"\d{6}", ruleset)
+    assert result["pruned"] is False
+    assert result["candidates"] == len(CORPUS)
+    assert result["samples"][0]["match"] == "１２３４５６"
+
+
+def test_preview_includes_obfuscated_hits(tmp_path, index, ruleset):
+    """测试预览包含干扰字符、同音字和拼音写法的命中，与只含候选规则的引擎一致"""
+    result = index.preview("特效药", ruleset)
+    assert result["fuzzy"] is True
+    assert [sample["doc_id"] for sample in result["samples"]] == ["t1", "t2", "t5", "t8"]
+
+    result = index.preview("微信号", ruleset)
+    assert result["candidates"] == 0
+    assert [sample["doc_id"] for sample in result["samples"]] == ["t7"]
+    assert result["samples"][0]["match"] == "威信号"
+
+    with open("config/rules.yaml", "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    for pattern in ("特效药", "微信号", r"\d{6}"):
+        config["blacklist"] = {"candidate": [{"pattern": pattern, "type": "candidate", "severity": "high"}]}
+        path = tmp_path / "rules.yaml"
+        path.write_text(yaml.safe_dump(config, allow_unicode=True), encoding="utf-8")
+        engine = RuleEngine(str(path))
+        expected = [doc_id for doc_id, text in CORPUS if engine.check_text(text).violation_types]
+        result = index.preview(pattern, ruleset)
+        assert [sample["doc_id"] for sample in result["samples"]] == expected
+        assert result["hits"] == len(expected)
+
+
+def test_preview_rejects_unsafe_pattern(index, ruleset):
+    """测试候选规则复用正则防护"""
+    with pytest.raises(ValueError):
+        index.preview("(a+)+b", ruleset)
+    with pytest.raises(re.error):
+        index.preview("(特效", ruleset)
+
+    result = index.preview("特效.*好", ruleset)
+    assert result["rewritten"] is True
+    assert result["hits"] == 1
+
+
+def test_save_load_and_read_corpus(tmp_path, index, ruleset):
+    """测试索引持久化和语料读取"""
+    path = tmp_path / "index.pkl"
+    index.save(str(path))
+    loaded = CorpusIndex.load(str(path))
+    assert loaded.get_statistics() == index.get_statistics()
+    assert loaded.preview("特效药", ruleset)["hits"] == index.preview("特效药", ruleset)["hits"]
+
+    corpus = tmp_path / "corpus.jsonl"
+    corpus.write_text(
+        json.dumps({"id": "a", "text": "特效药"}, ensure_ascii=False) + "\n"
+        + "\n"
+        + "{broken\n"
+        + json.dumps({"content": "正常"}, ensure_ascii=False) + "\n",
+        encoding="utf-8"
+    )
+    assert list(read_corpus(str(corpus))) == [("a", "特效药"), ("4", "正常")]
@@ -0,0 +1,74 @@
+"""图片感知哈希工具 - 单元测试"""
+import random
+
+import pytest
+from PIL import Image, ImageDraw
+
+from utils.image_hash import HammingIndex, dhash, hamming_distance, image_dhash, pixel_hash
+
+
+def make_creative(seed: int = 0, size=(320, 240)) -> Image.Image:
+    """生成带色块和文字条的测试素材"""
+    rng = random.Random(seed)
+    image = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(image)
+    for _ in range(12):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.rectangle([x, y, x + size[0] // 4, y + size[1] // 5], fill=color)
+    return image
+
+
+def test_dhash_near_duplicates(tmp_path):
+    """测试重新编码、缩放后的图片哈希相近，不同图片相差较大"""
+    original = make_creative(1)
+    original_path = tmp_path / "original.png"
+    original.save(original_path)
+
+    resized_path = tmp_path / "resized.jpg"
+    original.resize((200, 150)).save(resized_path, quality=60)
+
+    value = image_dhash(str(original_path))
+    assert value == dhash(original)
+    assert 0 <= value < 1 << 64
+    assert hamming_distance(value, image_dhash(str(resized_path))) <= 6
+    assert hamming_distance(value, dhash(make_creative(2))) > 10
+
+
+def test_pixel_hash_distinguishes_overlaid_text():
+    """测试叠加文字后 dHash 几乎不变，像素哈希不同"""
+    import numpy as np
+    from PIL import ImageDraw
+
+    template = make_creative(3)
+    overlaid = template.copy()
+    ImageDraw.Draw(overlaid).text((10, 220), "add wx 123", fill="black")
+
+    assert hamming_distance(dhash(template), dhash(overlaid)) <= 2
+    gray = np.asarray(template.convert("L"))
+    assert pixel_hash(gray) == pixel_hash(gray.copy())
+    assert 0 <= pixel_hash(gray) < 1 << 64
+    assert pixel_hash(gray) != pixel_hash(np.asarray(overlaid.convert("L")))
+
+
+def test_hamming_index():
+    """测试多索引哈希的半径查找和删除"""
+    index = HammingIndex(radius=3)
+    base = 0x0F0F_0F0F_0F0F_0F0F
+    index.add(base)
+    index.add(base ^ 0b111)
+    index.add(base ^ (1 << 63))
+    assert len(index) == 3
+
+    assert index.nearest(base) == (base, 0)
+    assert index.nearest(base ^ 0b011) == (base ^ 0b111, 1)
+    assert index.nearest(~base & ((1 << 64) - 1)) is None
+
+    index.remove(base)
+    index.remove(base)
+    assert len(index) == 2
+    assert index.contains(base) is False
+    assert index.nearest(base) == (base ^ (1 << 63), 1)
+
+    with pytest.raises(ValueError):
+        HammingIndex(radius=64)
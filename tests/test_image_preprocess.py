@@ -0,0 +1,84 @@
+"""OCR图像预处理 - 单元测试"""
+import numpy as np
+from PIL import Image, ImageDraw
+
+from utils.image_preprocess import adaptive_binarize, decode_gray, estimate_skew, preprocess_image
+
+
+def make_text_page(size=(1200, 900)) -> Image.Image:
+    """生成由多行“字块”组成的页面"""
+    image = Image.new("L", size, 255)
+    draw = ImageDraw.Draw(image)
+    for y in range(100, size[1] - 100, 60):
+        for x in range(100, size[0] - 100, 40):
+            draw.rectangle([x, y, x + 28, y + 24], fill=30)
+    return image
+
+
+def test_downscale_large_poster(tmp_path):
+    """测试大图缩小到长边上限，小图不放大"""
+    path = tmp_path / "poster.jpg"
+    make_text_page((4800, 3000)).convert("RGB").save(path, quality=85)
+    result = preprocess_image(str(path), max_side=1600)
+    assert result.size == (1600, 1000)
+    assert result.original_size == (4800, 3000)
+    assert abs(result.scale - 1 / 3) < 1e-3
+    assert result.gray.dtype == np.uint8
+
+    small = tmp_path / "small.png"
+    make_text_page((400, 300)).save(small)
+    assert preprocess_image(str(small), max_side=1600).size == (400, 300)
+
+
+
+def test_decode_from_bytes_and_arrays(tmp_path):
+    """测试图片字节和像素数组与文件路径解码结果一致，且为只读数组"""
+    import io
+
+    page = make_text_page((2400, 1800)).convert("RGB")
+    path = tmp_path / "page.png"
+    page.save(path)
+    buffer = io.BytesIO()
+    page.save(buffer, format="PNG")
+
+    from_path, scale, size = decode_gray(str(path), max_side=1200)
+    from_bytes, _, _ = decode_gray(memoryview(buffer.getvalue()), max_side=1200)
+    from_array, array_scale, array_size = decode_gray(np.asarray(page), max_side=1200)
+    assert from_path.shape == from_bytes.shape == from_array.shape == (900, 1200)
+    assert scale == array_scale == 0.5
+    assert size == array_size == (2400, 1800)
+    assert np.array_equal(from_path, from_bytes)
+    assert np.abs(from_path.astype(int) - from_array.astype(int)).max() <= 1
+    assert not from_bytes.flags.writeable
+
+    # 灰度数组不超过上限时不缩放
+    gray = np.asarray(make_text_page((400, 300)))
+    decoded, scale, _ = decode_gray(gray)
+    assert scale == 1.0 and np.array_equal(decoded, gray)
+
+def test_adaptive_binarize_uneven_lighting():
+    """测试光照不均时文字和背景仍能分开"""
+    gradient = np.tile(np.linspace(120, 255, 400, dtype=np.float64), (200, 1))
+    gray = gradient.copy()
+    # 右侧笔画比左侧背景还亮，全局阈值无法同时分开两侧
+    gray[80:120, 56:64] -= 60
+    gray[80:120, 336:344] -= 60
+    binary = adaptive_binarize(np.clip(gray, 0, 255).astype(np.uint8), window=41)
+    assert set(np.unique(binary)) <= {0, 255}
+    assert binary[100, 60] == 0 and binary[100, 340] == 0
+    assert binary[20, 60] == 255 and binary[20, 340] == 255
+    assert binary[100, 200] == 255
+
+
+def test_deskew(tmp_path):
+    """测试估计并校正倾斜角"""
+    for angle in (3, -2):
+        path = tmp_path / f"skew{angle}.png"
+        make_text_page().rotate(angle, expand=True, fillcolor=255, resample=Image.BICUBIC).save(path)
+        result = preprocess_image(str(path))
+        assert abs(result.angle + angle) <= 0.25
+        assert abs(estimate_skew(result.binary)) <= 0.25
+
+    straight = tmp_path / "straight.png"
+    make_text_page().save(straight)
+    assert preprocess_image(str(straight)).angle == 0.0
@@ -0,0 +1,88 @@
+"""OCR结果缓存 - 单元测试"""
+import time
+
+from services.ocr_cache import OCRCache
+
+
+def test_exact_and_near_hits():
+    """测试精确命中和汉明半径内的近似命中"""
+    cache = OCRCache(radius=4)
+    cache.put(0xABCD, "限时秒杀")
+    assert cache.get(0xABCD) == "限时秒杀"
+    assert cache.get(0xABCD ^ 0b1010) == "限时秒杀"
+    assert cache.get(0xABCD ^ 0b11111) is None
+
+    stats = cache.get_statistics()
+    assert (stats["hits"], stats["near_hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_lru_and_ttl_eviction():
+    """测试按最近使用淘汰和过期删除"""
+    cache = OCRCache(max_entries=2, radius=0)
+    cache.put(1, "一")
+    cache.put(2, "二")
+    assert cache.get(1) == "一"
+    cache.put(3, "三")
+    assert cache.get(2) is None
+    assert cache.get(1) == "一"
+    assert cache.get_statistics()["evictions"] == 1
+
+    cache = OCRCache(ttl=0.05, radius=2)
+    cache.put(0b1000, "过期")
+    time.sleep(0.1)
+    assert cache.get(0b1001) is None
+    assert len(cache) == 0
+    assert cache.get_statistics()["expirations"] == 1
+
+
+def test_persistent_store(tmp_path):
+    """测试磁盘缓存在重启后恢复"""
+    path = tmp_path / "ocr_cache.db"
+    cache = OCRCache(max_entries=2, path=str(path))
+    cache.put(1 << 63, "素材一")
+    cache.put(2, "素材二")
+    cache.put(3 << 40, "素材三")
+    cache.close()
+
+    restored = OCRCache(max_entries=10, radius=0, path=str(path))
+    assert len(restored) == 2
+    assert restored.get(1 << 63) is None
+    assert restored.get(2) == "素材二"
+    assert restored.get(3 << 40) == "素材三"
+    assert restored.get_statistics()["persistent"] is True
+    restored.close()
+
+
+def test_persistent_store_hash_kind(tmp_path):
+    """测试磁盘缓存按哈希类型加载，调整半径后不混用另一种哈希"""
+    import sqlite3
+
+    path = tmp_path / "ocr_cache.db"
+    exact = OCRCache(path=str(path))
+    assert exact.hash_kind == "pixel"
+    exact.put(0xABCD, "像素哈希")
+    exact.close()
+
+    near = OCRCache(radius=4, path=str(path))
+    assert near.hash_kind == "dhash"
+    assert len(near) == 0
+    assert near.get(0xABCD ^ 0b1) is None
+    near.put(0x1234, "感知哈希")
+    near.close()
+
+    restored = OCRCache(path=str(path))
+    assert restored.get(0xABCD) == "像素哈希"
+    assert restored.get(0x1234) is None
+    restored.close()
+
+    # 旧版本的缓存文件没有 hash_kind 列，条目按 dHash 加载
+    legacy = tmp_path / "legacy.db"
+    db = sqlite3.connect(str(legacy))
+    db.execute(
+        "CREATE TABLE ocr_cache (image_hash TEXT PRIMARY KEY, text TEXT NOT NULL, created_at REAL NOT NULL)"
+    )
+    db.execute("INSERT INTO ocr_cache VALUES (?, ?, ?)", (f"{0x10:016x}", "旧条目", time.time()))
+    db.commit()
+    db.close()
+    assert OCRCache(path=str(legacy)).get(0x10) is None
+    assert OCRCache(radius=2, path=str(legacy)).get(0x11) == "旧条目"
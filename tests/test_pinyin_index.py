@@ -0,0 +1,66 @@
+"""同音字与拼音变体索引 - 单元测试"""
+import pytest
+
+from utils import pinyin_index
+from utils.pinyin_index import VariantKeyer
+
+
+# 测试用读音表（声调, 无声调）
+READINGS = {
+    "神": ("shén", "shen"),
+    "医": ("yī", "yi"),
+    "衣": ("yī", "yi"),
+    "深": ("shēn", "shen"),
+    "意": ("yì", "yi"),
+    "微": ("wēi", "wei"),
+    "威": ("wēi", "wei"),
+    "信": ("xìn", "xin"),
+}
+
+
+@pytest.fixture
+def fake_pinyin(monkeypatch):
+    """用固定读音表代替 pypinyin"""
+    def readings(chars, tone):
+        return [READINGS.get(char, ("", ""))[0 if tone else 1] for char in chars]
+
+    monkeypatch.setattr(pinyin_index, "PYPINYIN_AVAILABLE", True)
+    monkeypatch.setattr(pinyin_index, "_readings", readings)
+
+
+def test_aliases_without_pinyin(monkeypatch):
+    """测试只使用替换字"""
+    monkeypatch.setattr(pinyin_index, "PYPINYIN_AVAILABLE", False)
+    keyer = VariantKeyer(["微信"], aliases={"V": "微"})
+    assert keyer.keys("V信") == keyer.keys("微信")
+    assert keyer.keys("威信") != keyer.keys("微信")
+    assert keyer.spell("微信") is None
+
+
+def test_homophones_share_keys(fake_pinyin):
+    """测试同音候选字映射到同一个键，键串与原文逐字对应"""
+    keyer = VariantKeyer(["神医", "微信"], homophones="衣威深意")
+    assert keyer.keys("神衣") == keyer.keys("神医")
+    assert keyer.keys("威信") == keyer.keys("微信")
+    assert len(keyer.keys("找神衣看病")) == 5
+    assert keyer.variant_chars() == ["威", "衣"]
+
+    # 区分声调时近音字不匹配，不区分时匹配
+    assert keyer.keys("深意") != keyer.keys("神医")
+    toneless = VariantKeyer(["神医"], tone_sensitive=False, homophones="深意")
+    assert toneless.keys("深意") == toneless.keys("神医")
+
+
+def test_homophones_limited_to_candidates(fake_pinyin):
+    """测试不在候选列表中的同音字保持原样"""
+    keyer = VariantKeyer(["神医", "微信"], homophones="衣")
+    assert keyer.keys("神衣") == keyer.keys("神医")
+    assert keyer.keys("威信") != keyer.keys("微信")
+    assert keyer.variant_chars() == ["衣"]
+
+
+def test_spell(fake_pinyin):
+    """测试拼音拼写"""
+    keyer = VariantKeyer(["神医"])
+    assert keyer.spell("神医") == "shenyi"
+    assert keyer.spell("神医A") is None
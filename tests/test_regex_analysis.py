@@ -0,0 +1,74 @@
+"""正则静态分析工具 - 单元测试"""
+from utils.regex_analysis import (
+    bound_wildcards,
+    extract_exact_literals,
+    extract_required_literals,
+    find_redos_risks
+)
+
+
+def test_extract_plain_literal():
+    """测试纯字面量"""
+    assert extract_required_literals("国家级(?!证书|认证)") == {"国家级"}
+
+
+def test_extract_alternation():
+    """测试分支展开"""
+    assert extract_required_literals("(最|第一|顶级)") == {"最", "第一", "顶级"}
+
+
+def test_extract_best_factor():
+    """测试选择区分度最高的字面量"""
+    assert extract_required_literals("药品.*无副作用") == {"无副作用"}
+
+
+def test_extract_charset_concat():
+    """测试字符类与字面量拼接"""
+    literals = extract_required_literals("(包治|根治)[百千]病")
+    assert literals == {"包治百病", "包治千病", "根治百病", "根治千病"}
+
+
+def test_no_required_literal():
+    """测试无必需字面量的正则"""
+    assert extract_required_literals(r"\d+") is None
+    assert extract_required_literals("a?b*") is None
+    assert extract_required_literals("(?i)abc") is None
+    assert extract_required_literals("(abc") is None
+
+
+def test_find_redos_risks():
+    """测试识别嵌套的无界量词和分支有歧义的量词"""
+    assert find_redos_risks(r"(a+)+b")
+    assert find_redos_risks(r"(\d+\s?)*$")
+    assert find_redos_risks(r"((ab)*c)+")
+    assert find_redos_risks(r"药品.*无副作用") == []
+    assert find_redos_risks(r"(\d{1,3}\s?){4}") == []
+
+    # 量词内的分支有歧义
+    assert find_redos_risks(r"(a|a)+b")
+    assert find_redos_risks(r"(a|ab)*c")
+    assert find_redos_risks(r"(?:\d|\d\d)+元")
+    assert find_redos_risks(r"(?:a\d|[ab]x)+")
+    assert find_redos_risks(r"(?:\d{1,3}|,)+")
+    assert find_redos_risks(r"(?:微信|微博)+") == []
+    assert find_redos_risks(r"(\w|\d)+") == []
+    assert find_redos_risks(r"(\s?\d)+") == []
+    assert find_redos_risks(r"(a|ab){2}c") == []
+
+
+def test_bound_wildcards():
+    """测试把无界通配改写为有界窗口"""
+    assert bound_wildcards("药品.*无副作用", 64) == "药品.{0,64}无副作用"
+    assert bound_wildcards("a.+?b", 10) == "a.{1,10}?b"
+    assert bound_wildcards(r"a\.*b[.*]", 10) == r"a\.*b[.*]"
+    assert bound_wildcards(r"[].]*x", 10) == r"[].]*x"
+    assert bound_wildcards(r"\d+", 10) == r"\d+"
+
+
+def test_extract_exact_literals():
+    """测试精确展开为有限字面量集合"""
+    assert extract_exact_literals("(祖传秘方|神医|包治)") == {"祖传秘方", "神医", "包治"}
+    assert extract_exact_literals("(包治|根治)[百千]病") == {"包治百病", "包治千病", "根治百病", "根治千病"}
+    assert extract_exact_literals("国家级(?!证书)") is None
+    assert extract_exact_literals("药品.*无副作用") is None
+    assert extract_exact_literals(r"\b1[3-9]\d{9}\b") is None
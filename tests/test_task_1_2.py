@@ -1,6 +1,14 @@
 """Task 1.2: 规则引擎实现 - 单元测试"""
 import pytest
-from services.rule_engine import RuleEngine, RuleResult
+import random
+import re
+import shutil
+import threading
+import time
+import yaml
+from collections import OrderedDict
+
+from services.rule_engine import RuleEngine, RuleResult, CompiledRuleSet
 
 
 @pytest.fixture
@@ -107,3 +115,929 @@ def test_get_statistics(rule_engine):
     assert "whitelist_count" in stats
     assert stats["total_rules"] > 0
     assert len(stats["categories"]) > 0
+
+
+def test_rule_partition(rule_engine):
+    """测试规则划分为预筛确认、合并正则和单独扫描三类"""
+    total_rules = sum(len(p) for p in rule_engine.regex_patterns.values())
+    assert total_rules == (
+        len(rule_engine.gated_rules)
+        + len(rule_engine.merged_rules)
+        + len(rule_engine.standalone_rules)
+    )
+    # 默认规则都含有必需字面量
+    assert len(rule_engine.gated_rules) == total_rules
+
+
+def test_literal_prefilter_skips_regex(rule_engine):
+    """测试干净文本不会触发任何正则规则"""
+    _, triggered = rule_engine.ruleset.scan_automaton("这是一个正常的广告文案")
+    assert triggered == set()
+
+    _, triggered = rule_engine.ruleset.scan_automaton("药品安全无副作用")
+    originals = {rule_engine.gated_rules[i]["original"] for i in triggered}
+    assert originals == {"药品.*无副作用"}
+
+
+def test_combined_scan_matches_per_rule_finditer(rule_engine):
+    """测试合并扫描与逐条规则 finditer 结果一致（含重叠规则）"""
+    texts = [
+        "我们是最好的，包治百病，联系电话13812345678",
+        "祖传秘方包治百病，药品安全无副作用，最佳最优",
+        "国家级产品，微信号：abc_123，QQ：123456",
+        "这是一个正常的广告文案",
+    ]
+    for text in texts:
+        expected = sorted(
+            (info["original"], m.start(), m.end())
+            for patterns in rule_engine.regex_patterns.values()
+            for info in patterns
+            for m in info["pattern"].finditer(text)
+        )
+        _, triggered = rule_engine.ruleset.scan_automaton(text)
+        actual = sorted(
+            (info["original"], start, end)
+            for info, start, end, _ in rule_engine.ruleset.scan_regex(text, triggered)
+        )
+        assert actual == expected
+
+
+def test_backreference_rule_standalone(tmp_path):
+    """测试含反向引用的规则单独扫描"""
+    rules_file = tmp_path / "rules.yaml"
+    rules_file.write_text(
+        "blacklist:\n"
+        "  repeat:\n"
+        "    - pattern: \"(\\\\d)\\\\1\"\n"
+        "      type: \"repeat_word\"\n"
+        "      severity: \"low\"\n"
+        "    - pattern: \"第一\"\n"
+        "      type: \"extreme_language\"\n"
+        "      severity: \"high\"\n"
+        "whitelist: []\n",
+        encoding="utf-8"
+    )
+    engine = RuleEngine(str(rules_file))
+    assert len(engine.gated_rules) == 1
+    assert len(engine.standalone_rules) == 1
+
+    result = engine.check_text("88第一")
+    assert set(result.violation_types) == {"repeat_word", "extreme_language"}
+    assert result.severity == "high"
+
+
+def test_merged_rules_without_literals(tmp_path):
+    """测试无字面量的规则走合并正则"""
+    rules_file = tmp_path / "rules.yaml"
+    rules_file.write_text(
+        "blacklist:\n"
+        "  numbers:\n"
+        "    - pattern: \"\\\\d{6}\"\n"
+        "      type: \"long_number\"\n"
+        "      severity: \"low\"\n"
+        "    - pattern: \"\\\\d{3}\"\n"
+        "      type: \"short_number\"\n"
+        "      severity: \"medium\"\n"
+        "whitelist: []\n",
+        encoding="utf-8"
+    )
+    engine = RuleEngine(str(rules_file))
+    assert len(engine.merged_rules) == 2
+
+    result = engine.check_text("编号1234567")
+    assert set(result.violation_types) == {"long_number", "short_number"}
+    assert result.severity == "medium"
+
+
+def test_merged_rules_long_input(tmp_path):
+    """测试合并正则只用于找出命中的规则，长数字串不会拖慢扫描、丢失后面的命中"""
+    rules_file = tmp_path / "rules.yaml"
+    rules_file.write_text(
+        "blacklist:\n"
+        "  numbers:\n"
+        "    - pattern: \"\\\\d{2,}\"\n"
+        "      type: \"number\"\n"
+        "      severity: \"low\"\n"
+        "    - pattern: \"[a-z]{3}\\\\d\"\n"
+        "      type: \"code\"\n"
+        "      severity: \"low\"\n"
+        "    - pattern: \"\\\\d{3}[a-z]\"\n"
+        "      type: \"serial\"\n"
+        "      severity: \"medium\"\n"
+        "whitelist: []\n",
+        encoding="utf-8"
+    )
+    engine = RuleEngine(str(rules_file))
+    assert len(engine.merged_rules) == 3
+
+    # 被前面的规则遮蔽的规则仍能找到，结果与逐条 finditer 一致
+    for text in ["ab 5 abc1 77", "12345x abc9", "没有数字", "9" * 300 + "z"]:
+        expected = sorted(
+            (info["type"], m.start(), m.end())
+            for info in engine.merged_rules
+            for m in info["pattern"].finditer(text)
+        )
+        actual = sorted(
+            (info["type"], start, end)
+            for info, start, end, _ in engine.ruleset.scan_regex(text, set())
+        )
+        assert actual == expected
+
+    text = "5" * 20000 + " 12"
+    spans = [(info["type"], start, end) for info, start, end, _ in engine.ruleset.scan_regex(text, set())]
+    assert ("number", 20001, 20003) in spans
+    assert engine.check_text(text).matched_positions[-1] == (20001, 20003)
+
+def test_whitelist_preserves_offsets(rule_engine):
+    """测试白名单掩码后命中位置仍对应原文"""
+    text = "获得国家级证书，国家级产品"
+    result = rule_engine.check_text(text)
+    assert result.is_violated is True
+    assert "国家级" in result.matched_keywords
+    for start, end in result.matched_positions:
+        assert text[start:end] in result.matched_keywords
+
+
+def test_whitelist_mask_overlapping_spans(tmp_path):
+    """测试重叠的白名单区间合并后掩码"""
+    rules_file = tmp_path / "rules.yaml"
+    rules_file.write_text(
+        "blacklist:\n"
+        "  extreme_words:\n"
+        "    - pattern: \"(最好|第一)\"\n"
+        "      type: \"extreme_language\"\n"
+        "      severity: \"high\"\n"
+        "whitelist:\n"
+        "  - \"最好的朋友\"\n"
+        "  - \"好的朋友们\"\n",
+        encoding="utf-8"
+    )
+    engine = RuleEngine(str(rules_file))
+    masked = engine.ruleset.mask_whitelist("他是最好的朋友们之一")
+    assert len(masked) == len("他是最好的朋友们之一")
+    assert masked == "他是" + "\x00" * 6 + "之一"
+
+    assert engine.check_text("最好的朋友们").is_violated is False
+    result = engine.check_text("最好的朋友们，第一")
+    assert result.matched_positions == [(7, 9)]
+
+
+def test_check_texts_matches_check_text(rule_engine):
+    """测试批量检测与逐条检测结果一致"""
+    texts = [
+        "我们是最好的，包治百病",
+        "",
+        "这是一个正常的广告文案",
+        "获得国家级证书，国家级产品",
+        "联系电话13812345678，微信号：abc123",
+    ]
+    batch_results = rule_engine.check_texts(texts)
+    assert len(batch_results) == len(texts)
+    for text, batch_result in zip(texts, batch_results):
+        single = rule_engine.check_text(text)
+        assert batch_result.is_violated == single.is_violated
+        assert sorted(batch_result.violation_types) == sorted(single.violation_types)
+        assert sorted(batch_result.matched_keywords) == sorted(single.matched_keywords)
+        assert sorted(batch_result.matched_positions) == sorted(single.matched_positions)
+        assert batch_result.severity == single.severity
+
+
+def test_check_texts_keyword_not_across_items(tmp_path):
+    """测试拼接扫描时关键词不会跨条命中"""
+    rules_file = tmp_path / "rules.yaml"
+    rules_file.write_text(
+        "blacklist:\n"
+        "  medical:\n"
+        "    - pattern: \"神医\"\n"
+        "      type: \"medical_fraud\"\n"
+        "      severity: \"critical\"\n"
+        "whitelist: []\n",
+        encoding="utf-8"
+    )
+    engine = RuleEngine(str(rules_file))
+    results = engine.check_texts(["这位神", "医生很好", "神医"])
+    assert [r.is_violated for r in results] == [False, False, True]
+    assert engine.check_texts([]) == []
+
+
+def test_hot_reload_noop_when_unchanged(rule_engine):
+    """测试规则文件未变化时热更新为空操作"""
+    automaton = rule_engine.automaton
+    assert rule_engine.load_rules() is False
+    assert rule_engine.hot_reload() is True
+    assert rule_engine.automaton is automaton
+    assert rule_engine.load_rules(force=True) is True
+    assert rule_engine.automaton is not automaton
+
+
+def test_compiled_artifact_cache(tmp_path, monkeypatch):
+    """测试编译产物按内容哈希缓存并复用"""
+    cache_dir = tmp_path / "cache"
+    engine = RuleEngine("config/rules.yaml", cache_dir=str(cache_dir))
+    artifacts = list(cache_dir.glob("rules-*.pkl"))
+    assert len(artifacts) == 1
+    assert engine.content_hash in artifacts[0].name
+
+    # 命中缓存时不应重新编译
+    def fail_compile(self):
+        raise AssertionError("不应重新编译")
+
+    monkeypatch.setattr(CompiledRuleSet, "_compile_regex_patterns", fail_compile)
+    cached = RuleEngine("config/rules.yaml", cache_dir=str(cache_dir))
+    assert cached.content_hash == engine.content_hash
+    assert len(list(cache_dir.glob("rules-*.pkl"))) == 1
+
+    text = "我们是最好的，包治百病，联系电话13812345678"
+    expected = engine.check_text(text)
+    result = cached.check_text(text)
+    assert sorted(result.violation_types) == sorted(expected.violation_types)
+    assert sorted(result.matched_positions) == sorted(expected.matched_positions)
+    assert result.severity == expected.severity
+
+
+def test_cached_rules_skip_yaml_parse(tmp_path, monkeypatch):
+    """测试内容未变化或命中编译产物时不解析 YAML"""
+    import services.rule_engine as rule_engine_module
+
+    cache_dir = tmp_path / "cache"
+    engine = RuleEngine("config/rules.yaml", cache_dir=str(cache_dir))
+
+    def fail_parse(*args, **kwargs):
+        raise AssertionError("不应解析 YAML")
+
+    monkeypatch.setattr(yaml, "safe_load", fail_parse)
+    assert engine.load_rules() is False
+
+    # 模拟新进程：进程内缓存为空，从缓存目录读取规则信息和编译产物
+    monkeypatch.setattr(rule_engine_module, "_rule_sources", OrderedDict())
+    cached = RuleEngine("config/rules.yaml", cache_dir=str(cache_dir))
+    assert cached.content_hash == engine.content_hash
+    assert cached.check_text("包治百病").is_violated is True
+
+
+def test_hot_reload_swaps_snapshot(tmp_path):
+    """测试热更新整体替换规则快照并递增版本号"""
+    rules_file = tmp_path / "rules.yaml"
+    shutil.copy("config/rules.yaml", rules_file)
+    engine = RuleEngine(str(rules_file))
+    old_ruleset = engine.ruleset
+    assert engine.get_statistics()["version"] == 1
+    assert engine.check_text("神医出诊").is_violated is True
+
+    rules_file.write_text(
+        "blacklist:\n"
+        "  contact:\n"
+        "    - pattern: \"加V\"\n"
+        "      type: \"wechat_id\"\n"
+        "      severity: \"medium\"\n"
+        "whitelist: []\n",
+        encoding="utf-8"
+    )
+    assert engine.hot_reload_async().join(timeout=5) is None
+    assert engine.ruleset is not old_ruleset
+    assert engine.get_statistics()["version"] == 2
+    assert engine.check_text("神医出诊").is_violated is False
+    assert engine.check_text("加V咨询").is_violated is True
+
+    # 旧快照不受影响，正在进行的检测仍得到一致的结果
+    keyword_hits, triggered = old_ruleset.scan_automaton("神医出诊")
+    assert triggered
+
+
+def test_watcher_reloads_on_change(tmp_path):
+    """测试规则文件监听"""
+    rules_file = tmp_path / "rules.yaml"
+    shutil.copy("config/rules.yaml", rules_file)
+    engine = RuleEngine(str(rules_file))
+    reloaded = threading.Event()
+    original_hot_reload = engine.hot_reload
+
+    def hot_reload():
+        result = original_hot_reload()
+        reloaded.set()
+        return result
+
+    engine.hot_reload = hot_reload
+    engine.start_watching(interval=0.05)
+    try:
+        rules_file.write_text("blacklist: {}\nwhitelist: []\n", encoding="utf-8")
+        assert reloaded.wait(timeout=5)
+    finally:
+        engine.stop_watching()
+
+    assert engine.version == 2
+    assert engine.get_statistics()["total_rules"] == 0
+    assert engine.check_text("神医出诊").is_violated is False
+
+
+def test_normalization_evasions(rule_engine):
+    """测试全角、繁体、零宽字符和填充符号变体"""
+    assert "extreme_language" in rule_engine.check_text("最*好的产品").violation_types
+    assert "medical_fraud" in rule_engine.check_text("祖傳祕方").violation_types
+    assert "medical_fraud" in rule_engine.check_text("神​医出诊").violation_types
+    assert "qq_number" in rule_engine.check_text("ＱＱ：１２３４５６").violation_types
+
+
+def test_normalization_maps_back_to_original(rule_engine):
+    """测试归一化后的命中位置映射回原文"""
+    text = "我们是最★好的，祖傳​祕方"
+    result = rule_engine.check_text(text)
+    assert "祖傳​祕方" in result.matched_keywords
+    assert "最★好" in result.matched_keywords
+    for start, end in result.matched_positions:
+        if start >= 0:
+            assert text[start:end] in result.matched_keywords
+
+    batch = rule_engine.check_texts([text])[0]
+    assert sorted(batch.matched_keywords) == sorted(result.matched_keywords)
+
+
+def test_stream_scanner_matches_check_text(rule_engine):
+    """测试流式扫描与整段检测结果一致"""
+    text = "我们是最好的，祖傳秘方包治百病，QQ：123456，获得国家级证书，国家级产品"
+    scanner = rule_engine.stream()
+    for char in text:
+        scanner.feed(char)
+    scanner.close()
+
+    expected = rule_engine.check_text(text)
+    assert scanner.is_violated is True
+    assert scanner.severity == expected.severity
+    assert {m.violation_type for m in scanner.matches} == set(expected.violation_types)
+    assert sorted((m.start, m.end) for m in scanner.matches) == sorted(expected.matched_positions)
+    for match in scanner.matches:
+        assert text[match.start:match.end] == match.keyword
+
+    # 白名单词跨分片时不会误报
+    assert all(match.keyword != "国家级" or match.start > text.index("证书") for match in scanner.matches)
+
+
+def test_stream_scanner_random_equivalence(rule_engine):
+    """测试随机文本随机分片时流式扫描与整段检测的命中一致（含干扰字符、替换字、拼音和表情）"""
+    alphabet = list("祖传秘方蜜包治百病神医衣最好佳第一顶级国家证书认微信号威V薇QQ：的是在有我") \
+        + list(" -*_😀，。shenyiabcSHEN0123456789")
+    rng = random.Random(0)
+    for _ in range(1000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(5, 60)))
+        scanner = rule_engine.stream(window=rng.choice([16, 64, 256]))
+        pos = 0
+        while pos < len(text):
+            size = rng.randint(1, 8)
+            scanner.feed(text[pos:pos + size])
+            pos += size
+        scanner.close()
+
+        expected = {(s["type"], s["start"], s["end"]) for s in rule_engine.check_text(text).snippets()}
+        assert {(m.violation_type, m.start, m.end) for m in scanner.matches} == expected, text
+
+
+def test_stream_scanner_wildcard_spans(tmp_path):
+    """测试通配规则和互为前缀的字面量规则跨分片时，流式命中区间与整段检测一致"""
+    rules_file = tmp_path / "rules.yaml"
+    rules_file.write_text(
+        "blacklist:\n"
+        "  medical:\n"
+        "    - pattern: \"神医.*治\"\n"
+        "      type: \"medical_fraud\"\n"
+        "      severity: \"high\"\n"
+        "    - pattern: \"(特效|特效药品)\"\n"
+        "      type: \"drug\"\n"
+        "      severity: \"low\"\n"
+        "    - pattern: \"(药|秘制良药)\"\n"
+        "      type: \"medicine\"\n"
+        "      severity: \"low\"\n"
+        "whitelist: []\n"
+        "regex_guard:\n"
+        "  max_gap: 24\n",
+        encoding="utf-8"
+    )
+    engine = RuleEngine(str(rules_file))
+    alphabet = list("神医治特效药品秘制良的是在") + [" "] * 4
+    rng = random.Random(1)
+    for _ in range(2000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(5, 60)))
+        scanner = engine.stream(window=rng.choice([32, 64, 256]))
+        pos = 0
+        while pos < len(text):
+            size = rng.randint(1, 8)
+            scanner.feed(text[pos:pos + size])
+            pos += size
+        scanner.close()
+
+        expected = {(s["type"], s["start"], s["end"]) for s in engine.check_text(text).snippets()}
+        assert {(m.violation_type, m.start, m.end) for m in scanner.matches} == expected, text
+
+
+def test_stream_scanner_global_offsets(rule_engine):
+    """测试流式命中使用全局偏移，白名单判定所需的尾部字符到达后立即上报"""
+    scanner = rule_engine.stream(window=32)
+    assert scanner.feed("这是一段很长的直播字幕" * 10) == []
+    # 最长白名单词为5个字，最后4个字暂缓扫描；紧贴扫描边界的正则命中也延后上报
+    assert scanner.feed("，神医") == []
+    matches = scanner.feed("在线问诊中")
+    assert [m.keyword for m in matches] == ["神医"]
+    assert matches[0].start == 111
+    assert scanner.close() == []
+
+    with pytest.raises(RuntimeError):
+        scanner.feed("神医")
+
+
+def test_rule_metrics(tmp_path):
+    """测试规则命中计数、采样计时和 Prometheus 导出"""
+    rules_path = tmp_path / "rules.yaml"
+    shutil.copy("config/rules.yaml", rules_path)
+    engine = RuleEngine(str(rules_path), metrics_sample_rate=1)
+
+    engine.check_text("神医在线，QQ：123456")
+    engine.check_texts(["神医", "正常文本"])
+
+    metrics = engine.get_metrics()
+    assert metrics["enabled"] is True
+    assert metrics["texts_scanned"] == 3
+    assert metrics["chars_scanned"] == sum(
+        len(text) for text in ["神医在线，QQ：123456", "神医", "正常文本"]
+    )
+    hits = {(rule["type"], rule["pattern"]): rule["hits"] for rule in metrics["rules"]}
+    assert hits[("medical_fraud", "(祖传秘方|神医|包治)")] == 2
+    assert hits[("qq_number", "QQ[:：\\s]*\\d{5,12}")] == 1
+    assert any(rule["regex_samples"] > 0 for rule in metrics["rules"])
+    assert len(metrics["dead_rules"]) == len(metrics["rules"]) - 2
+
+    text = engine.render_metrics()
+    assert "rule_engine_texts_scanned_total 3" in text
+    assert 'type="qq_number"} 1' in text
+
+    # 热更新后未修改的规则保留累计值
+    with open(rules_path, "a", encoding="utf-8") as f:
+        f.write("\n# reload\n")
+    assert engine.hot_reload() is True
+    assert engine.get_metrics()["texts_scanned"] == 3
+
+
+def test_rule_metrics_disabled():
+    """测试关闭统计后不记录"""
+    engine = RuleEngine(metrics_enabled=False)
+    engine.check_text("神医在线")
+    metrics = engine.get_metrics()
+    assert metrics["enabled"] is False
+    assert metrics["texts_scanned"] == 0
+    assert all(rule["hits"] == 0 for rule in metrics["rules"])
+
+
+def test_regex_guard_rejects_and_rewrites(tmp_path):
+    """测试加载时拒绝灾难性回溯规则并改写无界通配"""
+    rules_file = tmp_path / "rules.yaml"
+    rules_file.write_text(
+        "blacklist:\n"
+        "  risky:\n"
+        "    - pattern: \"(\\\\d+\\\\s?)+元\"\n"
+        "      type: \"nested\"\n"
+        "      severity: \"low\"\n"
+        "    - pattern: \"药品.*无副作用\"\n"
+        "      type: \"medical_fraud\"\n"
+        "      severity: \"high\"\n"
+        "whitelist: []\n"
+        "regex_guard:\n"
+        "  max_gap: 10\n",
+        encoding="utf-8"
+    )
+    engine = RuleEngine(str(rules_file))
+    stats = engine.get_statistics()
+    assert [rule["type"] for rule in stats["rejected_rules"]] == ["nested"]
+    assert stats["rewritten_rules"] == ["药品.*无副作用"]
+
+    assert engine.check_text("药品安全无副作用").is_violated is True
+    assert engine.check_text("药品" + "很" * 20 + "无副作用").is_violated is False
+
+
+def test_regex_guard_rejects_ambiguous_alternation(tmp_path):
+    """测试拒绝量词内分支有歧义的规则（短文本上单次匹配不受时间预算约束）"""
+    rules_file = tmp_path / "rules.yaml"
+    rules_file.write_text(
+        "blacklist:\n"
+        "  risky:\n"
+        "    - pattern: \"(?:\\\\d|\\\\d\\\\d)+元\"\n"
+        "      type: \"ambiguous\"\n"
+        "      severity: \"low\"\n"
+        "    - pattern: \"价格\\\\d+元\"\n"
+        "      type: \"price\"\n"
+        "      severity: \"low\"\n"
+        "whitelist: []\n",
+        encoding="utf-8"
+    )
+    engine = RuleEngine(str(rules_file))
+    assert [rule["type"] for rule in engine.get_statistics()["rejected_rules"]] == ["ambiguous"]
+
+    start = time.perf_counter()
+    result = engine.check_text("价格100元，订单号" + "1" * 32 + "。")
+    assert time.perf_counter() - start < 1.0
+    assert result.violation_types == ["price"]
+
+
+def test_regex_guard_segmented_scan(tmp_path):
+    """测试长文本分段执行与整段执行结果一致，超出预算时放弃剩余文本"""
+    rules_file = tmp_path / "rules.yaml"
+    rules_file.write_text(
+        "blacklist:\n"
+        "  contact:\n"
+        "    - pattern: \"QQ[:：\\\\s]*\\\\d{5,12}\"\n"
+        "      type: \"qq_number\"\n"
+        "      severity: \"medium\"\n"
+        "whitelist: []\n"
+        "regex_guard:\n"
+        "  segment_size: 300\n",
+        encoding="utf-8"
+    )
+    text = "".join(f"第{i}条QQ：{10000 + i * 7}，" + "正常" * (i % 50) for i in range(200))
+    engine = RuleEngine(str(rules_file))
+    result = engine.check_text(text)
+    expected = [match.span() for match in re.finditer(r"QQ[:：\s]*\d{5,12}", text)]
+    assert sorted(result.matched_positions) == expected
+
+    rules_file.write_text(
+        rules_file.read_text(encoding="utf-8") + "  time_budget_ms: 0\n", encoding="utf-8"
+    )
+    engine.hot_reload()
+    result = engine.check_text(text)
+    assert 0 < len(result.matched_positions) < len(expected)
+    assert engine.get_metrics()["rules"][0]["budget_exceeded"] == 1
+
+
+def test_noise_tolerant_keywords(rule_engine):
+    """测试关键词字符之间插入干扰字符"""
+    for text, vtype in [
+        ("祖-传-秘-方", "medical_fraud"),
+        ("祖😀传秘方", "medical_fraud"),
+        ("祖 传 秘 方", "medical_fraud"),
+        ("专治 包 治 百 病", "medical_fraud"),
+    ]:
+        result = rule_engine.check_text(text)
+        assert vtype in result.violation_types, text
+
+    result = rule_engine.check_text("正宗祖-传-秘-方")
+    assert "祖-传-秘-方" in result.matched_keywords
+    assert (2, 9) in result.matched_positions
+
+    # 间隔超过上限、或被句读标点隔开时不算命中
+    assert rule_engine.check_text("祖   传   秘   方").is_violated is False
+    assert rule_engine.check_text("买了新钱包，治疗效果").is_violated is False
+
+
+def test_noise_tolerance_false_positives(rule_engine):
+    """测试分词空格和两字词不按干扰字符容忍命中"""
+    for text in [
+        "新款钱包 治愈你的心情",
+        "面包 治好了我的坏心情",
+        "周一 第三 顶 级",
+        "祖传 秘方",
+    ]:
+        assert rule_engine.check_text(text).is_violated is False, text
+
+
+def test_noise_precheck_skips_clean_text(rule_engine, monkeypatch):
+    """测试带空格的干净文本不压缩全文"""
+    from services import rule_engine as rule_engine_module
+
+    calls = []
+    real_re = rule_engine_module._GAP_NOISE_RE
+
+    class CountingRe:
+        def sub(self, *args):
+            calls.append(args)
+            return real_re.sub(*args)
+
+        def __getattr__(self, name):
+            return getattr(real_re, name)
+
+    monkeypatch.setattr(rule_engine_module, "_GAP_NOISE_RE", CountingRe())
+    assert rule_engine.check_text("今天 天气 很好 出去 走走").is_violated is False
+    assert calls == []
+
+    assert "medical_fraud" in rule_engine.check_text("祖-传-秘-方").violation_types
+    assert len(calls) == 1
+
+
+def test_noise_tolerance_disabled(tmp_path):
+    """测试关闭干扰字符容忍"""
+    rules_file = tmp_path / "rules.yaml"
+    rules_file.write_text(
+        "blacklist:\n"
+        "  medical:\n"
+        "    - pattern: \"(祖传秘方|神医)\"\n"
+        "      type: \"medical_fraud\"\n"
+        "      severity: \"critical\"\n"
+        "whitelist: []\n"
+        "noise_tolerance:\n"
+        "  enabled: false\n",
+        encoding="utf-8"
+    )
+    engine = RuleEngine(str(rules_file))
+    assert engine.check_text("祖-传-秘-方").is_violated is False
+    assert engine.check_text("祖传秘方").is_violated is True
+
+
+def test_variant_aliases(rule_engine):
+    """测试替换字写成的字面量还原后仍按原规则命中"""
+    result = rule_engine.check_text("加V信号abc123")
+    assert result.violation_types == ["wechat_id"]
+    assert result.matched_keywords == ["V信号abc123"]
+    assert result.matched_positions == [(1, 10)]
+
+    assert "wechat_id" in rule_engine.check_text("威信号：abc_1").violation_types
+    assert rule_engine.check_text("他在村里很有威信").is_violated is False
+
+
+def test_variant_pinyin_index(tmp_path, monkeypatch):
+    """测试同音字和拼音拼写（用固定读音表代替 pypinyin）"""
+    from utils import pinyin_index
+
+    readings_table = {"神": ("shén", "shen"), "医": ("yī", "yi"), "衣": ("yī", "yi")}
+
+    def readings(chars, tone):
+        return [readings_table.get(char, ("", ""))[0 if tone else 1] for char in chars]
+
+    monkeypatch.setattr(pinyin_index, "PYPINYIN_AVAILABLE", True)
+    monkeypatch.setattr(pinyin_index, "_readings", readings)
+
+    rules_file = tmp_path / "rules.yaml"
+    rules_file.write_text(
+        "blacklist:\n"
+        "  medical:\n"
+        "    - pattern: \"(祖传秘方|神医)\"\n"
+        "      type: \"medical_fraud\"\n"
+        "      severity: \"critical\"\n"
+        "whitelist: []\n"
+        "variant_index:\n"
+        "  homophones: \"衣\"\n",
+        encoding="utf-8"
+    )
+    engine = RuleEngine(str(rules_file))
+
+    result = engine.check_text("找神衣看病")
+    assert result.violation_types == ["medical_fraud"]
+    assert result.matched_keywords == ["神衣"]
+
+    result = engine.check_text("找 Shen Yi 看病")
+    assert result.violation_types == ["medical_fraud"]
+    assert result.matched_keywords == ["Shen Yi"]
+
+    assert engine.check_text("shenyixiao").is_violated is False
+
+
+def test_variant_homophones_with_pypinyin(rule_engine):
+    """测试真实读音下同音字只按配置的候选字还原"""
+    pytest.importorskip("pypinyin")
+
+    for text in ["富含细胞质营养", "弟一次购买", "找个好老师 递衣服", "地一层"]:
+        assert rule_engine.check_text(text).is_violated is False, text
+
+    result = rule_engine.check_text("找神衣看病")
+    assert result.violation_types == ["medical_fraud"]
+    assert result.matched_keywords == ["神衣"]
+
+
+def test_external_lexicon(tmp_path):
+    """测试从外部词库文件加载关键词"""
+    lexicon_dir = tmp_path / "lexicons"
+    lexicon_dir.mkdir()
+    lexicon_file = lexicon_dir / "medical.txt"
+    terms = [f"偏方{i:05d}号" for i in range(5000)]
+    lexicon_file.write_text("# 医疗词库\n\n" + "\n".join(terms) + "\n", encoding="utf-8")
+
+    rules_file = tmp_path / "rules.yaml"
+    rules_file.write_text(
+        "blacklist: {}\n"
+        "whitelist: []\n"
+        "lexicons:\n"
+        "  - path: \"lexicons/medical.txt\"\n"
+        "    category: \"medical\"\n"
+        "    type: \"medical_fraud\"\n"
+        "    severity: \"critical\"\n",
+        encoding="utf-8"
+    )
+    engine = RuleEngine(str(rules_file))
+    stats = engine.get_statistics()
+    assert stats["lexicon_terms"] == 5000
+    assert stats["lexicons"][0]["type"] == "medical_fraud"
+
+    result = engine.check_text("祖传偏方04321号，药到病除")
+    assert result.violation_types == ["medical_fraud"]
+    assert result.severity == "critical"
+    assert engine.check_text("偏方号").is_violated is False
+
+    # 载荷为整数词条ID
+    assert all(isinstance(entry, int) for _, entry in engine.automaton.iter(terms[0]))
+
+    # 词库变化时热更新
+    lexicon_file.write_text("新词条\n", encoding="utf-8")
+    assert engine.hot_reload() is True
+    assert engine.check_text("新词条").is_violated is True
+    assert engine.check_text("偏方04321号").is_violated is False
+
+
+def test_short_circuit_modes(rule_engine):
+    """测试短路检测模式"""
+    text = "我们是最好的，祖传秘方包治百病，QQ：123456"
+    full = rule_engine.check_text(text)
+
+    critical = rule_engine.check_text(text, mode="first_critical")
+    assert critical.is_violated is True
+    assert critical.severity == "critical"
+    assert set(critical.violation_types) <= set(full.violation_types)
+
+    any_hit = rule_engine.check_text(text, mode="any")
+    assert any_hit.is_violated is True
+    assert len(any_hit.violation_types) == 1
+
+    # 没有 critical 命中时 first_critical 检查全部规则，严重程度与完整模式一致
+    text = "全网最好，QQ：123456"
+    assert rule_engine.check_text(text, mode="first_critical").severity == rule_engine.check_text(text).severity
+
+    for mode in ("all", "first_critical", "any"):
+        assert rule_engine.check_text("这是一段正常的广告文案", mode=mode).is_violated is False
+    assert [result.is_violated for result in rule_engine.check_texts(["神医", "正常"], mode="any")] == [True, False]
+
+    with pytest.raises(ValueError):
+        rule_engine.check_text(text, mode="fast")
+
+
+def test_default_scan_mode_collects_evidence(rule_engine):
+    """测试审核流程默认模式返回完整的违规类型、严重程度和证据"""
+    from config.settings import Settings
+
+    mode = Settings().rule_scan_mode
+    assert mode == "all"
+
+    result = rule_engine.check_text("我们是最好的，包治百病", mode=mode)
+    assert set(result.violation_types) == {"extreme_language", "medical_fraud"}
+    assert result.severity == "critical"
+    assert len(result.snippets()) >= 3
+
+
+def test_short_circuit_rule_order(tmp_path):
+    """测试短路模式按命中率和严重程度排序规则"""
+    rules_file = tmp_path / "rules.yaml"
+    rules_file.write_text(
+        "blacklist:\n"
+        "  numbers:\n"
+        "    - pattern: \"\\\\d{6}\"\n"
+        "      type: \"long_number\"\n"
+        "      severity: \"low\"\n"
+        "    - pattern: \"\\\\d{3}\"\n"
+        "      type: \"short_number\"\n"
+        "      severity: \"critical\"\n"
+        "whitelist: []\n",
+        encoding="utf-8"
+    )
+    engine = RuleEngine(str(rules_file))
+    order = engine._rule_order(engine.ruleset, "first_critical")
+    assert [rule["type"] for rule in order] == ["short_number", "long_number"]
+
+    for _ in range(3):
+        engine.check_text("编号123456")
+    engine.ruleset.metrics.hits[1] = 0
+    engine._rule_orders.clear()
+    order = engine._rule_order(engine.ruleset, "any")
+    assert [rule["type"] for rule in order] == ["long_number", "short_number"]
+    assert engine.check_text("编号123456", mode="any").violation_types == ["long_number"]
+
+
+def test_check_bulk(rule_engine):
+    """测试多进程批量检测"""
+    from services.rule_engine import BulkScanReport
+
+    texts = ["祖传秘方包治百病", "这是一段正常的广告文案", "", "QQ：123456"] * 20
+    expected = rule_engine.check_texts(texts)
+
+    for workers in (1, 2):
+        report = BulkScanReport()
+        results = list(rule_engine.check_bulk(iter(texts), workers=workers, chunk_size=7, report=report))
+        assert [result.is_violated for result in results] == [result.is_violated for result in expected]
+        assert [set(result.violation_types) for result in results] == [
+            set(result.violation_types) for result in expected
+        ]
+        assert report.workers == workers
+        assert report.texts == len(texts)
+        assert report.chunks == 12
+        assert report.violations == 40
+        assert report.texts_per_second > 0
+
+    with pytest.raises(ValueError):
+        rule_engine.check_bulk(texts, mode="fast")
+
+
+def test_check_bulk_startup_failures(rule_engine, monkeypatch):
+    """测试进程池启动失败时恢复垃圾回收，快照不可用时直接报错而不是反复重建工作进程"""
+    import gc
+    import multiprocessing
+    import services.rule_engine as rule_engine_module
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        class BrokenContext:
+            def get_start_method(self):
+                return "fork"
+
+            def Pool(self, *args, **kwargs):
+                raise OSError("Too many open files")
+
+        monkeypatch.setattr(rule_engine_module, "_bulk_context", lambda: BrokenContext())
+        with pytest.raises(OSError):
+            list(rule_engine.check_bulk(["神医"] * 4, workers=2))
+        assert gc.get_freeze_count() == 0
+        assert rule_engine_module._bulk_parent_ruleset is None
+
+    # spawn 时快照写入失败：在父进程中报错
+    monkeypatch.setattr(rule_engine_module, "_bulk_context", lambda: multiprocessing.get_context("spawn"))
+    monkeypatch.setattr(RuleEngine, "_save_artifact", lambda self, ruleset, path=None: None)
+    with pytest.raises(RuntimeError):
+        list(rule_engine.check_bulk(["神医"] * 4, workers=2))
+
+
+def test_compact_rule_result(rule_engine):
+    """测试紧凑检测结果"""
+    import pickle
+    from services.rule_engine import EMPTY_RESULT
+
+    # 干净文本共用同一个空结果，修改返回的列表不影响后续结果
+    clean = rule_engine.check_text("这是一段正常的广告文案")
+    assert clean is EMPTY_RESULT
+    assert rule_engine.check_texts(["正常", ""]) == [EMPTY_RESULT, EMPTY_RESULT]
+    clean.violation_types.append("polluted")
+    clean.matched_positions.append((0, 1))
+    assert rule_engine.check_text("正常文本").violation_types == []
+    assert rule_engine.check_text("正常文本").matched_positions == []
+    assert clean.evidence == ""
+    assert clean.severity == "none"
+
+    # 命中结果按首次出现顺序去重，列表属性首次访问后保持同一对象
+    result = rule_engine.check_text("祖传秘方，神医推荐，祖传秘方")
+    assert result.is_violated is True
+    assert result.matched_keywords == ["祖传秘方", "神医"]
+    assert result.violation_types == ["medical_fraud"]
+    assert result.matched_positions is result.matched_positions
+    assert result.evidence == "检测到违规关键词: 祖传秘方, 神医"
+
+    # 与显式构建的结果相等，可序列化（批量扫描的工作进程返回结果）
+    explicit = RuleResult(
+        is_violated=True,
+        violation_types=result.violation_types,
+        matched_keywords=result.matched_keywords,
+        matched_positions=result.matched_positions,
+        severity=result.severity,
+        evidence=result.evidence
+    )
+    assert explicit == result
+    assert pickle.loads(pickle.dumps(result)) == result
+    assert not hasattr(result, "__dict__")
+
+
+def test_exact_match_spans(tmp_path):
+    """测试词库命中的精确区间、命中记录和片段"""
+    lexicon_dir = tmp_path / "lexicons"
+    lexicon_dir.mkdir()
+    (lexicon_dir / "medical.txt").write_text("偏方\n药到病除\n", encoding="utf-8")
+    rules_file = tmp_path / "rules.yaml"
+    rules_file.write_text(
+        "blacklist:\n"
+        "  medical:\n"
+        "    - pattern: \"神医\"\n"
+        "      type: \"medical_fraud\"\n"
+        "      severity: \"critical\"\n"
+        "whitelist: []\n"
+        "lexicons:\n"
+        "  - path: \"lexicons/medical.txt\"\n"
+        "    category: \"medical\"\n"
+        "    type: \"medical_fraud\"\n"
+        "    severity: \"high\"\n",
+        encoding="utf-8"
+    )
+    engine = RuleEngine(str(rules_file))
+
+    # 全角字符归一化后命中，区间映射回原文
+    text = "ＡＢ祖传偏方，保证药到病除，神医坐诊"
+    result = engine.check_text(text)
+    assert result.matched_positions == [(4, 6), (9, 13), (14, 16)]
+    assert result.matched_keywords == ["偏方", "药到病除", "神医"]
+    assert result.severity == "critical"
+
+    # 关键词与正则重合的命中只记录一次，带规则ID；词库命中没有规则ID
+    matches = result.matches
+    assert [(m.rule_id is None, m.keyword) for m in matches] == [
+        (True, "偏方"), (True, "药到病除"), (False, "神医")
+    ]
+    assert all(text[m.start:m.end] == m.keyword for m in matches)
+
+    snippets = result.snippets(context=2)
+    assert snippets[0]["before"] == "祖传"
+    assert snippets[0]["after"] == "，保"
+    assert snippets[2]["severity"] == "critical"
+    assert result.focus_windows(context=1) == ["传偏方，", "证药到病除，神医坐"]
+
+    # 批量检测的区间一致
+    batch = engine.check_texts(["正常", text, "偏方"])
+    assert batch[1].matched_positions == result.matched_positions
+    assert batch[2].matched_positions == [(0, 2)]
+
+    # 显式构建的结果没有命中记录
+    assert RuleResult(False, [], [], [], "none", "").snippets() == []
@@ -103,3 +103,51 @@ def test_api_docs():
     
     response = client.get("/openapi.json")
     assert response.status_code == 200
+
+
+def test_reload_rules_returns_version():
+    """测试重载规则返回当前规则版本"""
+    response = client.post("/api/v1/admin/reload-rules")
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert data["version"] >= 1
+    assert data["content_hash"]
+
+
+def test_rule_metrics_endpoints():
+    """测试规则统计接口"""
+    response = client.get("/api/v1/admin/rule-metrics")
+    assert response.status_code == 200
+    assert "rules" in response.json()["data"]
+
+    response = client.get("/api/v1/metrics/rules")
+    assert response.status_code == 200
+    assert "rule_engine_rule_hits_total" in response.text
+
+
+def test_sync_review_shares_pipeline(monkeypatch):
+    """测试同步审核复用进程内共享的审核流程"""
+    pipeline_module = pytest.importorskip("core.pipeline")
+    ModerationPipeline = pipeline_module.ModerationPipeline
+    from api.routes import get_pipeline
+
+    pipeline = get_pipeline()
+
+    def fail_init(self, *args, **kwargs):
+        raise AssertionError("不应为每个请求创建审核流程")
+
+    monkeypatch.setattr(ModerationPipeline, "__init__", fail_init)
+
+    response = client.post(
+        "/api/v1/review?sync=true",
+        json={"content_type": "text", "content": "包治百病"}
+    )
+    assert response.status_code == 200
+
+    response = client.post(
+        "/api/v1/review/batch?sync=true",
+        json={"items": [{"content_type": "text", "content": "包治百病"}]}
+    )
+    assert response.status_code == 200
+    assert len(response.json()["results"]) == 1
+    assert get_pipeline() is pipeline
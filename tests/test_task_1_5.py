@@ -74,3 +74,248 @@ async def test_extract_text_multi_engine_mock(ocr_service):
     # 由于没有实际图片，这里只测试方法存在性
     assert hasattr(ocr_service, 'extract_text_multi_engine')
     assert callable(ocr_service.extract_text_multi_engine)
+
+
+def test_invalid_executor():
+    """测试不支持的执行方式"""
+    with pytest.raises(ValueError):
+        OCRService(paddle_executor="gpu")
+    with pytest.raises(ValueError):
+        OCRService(tesseract_executor="inline")
+
+
+@pytest.mark.asyncio
+async def test_ocr_does_not_block_event_loop(tmp_path):
+    """测试阻塞的OCR调用在线程池中执行，不阻塞事件循环"""
+    import asyncio
+    import time
+    from PIL import Image
+
+    image_path = tmp_path / "sample.png"
+    Image.new("RGB", (8, 8), "white").save(image_path)
+
+    class SlowTesseract:
+        @staticmethod
+        def image_to_string(image, lang=None):
+            time.sleep(0.3)
+            return "识别文本\n"
+
+    service = OCRService(tesseract_executor="thread", max_workers=2)
+    service.paddle_available = False
+    service.tesseract = SlowTesseract()
+    service.tesseract_available = True
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        for _ in range(20):
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    try:
+        result, _ = await asyncio.gather(service.tesseract_ocr_extract(str(image_path)), ticker())
+    finally:
+        service.shutdown()
+    assert result.text == "识别文本"
+    assert ticks == 20
+
+
+@pytest.mark.asyncio
+async def test_tesseract_subprocess(tmp_path):
+    """测试以异步子进程调用 tesseract 命令行"""
+    import sys
+
+    command = tmp_path / "fake_tesseract"
+    command.write_text(f"#!{sys.executable}\nprint('子进程识别')\n", encoding="utf-8")
+    command.chmod(0o755)
+
+    service = OCRService(tesseract_executor="subprocess", max_workers=2)
+    service.tesseract_cmd = str(command)
+    service.tesseract_available = True
+
+    result = await service.tesseract_ocr_extract("image.png")
+    assert result.text == "子进程识别"
+    assert result.engine == "tesseract"
+
+
+def make_racing_service(mode, engines):
+    """用模拟引擎创建OCR服务：engines 为 {引擎名: (耗时, 置信度)}"""
+    import asyncio
+
+    service = OCRService(mode=mode, confidence_threshold=0.85)
+    service.calls = []
+    service.cancelled = []
+
+    def fake(name, delay, confidence):
+        async def extract(image_path):
+            service.calls.append(name)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                service.cancelled.append(name)
+                raise
+            return OCRResult(text=f"{name}文本", confidence=confidence, engine=name)
+        return extract
+
+    for name in ("paddle", "tesseract", "cloud"):
+        available = name in engines
+        setattr(service, f"{name}_available", available)
+        if available:
+            setattr(service, f"{name}_ocr_extract", fake(name, *engines[name]))
+    return service
+
+
+@pytest.mark.asyncio
+async def test_race_mode_cancels_slower_engines():
+    """测试竞速模式：第一个达到阈值的结果胜出，其余引擎被取消，不调用兜底引擎"""
+    service = make_racing_service("race", {
+        "paddle": (0.01, 0.95), "tesseract": (1.0, 0.8), "cloud": (0.01, 0.99)
+    })
+    text = await service.extract_text_multi_engine("image.png")
+    assert text == "paddle文本"
+    assert service.cancelled == ["tesseract"]
+    assert "cloud" not in service.calls
+
+    stats = service.get_statistics()
+    assert stats["race_wins"]["paddle"] == 1
+    assert stats["race_cancelled"] == 1
+    assert stats["race_fallbacks"] == 0
+
+
+@pytest.mark.asyncio
+async def test_race_mode_fallback_on_low_confidence():
+    """测试本地引擎置信度不足时才调用兜底引擎"""
+    service = make_racing_service("race", {
+        "paddle": (0.01, 0.6), "tesseract": (0.02, 0.8), "cloud": (0.01, 0.99)
+    })
+    assert await service.extract_text_multi_engine("image.png") == "cloud文本"
+    assert service.calls[-1] == "cloud"
+    assert service.get_statistics()["race_fallbacks"] == 1
+
+    # 兜底引擎也不足时，取已有结果中置信度最高的
+    service = make_racing_service("race", {"paddle": (0.01, 0.6), "tesseract": (0.02, 0.8)})
+    assert await service.extract_text_multi_engine("image.png") == "tesseract文本"
+
+
+@pytest.mark.asyncio
+async def test_cascade_mode():
+    """测试级联模式按成本顺序逐个执行，达到阈值即停止"""
+    service = make_racing_service("cascade", {
+        "paddle": (0.01, 0.6), "tesseract": (0.01, 0.9), "cloud": (0.01, 0.99)
+    })
+    assert await service.extract_text_multi_engine("image.png") == "tesseract文本"
+    assert service.calls == ["paddle", "tesseract"]
+
+    # all 模式等待全部引擎
+    assert await service.extract_text_multi_engine("image.png", mode="all") == "cloud文本"
+    with pytest.raises(ValueError):
+        await service.extract_text_multi_engine("image.png", mode="fastest")
+
+
+@pytest.mark.asyncio
+async def test_ocr_cache_reuses_near_duplicates(tmp_path):
+    """测试重新编码、缩放后的素材复用之前的识别结果"""
+    from PIL import Image, ImageDraw
+    from services.ocr_cache import OCRCache
+
+    image = Image.new("RGB", (300, 200), "white")
+    ImageDraw.Draw(image).rectangle([40, 60, 260, 120], fill="red")
+    original = tmp_path / "ad.png"
+    image.save(original)
+    reencoded = tmp_path / "ad.jpg"
+    image.resize((240, 160)).save(reencoded, quality=70)
+
+    service = make_racing_service("race", {"paddle": (0.01, 0.95)})
+    service.cache = OCRCache(radius=6)
+    assert await service.extract_text_multi_engine(str(original)) == "paddle文本"
+    assert await service.extract_text_multi_engine(str(reencoded)) == "paddle文本"
+    assert service.calls == ["paddle"]
+    assert service.get_statistics()["cache"]["near_hits"] + service.cache.hits == 1
+    service.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_ocr_cache_exact_by_default(tmp_path):
+    """测试默认只复用像素相同的图片：同一模板叠加不同文字时重新识别"""
+    from PIL import Image, ImageDraw
+    from services.ocr_cache import OCRCache
+
+    template = Image.new("RGB", (300, 200), "white")
+    ImageDraw.Draw(template).rectangle([40, 60, 260, 120], fill="red")
+    overlaid = template.copy()
+    ImageDraw.Draw(overlaid).text((50, 150), "add wx 123", fill="black")
+    template.save(tmp_path / "template.png")
+    overlaid.save(tmp_path / "overlaid.png")
+
+    service = make_racing_service("race", {"paddle": (0.01, 0.95)})
+    service.cache = OCRCache()
+    assert await service.extract_text_multi_engine(str(tmp_path / "template.png")) == "paddle文本"
+    assert await service.extract_text_multi_engine(str(tmp_path / "overlaid.png")) == "paddle文本"
+    assert await service.extract_text_multi_engine(str(tmp_path / "template.png")) == "paddle文本"
+    assert service.calls == ["paddle", "paddle"]
+    assert service.cache.hits == 1
+    service.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_engines_receive_preprocessed_image(tmp_path):
+    """测试预处理一次后交给各引擎，图片无法解码时退回原路径"""
+    from PIL import Image
+    from utils.image_preprocess import PreprocessedImage
+
+    poster = tmp_path / "poster.jpg"
+    Image.new("RGB", (4000, 2500), "white").save(poster)
+
+    service = make_racing_service("all", {"paddle": (0.0, 0.95), "tesseract": (0.0, 0.8)})
+    service.max_side = 1000
+    received = []
+
+    async def paddle(image):
+        received.append(image)
+        return OCRResult(text="海报文字", confidence=0.95, engine="paddle")
+
+    service.paddle_ocr_extract = paddle
+    assert await service.extract_text_multi_engine(str(poster)) == "海报文字"
+    assert isinstance(received[0], PreprocessedImage)
+    assert received[0].size == (1000, 625)
+
+    assert service.preprocess_image(str(tmp_path / "missing.jpg")) == str(tmp_path / "missing.jpg")
+    service.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_ocr_accepts_image_bytes_and_arrays(tmp_path):
+    """测试直接传入图片字节或像素数组，解码一次后由哈希和各引擎共用"""
+    import io
+    import numpy as np
+    from PIL import Image, ImageDraw
+    from services.ocr_cache import OCRCache
+    from utils.image_preprocess import PreprocessedImage
+
+    image = Image.new("RGB", (300, 200), "white")
+    ImageDraw.Draw(image).rectangle([40, 60, 260, 120], fill="blue")
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+
+    service = make_racing_service("all", {"paddle": (0.0, 0.95), "tesseract": (0.0, 0.8)})
+    service.cache = OCRCache()
+    received = []
+
+    async def paddle(image):
+        received.append(image)
+        return OCRResult(text="上传文字", confidence=0.95, engine="paddle")
+
+    service.paddle_ocr_extract = paddle
+    assert await service.extract_text_multi_engine(buffer.getvalue()) == "上传文字"
+    assert isinstance(received[0], PreprocessedImage)
+    assert received[0].size == (300, 200)
+    assert not received[0].gray.flags.writeable
+
+    # 同一张图的像素数组命中缓存，不再调用引擎
+    assert await service.extract_text_multi_engine(np.asarray(image)) == "上传文字"
+    assert len(received) == 1
+
+    # 无法解码的字节直接返回空文本
+    assert await service.extract_text_multi_engine(b"not an image") == ""
+    service.shutdown()
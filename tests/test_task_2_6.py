@@ -1,4 +1,5 @@
 """Task 2.6: 对接后端API - 单元测试"""
+import ast
 import pytest
 from pathlib import Path
 import sys
@@ -14,12 +15,26 @@ class TestAPIIntegration:
     def test_pipeline_integration(self):
         """测试Pipeline集成"""
         ui_file = project_root / "ui" / "app.py"
-        content = ui_file.read_text(encoding='utf-8')
+        tree = ast.parse(ui_file.read_text(encoding='utf-8'))
+        
+        # 检查从 core.pipeline 导入的名称（与导入语句的写法无关）
+        imported = {
+            alias.name
+            for node in ast.walk(tree)
+            if isinstance(node, ast.ImportFrom) and node.module == "core.pipeline"
+            for alias in node.names
+        }
+        assert {"ModerationPipeline", "ContentData"} <= imported, "缺少Pipeline导入"
         
-        # 检查Pipeline导入和使用
-        assert "from core.pipeline import ModerationPipeline" in content, "缺少Pipeline导入"
-        assert "ModerationPipeline" in content, "未使用Pipeline"
-        assert "st.session_state.pipeline" in content, "未在session中存储Pipeline"
+        # 检查创建Pipeline并存入session
+        stored = [
+            node for node in ast.walk(tree)
+            if isinstance(node, ast.Assign)
+            and isinstance(node.value, ast.Call)
+            and getattr(node.value.func, "id", None) == "ModerationPipeline"
+            and any(ast.unparse(target) == "st.session_state.pipeline" for target in node.targets)
+        ]
+        assert stored, "未在session中存储Pipeline"
     
     def test_service_imports(self):
         """测试服务导入"""
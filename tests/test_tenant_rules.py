@@ -0,0 +1,255 @@
+"""多租户规则集 - 单元测试"""
+import pytest
+
+from services.rule_engine import LayeredRuleSet, RuleEngine, RulesetCache, merge_rule_overlay
+from services.tenant_rules import TenantRuleRegistry
+
+
+BASE_RULES = (
+    "blacklist:\n"
+    "  medical:\n"
+    "    - pattern: \"神医\"\n"
+    "      type: \"medical_fraud\"\n"
+    "      severity: \"critical\"\n"
+    "  contact:\n"
+    "    - pattern: \"QQ[:：]?\\\\d{5,12}\"\n"
+    "      type: \"qq_number\"\n"
+    "      severity: \"medium\"\n"
+    "whitelist: []\n"
+)
+
+LIVE_RULES = (
+    "blacklist:\n"
+    "  live_stream:\n"
+    "    - pattern: \"刷礼物\"\n"
+    "      type: \"live_stream_violation\"\n"
+    "      severity: \"high\"\n"
+    "disabled_categories: [\"contact\"]\n"
+)
+
+
+@pytest.fixture
+def rules_dir(tmp_path):
+    """基础规则和两个内容相同的租户规则"""
+    (tmp_path / "rules.yaml").write_text(BASE_RULES, encoding="utf-8")
+    tenants = tmp_path / "tenants"
+    tenants.mkdir()
+    (tenants / "live_a.yaml").write_text(LIVE_RULES, encoding="utf-8")
+    (tenants / "live_b.yaml").write_text(LIVE_RULES, encoding="utf-8")
+    return tmp_path
+
+
+def make_registry(rules_dir, **kwargs) -> TenantRuleRegistry:
+    return TenantRuleRegistry(
+        str(rules_dir / "rules.yaml"),
+        tenants_dir=str(rules_dir / "tenants"),
+        **kwargs
+    )
+
+
+def test_merge_rule_overlay(tmp_path):
+    """测试租户规则合并"""
+    base = {
+        "blacklist": {"medical": [{"pattern": "神医"}], "contact": [{"pattern": "QQ"}]},
+        "whitelist": ["国家级证书"],
+        "regex_guard": {"max_gap": 50, "time_budget_ms": 50}
+    }
+    overlay = {
+        "blacklist": {"medical": [{"pattern": "偏方"}], "ads": [{"pattern": "秒杀"}]},
+        "disabled_categories": ["contact"],
+        "whitelist": ["国家级证书", "国家级认证"],
+        "lexicons": [{"path": "words.txt"}],
+        "regex_guard": {"max_gap": 20}
+    }
+    merged = merge_rule_overlay(base, overlay, tmp_path)
+    assert [rule["pattern"] for rule in merged["blacklist"]["medical"]] == ["神医", "偏方"]
+    assert set(merged["blacklist"]) == {"medical", "ads"}
+    assert merged["whitelist"] == ["国家级证书", "国家级认证"]
+    assert merged["lexicons"][0]["path"] == str((tmp_path / "words.txt").resolve())
+    assert merged["regex_guard"] == {"max_gap": 20, "time_budget_ms": 50}
+
+    # 输入不被修改
+    assert len(base["blacklist"]["medical"]) == 1
+    assert "contact" in base["blacklist"]
+
+
+def test_tenant_rules(rules_dir):
+    """测试租户规则叠加在基础规则上"""
+    registry = make_registry(rules_dir)
+    assert registry.tenants == ["live_a", "live_b"]
+
+    base = registry.get(None)
+    assert registry.get("unknown") is base
+    assert base.check_text("主播刷礼物").is_violated is False
+    assert base.check_text("QQ:123456").is_violated is True
+
+    live = registry.get("live_a")
+    assert live is registry.get("live_a")
+    assert live.check_text("主播刷礼物").violation_types == ["live_stream_violation"]
+    assert live.check_text("神医坐诊").is_violated is True
+    assert live.check_text("QQ:123456").is_violated is False
+
+
+def test_tenants_share_compiled_ruleset(rules_dir):
+    """测试租户共享基础规则集，只编译增量规则；内容相同的增量规则集也共享，版本和统计各自独立"""
+    registry = make_registry(rules_dir)
+    live_a = registry.get("live_a")
+    live_b = registry.get("live_b")
+
+    assert live_a.content_hash == live_b.content_hash
+    assert live_a.content_hash != registry.base.content_hash
+    assert isinstance(live_a.ruleset, LayeredRuleSet)
+    assert live_a.ruleset.base.automaton is registry.base.automaton
+    assert live_a.ruleset.overlay is live_b.ruleset.overlay
+    assert live_a.ruleset is not live_b.ruleset
+    assert [rule["original"] for rule in live_a.ruleset.overlay.rules] == ["刷礼物"]
+    assert [rule["id"] for rule in live_a.ruleset.rules] == [0, 1, 2]
+
+    live_a.check_text("刷礼物")
+    assert live_a.get_metrics()["texts_scanned"] == 1
+    assert live_b.get_metrics()["texts_scanned"] == 0
+
+    # 基础规则集 + 一份增量规则集；两个租户都命中基础规则集，第二个租户命中增量规则集
+    stats = registry.get_statistics()["ruleset_cache"]
+    assert stats["size"] == 2
+    assert stats["hits"] == 3
+
+
+def test_layered_ruleset_matches_merged_compile(rules_dir):
+    """测试分层检测与合并后整体编译的结果一致"""
+    (rules_dir / "tenants" / "mixed.yaml").write_text(
+        "blacklist:\n"
+        "  medical:\n"
+        "    - pattern: \"(祖传秘方|偏方)\\\\d+号\"\n"
+        "      type: \"medical_fraud\"\n"
+        "      severity: \"high\"\n"
+        "  live_stream:\n"
+        "    - pattern: \"刷礼物\"\n"
+        "      type: \"live_stream_violation\"\n"
+        "      severity: \"high\"\n"
+        "whitelist: [\"神医堂\"]\n"
+        "disabled_categories: [\"contact\"]\n",
+        encoding="utf-8"
+    )
+    registry = make_registry(rules_dir)
+    layered = registry.get("mixed")
+    assert isinstance(layered.ruleset, LayeredRuleSet)
+
+    # 覆盖配置段时退回到整体编译
+    merged_file = rules_dir / "merged.yaml"
+    merged_file.write_text(
+        (rules_dir / "tenants" / "mixed.yaml").read_text(encoding="utf-8")
+        + "regex_guard:\n  max_gap: 64\n",
+        encoding="utf-8"
+    )
+    merged = RuleEngine(str(rules_dir / "rules.yaml"), overlay_path=str(merged_file))
+    assert not isinstance(merged.ruleset, LayeredRuleSet)
+
+    texts = ["神医坐诊，偏方12号", "神医堂开业，QQ:123456", "主播刷礼物", "正常文本", "祖传秘方3号，QQ：888888"]
+    for text in texts:
+        expected = merged.check_text(text)
+        result = layered.check_text(text)
+        assert sorted(result.violation_types) == sorted(expected.violation_types), text
+        assert sorted(result.matched_positions) == sorted(expected.matched_positions), text
+        assert result.severity == expected.severity, text
+
+    batch = layered.check_texts(texts)
+    assert [sorted(r.matched_positions) for r in batch] == \
+        [sorted(layered.check_text(text).matched_positions) for text in texts]
+    for mode in ("first_critical", "any"):
+        assert [layered.check_text(text, mode=mode).is_violated for text in texts] == \
+            [merged.check_text(text).is_violated for text in texts]
+
+    scanner = layered.stream()
+    for char in texts[0]:
+        scanner.feed(char)
+    scanner.close()
+    assert sorted((m.start, m.end) for m in scanner.matches) == sorted(layered.check_text(texts[0]).matched_positions)
+
+
+def test_tenant_lru_eviction(rules_dir):
+    """测试租户规则引擎和编译结果的 LRU 淘汰"""
+    (rules_dir / "tenants" / "ads.yaml").write_text(
+        "blacklist:\n"
+        "  ads:\n"
+        "    - pattern: \"秒杀\"\n"
+        "      type: \"ads\"\n"
+        "      severity: \"low\"\n",
+        encoding="utf-8"
+    )
+    registry = make_registry(rules_dir, cache_size=2, max_tenants=2)
+    live_a = registry.get("live_a")
+    registry.get("live_b")
+    ads = registry.get("ads")
+
+    stats = registry.get_statistics()
+    assert set(stats["loaded_tenants"]) == {"live_b", "ads"}
+    assert stats["evictions"] == 1
+    assert stats["ruleset_cache"]["size"] == 2
+    assert stats["ruleset_cache"]["evictions"] == 1
+
+    # 被卸载的租户再次请求时重新加载
+    assert registry.get("live_a") is not live_a
+    assert ads.check_text("限时秒杀").is_violated is True
+
+
+def test_tenant_hot_reload(rules_dir):
+    """测试租户规则变化、新增和删除"""
+    registry = make_registry(rules_dir)
+    live_a = registry.get("live_a")
+    version = live_a.version
+
+    (rules_dir / "tenants" / "live_a.yaml").write_text(
+        LIVE_RULES.replace("刷礼物", "私下交易"), encoding="utf-8"
+    )
+    (rules_dir / "tenants" / "outdoor.yaml").write_text("whitelist: [\"神医\"]\n", encoding="utf-8")
+    (rules_dir / "tenants" / "live_b.yaml").unlink()
+    assert registry.hot_reload() is True
+
+    assert live_a.version == version + 1
+    assert live_a.check_text("私下交易").is_violated is True
+    assert live_a.check_text("刷礼物").is_violated is False
+    assert registry.get("outdoor").check_text("神医").is_violated is False
+    assert registry.get("live_b") is registry.base
+
+
+def test_ruleset_cache_lru():
+    """测试编译规则集缓存"""
+    class Item:
+        def __init__(self, content_hash):
+            self.content_hash = content_hash
+
+    cache = RulesetCache(capacity=2)
+    cache.put(Item("a"))
+    cache.put(Item("b"))
+    assert cache.get("a").content_hash == "a"
+    cache.put(Item("c"))
+    assert "b" not in cache
+    assert "a" in cache and "c" in cache
+    assert cache.get("b") is None
+    assert cache.get_statistics() == {
+        "size": 2, "capacity": 2, "hits": 1, "misses": 1, "evictions": 1
+    }
+
+
+def test_spawn_bulk_scan_uses_layered_snapshot(rules_dir, monkeypatch):
+    """测试 spawn 工作进程使用完整的组合快照，而不是缓存目录中的增量规则集"""
+    import multiprocessing
+    import services.rule_engine as rule_engine_module
+
+    monkeypatch.setattr(rule_engine_module, "_bulk_context", lambda: multiprocessing.get_context("spawn"))
+    cache_dir = rules_dir / "cache"
+    engine = RuleEngine(
+        str(rules_dir / "rules.yaml"),
+        cache_dir=str(cache_dir),
+        overlay_path=str(rules_dir / "tenants" / "live_a.yaml")
+    )
+    assert isinstance(engine.ruleset, LayeredRuleSet)
+    assert engine.ruleset.overlay.content_hash != engine.content_hash
+    assert not (cache_dir / f"rules-{engine.content_hash}.pkl").exists()
+
+    texts = ["神医来了，刷礼物", "QQ:123456", "正常内容"] * 4
+    expected = [sorted(result.violation_types) for result in engine.check_texts(texts)]
+    assert expected[0] == ["live_stream_violation", "medical_fraud"]
+    results = engine.check_bulk(texts, workers=2, chunk_size=3)
+    assert [sorted(result.violation_types) for result in results] == expected
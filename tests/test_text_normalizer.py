@@ -0,0 +1,69 @@
+"""文本归一化工具 - 单元测试"""
+from utils.text_normalizer import TextNormalizer, map_span
+
+
+def test_normalize_without_removal():
+    """测试仅做逐字映射时不生成偏移表"""
+    normalizer = TextNormalizer()
+    normalized, offsets = normalizer.normalize("ＱＱ號碼")
+    assert normalized == "QQ号码"
+    assert offsets is None
+
+
+def test_normalize_offsets():
+    """测试删除字符后偏移表映射回原文"""
+    normalizer = TextNormalizer()
+    text = "最★好​的"
+    normalized, offsets = normalizer.normalize(text)
+    assert normalized == "最好的"
+    assert list(offsets) == [0, 2, 4]
+    assert map_span(offsets, 0, 2, len(text)) == (0, 3)
+    assert map_span(offsets, 2, 3, len(text)) == (4, 5)
+
+
+def test_ascii_symbols_opt_in():
+    """测试 ASCII 填充符号默认保留，开启 remove_ascii_symbols 后删除"""
+    text = "C# 教程 ~/path *最*好*"
+    normalized, offsets = TextNormalizer().normalize(text)
+    assert normalized == text
+    assert offsets is None
+
+    normalized, offsets = TextNormalizer(remove_ascii_symbols=True).normalize(text)
+    assert normalized == "C 教程 /path 最好"
+    assert map_span(offsets, 11, 13, len(text)) == (14, 17)
+
+
+def test_chained_extra_map():
+    """测试映射结果本身还会被映射时与逐字 translate 一致（不重复映射）"""
+    normalizer = TextNormalizer(extra_map={"甲": "乙", "乙": "丙"})
+    assert normalizer.normalize("甲乙，")[0] == "乙丙,"
+    assert TextNormalizer().normalize("祖傳，祕方！")[0] == "祖传,秘方!"
+
+
+def test_normalize_pattern_escapes_metachars():
+    """测试正则归一化时转义映射出的元字符"""
+    normalizer = TextNormalizer()
+    assert normalizer.normalize_pattern("（祖傳）") == "\\(祖传\\)"
+    assert normalizer.normalize_pattern("QQ[:：]") == "QQ[::]"
+
+
+def test_extra_map_and_removed_chars():
+    """测试自定义映射和删除字符"""
+    normalizer = TextNormalizer(extra_map={"巿": "市"}, extra_removed="-")
+    normalized, offsets = normalizer.normalize("上-巿")
+    assert normalized == "上市"
+    assert list(offsets) == [0, 2]
+
+
+def test_clean_text_returned_unchanged():
+    """测试不含待处理字符的文本原样返回（不做 translate）"""
+    normalizer = TextNormalizer(extra_map={"]": "-"}, extra_removed="^\\")
+    text = "这是一段普通的广告文案 abc 123"
+    normalized, offsets = normalizer.normalize(text)
+    assert normalized is text
+    assert offsets is None
+
+    # 字符类中的元字符按字面匹配
+    normalized, offsets = normalizer.normalize("a]b^c\\d")
+    assert normalized == "a-bcd"
+    assert list(offsets) == [0, 1, 2, 4, 6]
@@ -1,5 +1,6 @@
 """商业违规媒体智能审核系统 - Streamlit UI"""
 import streamlit as st
+import asyncio
 import requests
 import json
 from datetime import datetime, timedelta
@@ -11,7 +12,7 @@ import sys
 # 添加项目根目录到路径
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from core.pipeline import ModerationPipeline
+from core.pipeline import ModerationPipeline, ContentData
 from services.rule_engine import RuleEngine
 from services.ocr_service import OCRService
 from services.llm_service import LLMService
@@ -94,6 +95,19 @@ if 'review_history' not in st.session_state:
     st.session_state.review_history = []
 
 
+def run_pipeline(content_data: ContentData, rule_result=None):
+    """在 Streamlit 脚本中同步执行审核流程
+
+    Args:
+        content_data: 内容数据
+        rule_result: 已有的规则引擎结果（批量审核时预先计算，避免重复检测）
+
+    Returns:
+        Decision: 审核决策
+    """
+    return asyncio.run(st.session_state.pipeline.execute(content_data, rule_result=rule_result))
+
+
 def main():
     """主函数"""
     # 侧边栏导航
@@ -307,23 +321,16 @@ def show_image_review():
             if st.button("🚀 开始审核", type="primary", use_container_width=True):
                 with st.spinner("正在审核中..."):
                     try:
-                        # 保存临时文件
-                        temp_path = Path("data/temp") / uploaded_file.name
-                        temp_path.parent.mkdir(parents=True, exist_ok=True)
-                        temp_path.write_bytes(uploaded_file.getvalue())
-                        
-                        # 执行审核
-                        result = st.session_state.pipeline.review(
-                            content=str(temp_path),
-                            content_type="image"
-                        )
+                        # 执行审核（图片字节直接交给OCR解码，不写临时文件）
+                        result = run_pipeline(ContentData(
+                            content_type="image",
+                            content=uploaded_file.name,
+                            image_data=uploaded_file.getvalue()
+                        ))
                         
                         # 显示结果
                         display_review_result(result, f"图片: {uploaded_file.name}")
                         
-                        # 清理临时文件
-                        temp_path.unlink()
-                        
                     except Exception as e:
                         st.error(f"❌ 审核失败: {str(e)}")
 
@@ -348,11 +355,29 @@ def show_batch_review():
                 results = []
                 progress_bar = st.progress(0)
                 
-                for idx, row in df.iterrows():
+                # 规则引擎整批预筛，命中的内容无需再走后续阶段
+                rule_results = st.session_state.pipeline.rule_engine.check_texts(
+                    [str(content) for content in df['content']],
+                    mode=st.session_state.pipeline.rule_scan_mode
+                )
+                
+                for idx, (_, row) in enumerate(df.iterrows()):
+                    rule_result = rule_results[idx]
+                    if rule_result.is_violated:
+                        results.append({
+                            'content': row['content'][:50] + '...',
+                            'is_compliant': False,
+                            'confidence': 1.0,
+                            'violations': ', '.join(rule_result.violation_types)
+                        })
+                        progress_bar.progress((idx + 1) / len(df))
+                        continue
+                    
                     try:
-                        result = st.session_state.pipeline.review(
-                            content=row['content'],
-                            content_type="text"
+                        # 复用整批预筛的规则结果，流程中不再重复检测
+                        result = run_pipeline(
+                            ContentData(content_type="text", content=str(row['content'])),
+                            rule_result=rule_result
                         )
                         results.append({
                             'content': row['content'][:50] + '...',
@@ -0,0 +1,161 @@
+"""图片感知哈希工具"""
+import hashlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+# dHash 的位数（8 行 x 8 列的相邻像素比较）
+HASH_BITS = 64
+
+# dHash 缩放尺寸：宽比高多一列，每行得到 8 个相邻差值
+_DHASH_SIZE = (9, 8)
+
+
+def dhash(image) -> int:
+    """计算图片的差值哈希（dHash）
+
+    灰度化后缩放到 9x8，逐行比较相邻像素的亮度，得到 64 位整数。
+    重新编码、缩放、轻微调色后的图片哈希基本不变，汉明距离很小。
+
+    Args:
+        image: PIL 图片
+
+    Returns:
+        int: 64 位哈希
+    """
+    from PIL import Image
+
+    gray = image.convert("L").resize(_DHASH_SIZE, Image.LANCZOS)
+    pixels = gray.tobytes()
+    width = _DHASH_SIZE[0]
+    value = 0
+    for row in range(_DHASH_SIZE[1]):
+        offset = row * width
+        for col in range(width - 1):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def image_dhash(image_path: str) -> int:
+    """计算图片文件的 dHash
+
+    Args:
+        image_path: 图片路径
+
+    Returns:
+        int: 64 位哈希
+    """
+    from PIL import Image
+
+    with Image.open(image_path) as image:
+        # 只解码缩略图需要的分辨率（JPEG 可在解码时直接缩小）
+        image.draft("L", (_DHASH_SIZE[0] * 8, _DHASH_SIZE[1] * 8))
+        return dhash(image)
+
+
+def pixel_hash(gray) -> int:
+    """按像素内容计算 64 位哈希
+
+    与 dHash 不同，任意像素变化都会得到不同的哈希，同一模板叠加不同文字的图片不会相同。
+
+    Args:
+        gray: 二维灰度数组
+
+    Returns:
+        int: 64 位哈希
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(f"{gray.shape[0]}x{gray.shape[1]}:".encode("ascii"))
+    digest.update(gray.tobytes())
+    return int.from_bytes(digest.digest(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """两个哈希的汉明距离"""
+    return bin(a ^ b).count("1")
+
+
+class HammingIndex:
+    """按汉明半径查找相近哈希的多索引哈希表
+
+    哈希切分为 ``radius + 1`` 段，每段各建一张 段值 -> 哈希集合 的表。
+    距离不超过 ``radius`` 的两个哈希至少有一段完全相同（抽屉原理），
+    查找时只需比较与查询哈希某一段相同的候选，支持任意删除。
+    """
+
+    def __init__(self, radius: int, bits: int = HASH_BITS):
+        """初始化索引
+
+        Args:
+            radius: 最大汉明距离
+            bits: 哈希位数
+        """
+        if not 0 <= radius < bits:
+            raise ValueError(f"汉明半径超出范围: {radius}")
+        self.radius = radius
+        self.bits = bits
+
+        # 各段的 (右移位数, 掩码)，位数尽量均分
+        count = radius + 1
+        self._segments: List[Tuple[int, int]] = []
+        shift = 0
+        for index in range(count):
+            width = bits // count + (1 if index < bits % count else 0)
+            self._segments.append((shift, (1 << width) - 1))
+            shift += width
+        self._tables: List[Dict[int, set]] = [{} for _ in self._segments]
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _keys(self, value: int) -> Iterator[Tuple[Dict[int, set], int]]:
+        for table, (shift, mask) in zip(self._tables, self._segments):
+            yield table, (value >> shift) & mask
+
+    def add(self, value: int) -> None:
+        """加入哈希（已存在时忽略）"""
+        if self.contains(value):
+            return
+        for table, key in self._keys(value):
+            table.setdefault(key, set()).add(value)
+        self._size += 1
+
+    def remove(self, value: int) -> None:
+        """删除哈希（不存在时忽略）"""
+        if not self.contains(value):
+            return
+        for table, key in self._keys(value):
+            bucket = table[key]
+            bucket.discard(value)
+            if not bucket:
+                del table[key]
+        self._size -= 1
+
+    def contains(self, value: int) -> bool:
+        """哈希是否已在索引中"""
+        table, key = next(self._keys(value))
+        bucket = table.get(key)
+        return bucket is not None and value in bucket
+
+    def nearest(self, value: int) -> Optional[Tuple[int, int]]:
+        """查找半径内最近的哈希
+
+        Args:
+            value: 查询哈希
+
+        Returns:
+            Optional[Tuple[int, int]]: (哈希, 汉明距离)，半径内没有时返回 None
+        """
+        best = None
+        seen = set()
+        for table, key in self._keys(value):
+            for candidate in table.get(key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                distance = hamming_distance(value, candidate)
+                if distance <= self.radius and (best is None or distance < best[1]):
+                    best = (candidate, distance)
+                    if distance == 0:
+                        return best
+        return best
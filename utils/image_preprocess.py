@@ -0,0 +1,276 @@
+"""OCR图像预处理（缩放、灰度化、自适应二值化、倾斜校正）"""
+import io
+from dataclasses import dataclass, field
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+
+# 识别前图片长边的上限（海报等大图缩小到该尺寸，文字仍足够清晰）
+DEFAULT_MAX_SIDE = 1600
+
+# 自适应二值化：局部窗口边长占短边的比例，以及低于局部均值多少视为文字
+BINARIZE_WINDOW_RATIO = 16
+BINARIZE_MIN_WINDOW = 15
+BINARIZE_THRESHOLD = 0.15
+
+# 倾斜校正：搜索范围、步长（度），小于最小角度时不旋转
+DESKEW_MAX_ANGLE = 5.0
+DESKEW_STEP = 0.25
+DESKEW_MIN_ANGLE = 0.3
+
+# 估计倾斜角时最多采样的文字像素数
+DESKEW_SAMPLE_PIXELS = 200_000
+
+
+# 可以直接解码的图片来源：文件路径、编码后的图片数据（PNG/JPEG 等）、像素数组
+ImageSource = Union[str, bytes, bytearray, memoryview, np.ndarray]
+
+
+@dataclass
+class PreprocessedImage:
+    """预处理后的图片（内存中的只读灰度数组，各引擎共用）"""
+    gray: np.ndarray
+    scale: float
+    angle: float
+    original_size: Tuple[int, int]
+    binarize: bool = True
+    _binary: Optional[np.ndarray] = field(default=None, repr=False)
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """(宽, 高)"""
+        return self.gray.shape[1], self.gray.shape[0]
+
+    @property
+    def binary(self) -> np.ndarray:
+        """二值化结果（0 为文字，255 为背景），第一次访问时计算"""
+        if self._binary is None:
+            binary = adaptive_binarize(self.gray)
+            binary.setflags(write=False)
+            self._binary = binary
+        return self._binary
+
+    def to_pil(self, binary: bool = False):
+        """转换为 PIL 图片
+
+        Args:
+            binary: 是否使用二值化结果（``binarize`` 为 False 时忽略）
+
+        Returns:
+            PIL.Image.Image: 灰度图片
+        """
+        from PIL import Image
+        return Image.fromarray(self.binary if binary and self.binarize else self.gray, mode="L")
+
+    def to_png(self, binary: bool = False) -> bytes:
+        """编码为 PNG（交给只接受文件的引擎）
+
+        Args:
+            binary: 是否使用二值化结果
+
+        Returns:
+            bytes: PNG 数据
+        """
+        buffer = io.BytesIO()
+        self.to_pil(binary).save(buffer, format="PNG", compress_level=1)
+        return buffer.getvalue()
+
+
+def decode_gray(
+    source: ImageSource,
+    max_side: Optional[int] = DEFAULT_MAX_SIDE
+) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """解码图片并缩小到长边不超过 ``max_side`` 的只读灰度数组
+
+    来源可以是文件路径、内存中的图片数据（上传内容无需写临时文件）或像素数组
+    （二维灰度，或 RGB/RGBA 三维数组）。JPEG 在解码时直接按 1/2、1/4、1/8 缩小
+    （``draft``），大图不必完整解码。按 EXIF 方向旋转，只缩小不放大。
+
+    Args:
+        source: 图片来源
+        max_side: 长边上限，为 None 时保持原尺寸
+
+    Returns:
+        Tuple[np.ndarray, float, Tuple[int, int]]: (灰度数组, 相对原图的缩放比例, 原图尺寸)
+    """
+    from PIL import Image, ImageOps
+
+    if isinstance(source, np.ndarray):
+        if source.ndim == 2 and source.dtype == np.uint8:
+            image = Image.fromarray(source, mode="L")
+        elif source.ndim == 3 and source.shape[2] in (3, 4):
+            image = Image.fromarray(np.ascontiguousarray(source[..., :3], dtype=np.uint8), mode="RGB").convert("L")
+        else:
+            raise ValueError(f"不支持的像素数组形状: {source.shape}, {source.dtype}")
+        original_size = image.size
+    else:
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        with Image.open(source) as image:
+            original_size = image.size
+            longest = max(original_size)
+            if max_side and longest > max_side:
+                ratio = max_side / longest
+                image.draft("L", (int(original_size[0] * ratio), int(original_size[1] * ratio)))
+            image = ImageOps.exif_transpose(image).convert("L")
+
+    longest = max(image.size)
+    if max_side and longest > max_side:
+        ratio = max_side / longest
+        target = (max(round(image.size[0] * ratio), 1), max(round(image.size[1] * ratio), 1))
+        image = image.resize(target, Image.LANCZOS, reducing_gap=2.0)
+
+    scale = max(image.size) / max(original_size) if max(original_size) else 1.0
+    gray = np.array(image, dtype=np.uint8)
+    gray.setflags(write=False)
+    return gray, scale, original_size
+
+
+def adaptive_binarize(
+    gray: np.ndarray,
+    window: Optional[int] = None,
+    threshold: float = BINARIZE_THRESHOLD
+) -> np.ndarray:
+    """局部均值自适应二值化（Bradley 方法）
+
+    用积分图一次求出每个像素邻域的均值，比局部均值暗 ``threshold`` 以上的像素视为文字，
+    光照不均、渐变背景的海报也能得到清晰的文字。
+
+    Args:
+        gray: 灰度数组
+        window: 邻域边长，为 None 时按短边比例确定
+        threshold: 相对局部均值的暗度阈值
+
+    Returns:
+        np.ndarray: 二值数组（0 为文字，255 为背景）
+    """
+    height, width = gray.shape
+    if window is None:
+        window = max(min(height, width) // BINARIZE_WINDOW_RATIO, BINARIZE_MIN_WINDOW)
+    radius = window // 2
+
+    integral = np.zeros((height + 1, width + 1), dtype=np.int64)
+    np.cumsum(np.cumsum(gray, axis=0, dtype=np.int64), axis=1, out=integral[1:, 1:])
+
+    rows = np.arange(height)
+    cols = np.arange(width)
+    top = np.clip(rows - radius, 0, height)
+    bottom = np.clip(rows + radius + 1, 0, height)
+    left = np.clip(cols - radius, 0, width)
+    right = np.clip(cols + radius + 1, 0, width)
+
+    sums = (
+        integral[bottom][:, right] - integral[top][:, right]
+        - integral[bottom][:, left] + integral[top][:, left]
+    )
+    counts = (bottom - top)[:, None] * (right - left)[None, :]
+
+    text = gray.astype(np.int64) * counts * 100 <= sums * int(round((1 - threshold) * 100))
+    return np.where(text, 0, 255).astype(np.uint8)
+
+
+def estimate_skew(
+    binary: np.ndarray,
+    max_angle: float = DESKEW_MAX_ANGLE,
+    step: float = DESKEW_STEP
+) -> float:
+    """用投影法估计文字行的倾斜角
+
+    把文字像素沿候选角度投影到纵轴，文字行对齐时行直方图最集中（平方和最大）。
+    投影直接对像素坐标计算，不需要逐个角度旋转图片。
+
+    Args:
+        binary: 二值数组（0 为文字）
+        max_angle: 搜索范围（度）
+        step: 搜索步长（度）
+
+    Returns:
+        float: 文字行相对水平方向的倾斜角（度，向右下倾斜为正）
+    """
+    ys, xs = np.nonzero(binary == 0)
+    if len(ys) < 50:
+        return 0.0
+    if len(ys) > DESKEW_SAMPLE_PIXELS:
+        picks = np.linspace(0, len(ys) - 1, DESKEW_SAMPLE_PIXELS).astype(np.int64)
+        ys, xs = ys[picks], xs[picks]
+    ys = ys.astype(np.float64)
+    xs = xs.astype(np.float64) - binary.shape[1] / 2
+
+    best_angle = 0.0
+    best_score = -1.0
+    for angle in np.arange(-max_angle, max_angle + step / 2, step):
+        rows = np.round(ys - xs * np.tan(np.radians(angle))).astype(np.int64)
+        histogram = np.bincount(rows - rows.min())
+        score = float(np.dot(histogram, histogram))
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+    return best_angle
+
+
+def deskew(gray: np.ndarray, angle: float) -> np.ndarray:
+    """按倾斜角旋转灰度图，使文字行水平（空白处填充为白色）
+
+    Args:
+        gray: 灰度数组
+        angle: estimate_skew 得到的倾斜角（度）
+
+    Returns:
+        np.ndarray: 旋转后的灰度数组
+    """
+    from PIL import Image
+
+    rotated = Image.fromarray(gray, mode="L").rotate(
+        angle, resample=Image.BICUBIC, expand=True, fillcolor=255
+    )
+    return np.asarray(rotated, dtype=np.uint8)
+
+
+def preprocess_gray(
+    gray: np.ndarray,
+    scale: float = 1.0,
+    original_size: Optional[Tuple[int, int]] = None,
+    correct_skew: bool = True
+) -> PreprocessedImage:
+    """对已解码的灰度数组做倾斜校正（二值化按需进行）
+
+    Args:
+        gray: 灰度数组（decode_gray 的结果）
+        scale: 相对原图的缩放比例
+        original_size: 原图尺寸，为 None 时使用数组尺寸
+        correct_skew: 是否做倾斜校正
+
+    Returns:
+        PreprocessedImage: 预处理后的图片
+    """
+    original_size = original_size or (gray.shape[1], gray.shape[0])
+    result = PreprocessedImage(gray=gray, scale=scale, angle=0.0, original_size=original_size)
+
+    if correct_skew:
+        angle = estimate_skew(result.binary)
+        if abs(angle) >= DESKEW_MIN_ANGLE:
+            rotated = deskew(gray, angle)
+            rotated.setflags(write=False)
+            result = PreprocessedImage(
+                gray=rotated, scale=scale, angle=angle, original_size=original_size
+            )
+    return result
+
+
+def preprocess_image(
+    source: ImageSource,
+    max_side: Optional[int] = DEFAULT_MAX_SIDE,
+    correct_skew: bool = True
+) -> PreprocessedImage:
+    """OCR前的图像预处理：解码、缩小、灰度化、倾斜校正（二值化按需进行）
+
+    Args:
+        source: 图片路径、图片数据或像素数组
+        max_side: 长边上限
+        correct_skew: 是否做倾斜校正
+
+    Returns:
+        PreprocessedImage: 预处理后的图片
+    """
+    gray, scale, original_size = decode_gray(source, max_side)
+    return preprocess_gray(gray, scale, original_size, correct_skew)
@@ -0,0 +1,113 @@
+"""同音字与拼音变体索引"""
+from typing import Dict, Iterable, List, Optional
+
+try:
+    from pypinyin import Style, lazy_pinyin
+    PYPINYIN_AVAILABLE = True
+except ImportError:  # pragma: no cover - 可选依赖
+    PYPINYIN_AVAILABLE = False
+
+
+# 读音键使用私用区字符，每个读音对应一个字符，键串与原文逐字对应
+_KEY_BASE = 0xF0000
+
+
+def _readings(chars: List[str], tone: bool) -> List[str]:
+    """逐字取默认读音，无读音的字符返回空串"""
+    if not PYPINYIN_AVAILABLE or not chars:
+        return [""] * len(chars)
+    style = Style.TONE if tone else Style.NORMAL
+    # 按单字分段传入，避免词组读音影响单字；无读音的字符逐个占位保持对齐
+    readings = lazy_pinyin(chars, style=style, errors=lambda text: [""] * len(text))
+    if len(readings) != len(chars):
+        readings = [
+            (lazy_pinyin(char, style=style, errors="ignore") or [""])[0] for char in chars
+        ]
+    return readings
+
+
+class VariantKeyer:
+    """把文本逐字映射为读音键
+
+    只为关键词用到的读音分配键：关键词用字、配置的同音替换字（须与某个
+    关键词用字同音才生效）、以及配置的替换字（如 ``V`` -> ``微``）映射到
+    同一个键字符，其余字符保持原样。同音字只取人工整理的候选，不按读音
+    枚举全部汉字——``胞质``、``递衣`` 这类正常词组与关键词同音的情况太多。
+    映射是逐字的 ``str.translate``，键串与原文长度相同、位置一一对应。
+    未安装 pypinyin 时只使用配置的替换字。
+    """
+
+    def __init__(
+        self,
+        terms: Iterable[str],
+        aliases: Optional[Dict[str, str]] = None,
+        tone_sensitive: bool = True,
+        homophones: Iterable[str] = ()
+    ):
+        """预计算映射表
+
+        Args:
+            terms: 关键词
+            aliases: 额外的替换字 -> 标准字
+            tone_sensitive: 是否区分声调（区分时误报更少）
+            homophones: 同音替换字候选
+        """
+        self.tone_sensitive = tone_sensitive
+        self.table: Dict[int, str] = {}
+        self._keys: Dict[str, str] = {}
+
+        term_chars = sorted({char for term in terms for char in term})
+        self.term_codes = frozenset(ord(char) for char in term_chars)
+        for char, reading in zip(term_chars, _readings(term_chars, tone_sensitive)):
+            if reading:
+                self.table[ord(char)] = self._key(reading)
+
+        # 与关键词用字同音的候选字映射到同一个键
+        if PYPINYIN_AVAILABLE and self._keys:
+            chars = sorted({char for char in "".join(homophones) if ord(char) not in self.table})
+            for char, reading in zip(chars, _readings(chars, tone_sensitive)):
+                key = self._keys.get(reading)
+                if key is not None:
+                    self.table[ord(char)] = key
+
+        for source, target in (aliases or {}).items():
+            if len(source) != 1 or len(target) != 1:
+                continue
+            key = self.table.get(ord(target))
+            if key is None:
+                # 目标字没有读音键时以字本身为键
+                key = self.table[ord(target)] = self._key("=" + target)
+            self.table[ord(source)] = key
+
+    def _key(self, reading: str) -> str:
+        """读音对应的键字符"""
+        key = self._keys.get(reading)
+        if key is None:
+            key = self._keys[reading] = chr(_KEY_BASE + len(self._keys))
+        return key
+
+    def variant_chars(self) -> List[str]:
+        """替换字：有读音键但不是关键词用字的字符（同音候选字和配置的替换字）
+
+        关键词用字之间即使同音（如 ``家``/``佳``）也不互相替换，变体命中
+        至少含一个替换字。
+        """
+        return sorted(chr(code) for code in self.table if code not in self.term_codes)
+
+    def keys(self, text: str) -> str:
+        """文本的读音键串"""
+        return text.translate(self.table)
+
+    def spell(self, term: str) -> Optional[str]:
+        """关键词的无声调拼音拼写（如 ``神医`` -> ``shenyi``）
+
+        Args:
+            term: 关键词
+
+        Returns:
+            Optional[str]: 拼写，有字符没有读音或未安装 pypinyin 时返回 None
+        """
+        readings = _readings(list(term), tone=False)
+        if not readings or not all(readings):
+            return None
+        return "".join(readings).lower()
@@ -0,0 +1,495 @@
+"""正则表达式静态分析工具"""
+import re
+from typing import FrozenSet, List, Optional, Tuple
+
+try:  # Python 3.11+
+    from re import _constants as sre_constants
+    from re import _parser as sre_parse
+except ImportError:  # pragma: no cover - Python < 3.11
+    import sre_constants
+    import sre_parse
+
+
+# 字面量集合的最大规模（超过后放弃精确展开）
+MAX_LITERAL_SET = 64
+
+# 字符类中范围展开的最大字符数
+MAX_RANGE_EXPAND = 10
+
+_REPEAT_OPS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT}
+if hasattr(sre_constants, "POSSESSIVE_REPEAT"):
+    _REPEAT_OPS.add(sre_constants.POSSESSIVE_REPEAT)
+
+_ZERO_WIDTH_OPS = {sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT}
+
+# 次数上限超过该值的量词，其分支有歧义时视为有回溯风险
+MAX_AMBIGUOUS_REPEAT = 10
+
+# 判断字符范围与 \d、\s、\w 是否相交时逐个检查的最大字符数（更大的范围视为相交）
+MAX_RANGE_PROBE = 256
+
+_CATEGORY_PATTERNS = {
+    sre_constants.CATEGORY_DIGIT: re.compile(r"\d"),
+    sre_constants.CATEGORY_SPACE: re.compile(r"\s"),
+    sre_constants.CATEGORY_WORD: re.compile(r"\w"),
+}
+
+# 首字符原子：任意字符
+_ANY_CHAR = ("any",)
+
+
+def extract_required_literals(pattern: str) -> Optional[FrozenSet[str]]:
+    """提取正则的必需字面量
+
+    返回一组字面量，正则的任何一次匹配都必然包含其中至少一个。
+    可用于预筛：文本中一个字面量都没出现时，正则不可能匹配。
+
+    Args:
+        pattern: 正则表达式
+
+    Returns:
+        Optional[FrozenSet[str]]: 字面量集合，无法提取时返回 None
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        return None
+
+    if parsed.state.flags & sre_constants.SRE_FLAG_IGNORECASE:
+        return None
+
+    _, required = _analyze_sequence(parsed)
+    return required
+
+
+def extract_exact_literals(pattern: str) -> Optional[FrozenSet[str]]:
+    """提取正则能匹配的全部字符串
+
+    仅当正则等价于一个较小的有限字面量集合时返回（如 ``(祖传秘方|神医)``）；
+    含断言、无界量词、大小写不敏感等情况返回 None。
+
+    Args:
+        pattern: 正则表达式
+
+    Returns:
+        Optional[FrozenSet[str]]: 字面量集合，无法精确展开时返回 None
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        return None
+
+    if parsed.state.flags & sre_constants.SRE_FLAG_IGNORECASE:
+        return None
+    if _has_zero_width(parsed):
+        return None
+
+    exact, _ = _analyze_sequence(parsed)
+    if not exact or "" in exact:
+        return None
+    return exact
+
+
+def _has_zero_width(items) -> bool:
+    """是否含有断言等零宽结构（精确展开时会被忽略，不能视为字面量）"""
+    for op, av in items:
+        if op in _ZERO_WIDTH_OPS:
+            return True
+        if op == sre_constants.SUBPATTERN and _has_zero_width(av[-1]):
+            return True
+        if op == sre_constants.BRANCH and any(_has_zero_width(branch) for branch in av[1]):
+            return True
+        if op in _REPEAT_OPS and _has_zero_width(av[2]):
+            return True
+    return False
+
+
+def _analyze_sequence(items) -> Tuple[Optional[FrozenSet[str]], Optional[FrozenSet[str]]]:
+    """分析一个顺序序列
+
+    Returns:
+        (exact, required): exact 为序列可能匹配的全部字符串（有限且较小时），
+        required 为序列的最佳必需字面量集合
+    """
+    candidates: List[FrozenSet[str]] = []
+    run: Optional[FrozenSet[str]] = frozenset([""])
+    all_exact = True
+
+    for op, av in items:
+        exact, required = _analyze_item(op, av)
+
+        if exact is not None:
+            combined = _concat(run, exact)
+            if combined is not None:
+                run = combined
+                continue
+            # 展开过大，结束当前连续片段
+            candidates.append(run)
+            run = exact
+            all_exact = False
+            continue
+
+        all_exact = False
+        candidates.append(run)
+        run = frozenset([""])
+        if required is not None:
+            candidates.append(required)
+
+    candidates.append(run)
+    return (run if all_exact else None), _best_candidate(candidates)
+
+
+def _analyze_item(op, av) -> Tuple[Optional[FrozenSet[str]], Optional[FrozenSet[str]]]:
+    """分析单个正则节点，返回 (exact, required)"""
+    if op == sre_constants.LITERAL:
+        literal = frozenset([chr(av)])
+        return literal, literal
+
+    if op in _ZERO_WIDTH_OPS:
+        return frozenset([""]), None
+
+    if op == sre_constants.IN:
+        chars = _charset_literals(av)
+        return chars, chars
+
+    if op == sre_constants.SUBPATTERN:
+        add_flags = av[1]
+        if add_flags & sre_constants.SRE_FLAG_IGNORECASE:
+            return None, None
+        return _analyze_sequence(av[-1])
+
+    if hasattr(sre_constants, "ATOMIC_GROUP") and op == sre_constants.ATOMIC_GROUP:
+        return _analyze_sequence(av)
+
+    if op == sre_constants.BRANCH:
+        exacts = []
+        requireds = []
+        for branch in av[1]:
+            exact, required = _analyze_sequence(branch)
+            exacts.append(exact)
+            requireds.append(required)
+        exact = _union(exacts)
+        required = _union(requireds)
+        return exact, required
+
+    if op in _REPEAT_OPS:
+        min_count, max_count, item = av
+        if min_count == 0:
+            return None, None
+        exact, required = _analyze_sequence(item)
+        if exact is not None and min_count == max_count and min_count <= 4:
+            repeated = frozenset([""])
+            for _ in range(min_count):
+                repeated = _concat(repeated, exact)
+                if repeated is None:
+                    break
+            if repeated is not None:
+                return repeated, _best_candidate([repeated])
+        return None, required
+
+    return None, None
+
+
+def _charset_literals(items) -> Optional[FrozenSet[str]]:
+    """展开字符类为字面量集合"""
+    chars = set()
+    for op, av in items:
+        if op == sre_constants.LITERAL:
+            chars.add(chr(av))
+        elif op == sre_constants.RANGE:
+            low, high = av
+            if high - low + 1 > MAX_RANGE_EXPAND:
+                return None
+            chars.update(chr(code) for code in range(low, high + 1))
+        else:
+            # NEGATE、CATEGORY 等无法展开
+            return None
+    return frozenset(chars) if chars else None
+
+
+def _concat(left: FrozenSet[str], right: FrozenSet[str]) -> Optional[FrozenSet[str]]:
+    """字面量集合拼接（笛卡尔积）"""
+    if len(left) * len(right) > MAX_LITERAL_SET:
+        return None
+    return frozenset(a + b for a in left for b in right)
+
+
+def _union(sets: List[Optional[FrozenSet[str]]]) -> Optional[FrozenSet[str]]:
+    """多个分支的并集，任一分支未知时返回 None"""
+    result = set()
+    for item in sets:
+        if item is None:
+            return None
+        result.update(item)
+    if len(result) > MAX_LITERAL_SET:
+        return None
+    return frozenset(result)
+
+
+def _best_candidate(candidates: List[Optional[FrozenSet[str]]]) -> Optional[FrozenSet[str]]:
+    """选择区分度最高的字面量集合（最短字面量最长，其次集合最小）"""
+    best = None
+    best_key = None
+    for candidate in candidates:
+        if not candidate or "" in candidate:
+            continue
+        key = (min(len(item) for item in candidate), -len(candidate))
+        if best_key is None or key > best_key:
+            best = candidate
+            best_key = key
+    return best
+
+
+def max_match_width(pattern: str) -> Optional[int]:
+    """正则一次匹配的最大长度
+
+    Args:
+        pattern: 正则表达式
+
+    Returns:
+        Optional[int]: 最大长度，含无界量词或无法解析时返回 None
+    """
+    try:
+        width = sre_parse.parse(pattern).getwidth()[1]
+    except Exception:
+        return None
+    if width >= sre_constants.MAXREPEAT:
+        return None
+    return width
+
+
+def find_redos_risks(pattern: str) -> List[str]:
+    """检查正则中可能导致灾难性回溯的结构
+
+    识别以下结构，这类正则在不匹配的文本上回溯次数随长度指数增长：
+
+    - 无界量词嵌套（如 ``(a+)+``、``(\\d+\\s?)*``）
+    - 量词内的分支可以匹配相同的前缀（如 ``(a|ab)*c``、``(?:\\d|\\d\\d)+元``）
+    - 量词内的分支本身是变长重复（如 ``(?:\\d{1,3}|,)+``）
+
+    只检查量词次数上限超过 ``MAX_AMBIGUOUS_REPEAT`` 的情况；分支前缀按首字符判断，
+    结果偏保守（首字符相同但随后就能区分的分支也会被拒绝）。
+
+    Args:
+        pattern: 正则表达式
+
+    Returns:
+        List[str]: 风险说明，空列表表示未发现风险
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        return []
+
+    risks: List[str] = []
+    _find_nested_repeats(parsed, False, risks)
+    if not risks:
+        _find_ambiguous_repeats(parsed, risks)
+    return risks
+
+
+def _find_nested_repeats(items, inside_unbounded: bool, risks: List[str]) -> None:
+    """递归查找嵌套在无界量词中的无界量词"""
+    for op, av in items:
+        if op in _REPEAT_OPS:
+            min_count, max_count, item = av
+            unbounded = max_count == sre_constants.MAXREPEAT
+            if unbounded and inside_unbounded:
+                risks.append("无界量词嵌套在无界量词中")
+                return
+            _find_nested_repeats(item, inside_unbounded or unbounded, risks)
+        elif op == sre_constants.SUBPATTERN:
+            _find_nested_repeats(av[-1], inside_unbounded, risks)
+        elif op == sre_constants.BRANCH:
+            for branch in av[1]:
+                _find_nested_repeats(branch, inside_unbounded, risks)
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            _find_nested_repeats(av[1], inside_unbounded, risks)
+        elif hasattr(sre_constants, "ATOMIC_GROUP") and op == sre_constants.ATOMIC_GROUP:
+            _find_nested_repeats(av, inside_unbounded, risks)
+        if risks:
+            return
+
+
+def _find_ambiguous_repeats(items, risks: List[str]) -> None:
+    """递归查找分支有歧义的量词（见 find_redos_risks）"""
+    for op, av in items:
+        if op in _REPEAT_OPS:
+            min_count, max_count, item = av
+            if max_count == sre_constants.MAXREPEAT or max_count > MAX_AMBIGUOUS_REPEAT:
+                alternatives = _alternatives(item)
+                if any(_is_variable_repeat(alternative) for alternative in alternatives):
+                    risks.append("量词内的分支是变长重复")
+                    return
+                # 解析时会提取分支的公共前缀（``a|ab`` 变为 ``a(?:|b)``），出现空分支说明
+                # 一个分支是另一个的前缀
+                if any(_has_empty_branch(alternative) for alternative in alternatives):
+                    risks.append("量词内的分支可以匹配相同的前缀")
+                    return
+                firsts = [_first_chars(alternative)[0] for alternative in alternatives]
+                for i in range(len(firsts)):
+                    for j in range(i + 1, len(firsts)):
+                        if _chars_overlap(firsts[i], firsts[j]):
+                            risks.append("量词内的分支可以匹配相同的前缀")
+                            return
+            _find_ambiguous_repeats(item, risks)
+        elif op == sre_constants.SUBPATTERN:
+            _find_ambiguous_repeats(av[-1], risks)
+        elif op == sre_constants.BRANCH:
+            for branch in av[1]:
+                _find_ambiguous_repeats(branch, risks)
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            _find_ambiguous_repeats(av[1], risks)
+        elif hasattr(sre_constants, "ATOMIC_GROUP") and op == sre_constants.ATOMIC_GROUP:
+            _find_ambiguous_repeats(av, risks)
+        if risks:
+            return
+
+
+def _unwrap(items):
+    """去掉只包含一个分组的外层括号"""
+    while len(items) == 1 and items[0][0] == sre_constants.SUBPATTERN:
+        items = items[0][1][-1]
+    return items
+
+
+def _alternatives(items) -> List:
+    """量词重复体的各个分支（没有分支时为重复体本身）"""
+    items = _unwrap(items)
+    if len(items) == 1 and items[0][0] == sre_constants.BRANCH:
+        return [_unwrap(branch) for branch in items[0][1][1]]
+    return [items]
+
+
+def _has_empty_branch(items) -> bool:
+    """序列中是否有包含空分支的分支结构"""
+    return any(op == sre_constants.BRANCH and any(not branch for branch in av[1]) for op, av in items)
+
+
+def _is_variable_repeat(items) -> bool:
+    """分支是否只由一个次数不固定的量词构成（如 ``\\d{1,3}``）"""
+    return len(items) == 1 and items[0][0] in _REPEAT_OPS and items[0][1][0] != items[0][1][1]
+
+
+def _first_chars(items) -> Tuple[List[tuple], bool]:
+    """序列匹配的首字符（原子列表）及序列能否匹配空串
+
+    原子为 ``("range", 起, 止)``、``("cat", 类别)`` 或 ``_ANY_CHAR``。
+    """
+    atoms: List[tuple] = []
+    for op, av in items:
+        if op == sre_constants.LITERAL:
+            atoms.append(("range", av, av))
+            return atoms, False
+        if op == sre_constants.IN:
+            atoms.extend(_charset_atoms(av))
+            return atoms, False
+        if op in _ZERO_WIDTH_OPS:
+            continue
+        if op == sre_constants.SUBPATTERN:
+            item_atoms, nullable = _first_chars(av[-1])
+        elif hasattr(sre_constants, "ATOMIC_GROUP") and op == sre_constants.ATOMIC_GROUP:
+            item_atoms, nullable = _first_chars(av)
+        elif op == sre_constants.BRANCH:
+            item_atoms, nullable = [], False
+            for branch in av[1]:
+                branch_atoms, branch_nullable = _first_chars(branch)
+                item_atoms.extend(branch_atoms)
+                nullable = nullable or branch_nullable
+        elif op in _REPEAT_OPS:
+            item_atoms, nullable = _first_chars(av[2])
+            nullable = nullable or av[0] == 0
+        else:
+            # ANY、NOT_LITERAL、反向引用等
+            atoms.append(_ANY_CHAR)
+            return atoms, op == sre_constants.GROUPREF
+        atoms.extend(item_atoms)
+        if not nullable:
+            return atoms, False
+    return atoms, True
+
+
+def _charset_atoms(items) -> List[tuple]:
+    """字符类的首字符原子"""
+    atoms = []
+    for op, av in items:
+        if op == sre_constants.LITERAL:
+            atoms.append(("range", av, av))
+        elif op == sre_constants.RANGE:
+            atoms.append(("range", av[0], av[1]))
+        elif op == sre_constants.CATEGORY and av in _CATEGORY_PATTERNS:
+            atoms.append(("cat", av))
+        else:
+            # NEGATE、\D 等反向类别
+            return [_ANY_CHAR]
+    return atoms
+
+
+def _chars_overlap(left: List[tuple], right: List[tuple]) -> bool:
+    """两组首字符原子是否可能相交"""
+    return any(_atoms_overlap(a, b) for a in left for b in right)
+
+
+def _atoms_overlap(a: tuple, b: tuple) -> bool:
+    if a is _ANY_CHAR or b is _ANY_CHAR:
+        return True
+    if a[0] == "range" and b[0] == "range":
+        return a[1] <= b[2] and b[1] <= a[2]
+    if a[0] == "cat" and b[0] == "cat":
+        return a[1] == b[1] or {a[1], b[1]} == {sre_constants.CATEGORY_DIGIT, sre_constants.CATEGORY_WORD}
+    char_range, category = (a, b) if a[0] == "range" else (b, a)
+    if char_range[2] - char_range[1] >= MAX_RANGE_PROBE:
+        return True
+    pattern = _CATEGORY_PATTERNS[category[1]]
+    return any(pattern.match(chr(code)) for code in range(char_range[1], char_range[2] + 1))
+
+
+def bound_wildcards(pattern: str, max_gap: int) -> str:
+    """把无界通配 ``.*`` / ``.+`` 改写为有界窗口 ``.{0,max_gap}`` / ``.{1,max_gap}``
+
+    量词后缀（``?`` 非贪婪、``+`` 占有）原样保留；字符类和转义中的 ``.`` 不处理。
+
+    Args:
+        pattern: 正则表达式
+        max_gap: 通配最多跨越的字符数
+
+    Returns:
+        str: 改写后的正则，无需改写时原样返回
+    """
+    result = []
+    i = 0
+    length = len(pattern)
+    in_class = False
+
+    while i < length:
+        char = pattern[i]
+        if char == "\\":
+            result.append(pattern[i:i + 2])
+            i += 2
+            continue
+        if in_class:
+            if char == "]":
+                in_class = False
+            result.append(char)
+            i += 1
+            continue
+        if char == "[":
+            # 字符类开头的 ^ 和 ] 是字面量的一部分
+            end = i + 1
+            if end < length and pattern[end] == "^":
+                end += 1
+            if end < length and pattern[end] == "]":
+                end += 1
+            result.append(pattern[i:end])
+            in_class = True
+            i = end
+            continue
+        if char == "." and i + 1 < length and pattern[i + 1] in "*+":
+            low = 0 if pattern[i + 1] == "*" else 1
+            result.append(f".{{{low},{max_gap}}}")
+            i += 2
+            continue
+        result.append(char)
+        i += 1
+
+    return "".join(result)
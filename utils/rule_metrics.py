@@ -0,0 +1,201 @@
+"""规则命中与耗时统计"""
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# 默认每多少条文本对正则耗时采样一次
+DEFAULT_SAMPLE_RATE = 64
+
+
+class RuleMetrics:
+    """规则级计数器
+
+    每条规则占数组中的一个槽位（命中次数、采样的正则耗时、采样次数），
+    记录时只做下标自增，不查字典、不加锁。正则耗时按 ``sample_rate`` 抽样计时，
+    避免每条文本都调用计时器。多线程并发时可能丢失少量增量，仅用于观测。
+    最后一个槽位记录合并正则（无字面量规则共用一次扫描）的耗时。
+    """
+
+    def __init__(
+        self,
+        labels: Sequence[Tuple[str, str, str]],
+        sample_rate: int = DEFAULT_SAMPLE_RATE
+    ):
+        """初始化计数器
+
+        Args:
+            labels: 每条规则的 (类别, 类型, 原始正则)，下标即规则ID
+            sample_rate: 每多少条文本采样一次正则耗时
+        """
+        self.labels = list(labels)
+        self.sample_rate = max(int(sample_rate), 1)
+
+        size = len(self.labels) + 1
+        self.hits = array("Q", [0]) * size
+        self.regex_time_ns = array("Q", [0]) * size
+        self.regex_samples = array("Q", [0]) * size
+        self.budget_exceeded = array("Q", [0]) * size
+
+        self.texts_scanned = 0
+        self.chars_scanned = 0
+        self.sampled_texts = 0
+
+    @property
+    def combined_slot(self) -> int:
+        """合并正则的槽位"""
+        return len(self.labels)
+
+    def record_text(self, text: str) -> bool:
+        """记录一条待检测文本
+
+        Args:
+            text: 待检测文本
+
+        Returns:
+            bool: 本条文本是否需要对正则计时
+        """
+        self.texts_scanned += 1
+        self.chars_scanned += len(text)
+        if self.texts_scanned % self.sample_rate == 0:
+            self.sampled_texts += 1
+            return True
+        return False
+
+    def record_regex_time(self, slot: int, elapsed_ns: int) -> None:
+        """记录一次采样的正则耗时"""
+        self.regex_time_ns[slot] += elapsed_ns
+        self.regex_samples[slot] += 1
+
+    def record_budget_exceeded(self, slot: int) -> None:
+        """记录一次正则超出时间预算"""
+        self.budget_exceeded[slot] += 1
+
+    def inherit(self, previous: Optional["RuleMetrics"]) -> None:
+        """从旧规则快照的计数器继承累计值
+
+        热更新后规则ID会变化，按 (类别, 类型, 原始正则) 对应，
+        未修改的规则保留累计命中，新增规则从零开始。
+
+        Args:
+            previous: 旧快照的计数器
+        """
+        if previous is None:
+            return
+
+        previous_slots = {label: slot for slot, label in enumerate(previous.labels)}
+        for slot, label in enumerate(self.labels):
+            old_slot = previous_slots.get(label)
+            if old_slot is None:
+                continue
+            self.hits[slot] = previous.hits[old_slot]
+            self.regex_time_ns[slot] = previous.regex_time_ns[old_slot]
+            self.regex_samples[slot] = previous.regex_samples[old_slot]
+            self.budget_exceeded[slot] = previous.budget_exceeded[old_slot]
+
+        combined = self.combined_slot
+        self.regex_time_ns[combined] = previous.regex_time_ns[previous.combined_slot]
+        self.regex_samples[combined] = previous.regex_samples[previous.combined_slot]
+        self.budget_exceeded[combined] = previous.budget_exceeded[previous.combined_slot]
+        self.texts_scanned = previous.texts_scanned
+        self.chars_scanned = previous.chars_scanned
+        self.sampled_texts = previous.sampled_texts
+
+    def snapshot(self) -> Dict:
+        """导出当前统计
+
+        Returns:
+            Dict: 全局计数和每条规则的命中、平均正则耗时，以及从未命中的规则
+        """
+        rules: List[Dict] = []
+        for slot, (category, vtype, pattern) in enumerate(self.labels):
+            rules.append({
+                "rule_id": slot,
+                "category": category,
+                "type": vtype,
+                "pattern": pattern,
+                "hits": self.hits[slot],
+                "regex_samples": self.regex_samples[slot],
+                "avg_regex_us": self._average_us(slot),
+                "budget_exceeded": self.budget_exceeded[slot]
+            })
+
+        return {
+            "texts_scanned": self.texts_scanned,
+            "chars_scanned": self.chars_scanned,
+            "sampled_texts": self.sampled_texts,
+            "sample_rate": self.sample_rate,
+            "combined_regex": {
+                "regex_samples": self.regex_samples[self.combined_slot],
+                "avg_regex_us": self._average_us(self.combined_slot),
+                "budget_exceeded": self.budget_exceeded[self.combined_slot]
+            },
+            "rules": rules,
+            "dead_rules": [rule["rule_id"] for rule in rules if rule["hits"] == 0]
+        }
+
+    def render_prometheus(self, prefix: str = "rule_engine") -> str:
+        """导出 Prometheus 文本格式
+
+        Args:
+            prefix: 指标名前缀
+
+        Returns:
+            str: Prometheus 文本格式的指标
+        """
+        lines = [
+            f"# HELP {prefix}_texts_scanned_total Texts scanned by the rule engine.",
+            f"# TYPE {prefix}_texts_scanned_total counter",
+            f"{prefix}_texts_scanned_total {self.texts_scanned}",
+            f"# HELP {prefix}_chars_scanned_total Characters scanned by the rule engine.",
+            f"# TYPE {prefix}_chars_scanned_total counter",
+            f"{prefix}_chars_scanned_total {self.chars_scanned}",
+            f"# HELP {prefix}_sampled_texts_total Texts whose regex time was sampled.",
+            f"# TYPE {prefix}_sampled_texts_total counter",
+            f"{prefix}_sampled_texts_total {self.sampled_texts}",
+        ]
+
+        label_sets = [
+            f'rule_id="{slot}",category="{_escape(category)}",type="{_escape(vtype)}"'
+            for slot, (category, vtype, _) in enumerate(self.labels)
+        ]
+        label_sets.append('rule_id="combined",category="",type=""')
+
+        lines.append(f"# HELP {prefix}_rule_hits_total Matches reported per rule.")
+        lines.append(f"# TYPE {prefix}_rule_hits_total counter")
+        for slot, labels in enumerate(label_sets[:-1]):
+            lines.append(f"{prefix}_rule_hits_total{{{labels}}} {self.hits[slot]}")
+
+        lines.append(f"# HELP {prefix}_rule_regex_seconds_total Sampled regex time per rule.")
+        lines.append(f"# TYPE {prefix}_rule_regex_seconds_total counter")
+        for slot, labels in enumerate(label_sets):
+            seconds = self.regex_time_ns[slot] / 1e9
+            lines.append(f"{prefix}_rule_regex_seconds_total{{{labels}}} {seconds:.9f}")
+
+        lines.append(f"# HELP {prefix}_rule_regex_samples_total Sampled regex executions per rule.")
+        lines.append(f"# TYPE {prefix}_rule_regex_samples_total counter")
+        for slot, labels in enumerate(label_sets):
+            lines.append(f"{prefix}_rule_regex_samples_total{{{labels}}} {self.regex_samples[slot]}")
+
+        lines.append(
+            f"# HELP {prefix}_rule_regex_budget_exceeded_total "
+            "Regex scans stopped early after exceeding the time budget."
+        )
+        lines.append(f"# TYPE {prefix}_rule_regex_budget_exceeded_total counter")
+        for slot, labels in enumerate(label_sets):
+            lines.append(
+                f"{prefix}_rule_regex_budget_exceeded_total{{{labels}}} {self.budget_exceeded[slot]}"
+            )
+
+        return "\n".join(lines) + "\n"
+
+    def _average_us(self, slot: int) -> float:
+        """某个槽位的平均正则耗时（微秒）"""
+        samples = self.regex_samples[slot]
+        if not samples:
+            return 0.0
+        return round(self.regex_time_ns[slot] / samples / 1000, 3)
+
+
+def _escape(value: str) -> str:
+    """转义 Prometheus 标签值"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,203 @@
+"""文本归一化工具"""
+import re
+from array import array
+from typing import Dict, Iterable, Optional, Tuple
+
+
+# 零宽及不可见字符（直接删除）
+INVISIBLE_CHARS = "\u00ad\u180e\u200b\u200c\u200d\u200e\u200f\u2060\u2061\u2062\u2063\u2064\ufeff"
+
+# 常见的填充符号（插在字符之间规避检测，直接删除）：全角和装饰性符号
+NOISE_SYMBOLS = "＊＃～·•・★☆♡♥❤♪"
+
+# ASCII 填充符号：``C#``、Markdown、``~/path`` 等正常内容也会用到，默认不删除，
+# 需要时通过 ``remove_ascii_symbols`` 开启
+ASCII_NOISE_SYMBOLS = "*#~^`"
+
+# 常用繁体字 -> 简体字（逐字两两成对）
+TRADITIONAL_PAIRS = (
+    "國国級级極极醫医藥药療疗癒愈傳传祕秘號号無无獨独絕绝對对專专權权證证認认"
+    "產产價价優优買买賣卖貨货錢钱總总統统質质頂顶終终強强萬万億亿靈灵驗验體体"
+    "減减純纯淨净實实際际廣广聯联繫系電电話话碼码網网絡络購购點点擊击現现時时"
+    "間间門门開开關关會会說说讀读書书學学習习們们個个來来為为這这麼么與与業业"
+    "務务員员東东車车長长從从裡里後后邊边經经營营銷销費费報报導导歡欢樂乐愛爱"
+    "頭头臉脸膚肤顏颜紅红護护膽胆腎肾臟脏腦脑氣气補补養养壯壮陽阳陰阴風风濕湿"
+    "節节壓压測测試试機机構构診诊斷断術术師师禮礼贈赠獎奖賭赌貸贷還还額额財财"
+    "賺赚虧亏穩稳賠赔險险託托資资幣币銀银帳账戶户掃扫維维線线單单雙双條条樣样"
+    "幾几兩两寶宝貝贝裝装衛卫隊队軍军選选舉举譽誉榮荣稱称領领標标準准規规範范"
+    "狀状態态廠厂鐘钟輕轻鬆松嚴严違违據据處处罰罚顯显齊齐備备復复雜杂難难題题"
+    "歷历紀纪錄录憑凭轉转運运動动達达遠远適适讓让訊讯詢询計计劃划語语調调諮咨"
+    "議议設设織织續续紹绍綠绿細细結结給给約约紙纸組组練练緊紧創创則则劑剂勞劳"
+    "勢势區区協协參参變变數数於于樓楼樹树檢检歲岁歸归殺杀漢汉灣湾燒烧牆墙獲获"
+    "環环畫画當当盡尽監监盤盘礦矿確确種种積积窮穷筆笔簡简糧粮緣缘羅罗義义聖圣"
+    "聞闻聽听職职脫脱興兴舊旧蘭兰蟲虫衝冲見见視视親亲覺觉觀观訂订記记許许評评"
+    "詞词詳详誤误誰谁課课請请論论諾诺謝谢識识讚赞豐丰負负貢贡責责賀贺貴贵賞赏"
+    "賴赖趕赶跡迹軟软較较載载輔辅輸输辦办農农遺遗鄰邻釋释針针鋼钢錯错鍵键鎮镇"
+    "閃闪閱阅陸陆陳陈隨随雖虽雞鸡離离雲云靜静響响頁页項项順顺須须預预頻频飛飞"
+    "飯饭飲饮館馆馬马驚惊鬥斗魚鱼鳥鸟鹽盐麥麦黃黄齒齿龍龙徵征癥症"
+)
+
+# 正则元字符（归一化正则时，映射结果是元字符的需要转义）
+_REGEX_SPECIAL = set("()[]{}.*+?|^$\\")
+
+
+def char_class(codes: Iterable[int]) -> str:
+    """把码点集合写成正则字符类（连续码点合并为区间）"""
+    ranges = []
+    for code in sorted(set(codes)):
+        if ranges and code == ranges[-1][1] + 1:
+            ranges[-1][1] = code
+        else:
+            ranges.append([code, code])
+    parts = []
+    for first, last in ranges:
+        if first == last:
+            parts.append(re.escape(chr(first)))
+        else:
+            parts.append(f"{re.escape(chr(first))}-{re.escape(chr(last))}")
+    return "[" + "".join(parts) + "]"
+
+
+def _build_char_map(extra_map: Optional[Dict[str, str]] = None) -> Dict[int, str]:
+    """构建逐字映射表（全角转半角、繁体转简体）"""
+    char_map: Dict[int, str] = {}
+
+    # 全角 ASCII -> 半角，全角空格 -> 半角空格
+    for code in range(0xFF01, 0xFF5F):
+        char_map[code] = chr(code - 0xFEE0)
+    char_map[0x3000] = " "
+
+    for traditional, simplified in zip(TRADITIONAL_PAIRS[0::2], TRADITIONAL_PAIRS[1::2]):
+        char_map[ord(traditional)] = simplified
+
+    for source, target in (extra_map or {}).items():
+        if len(source) == 1 and len(target) == 1:
+            char_map[ord(source)] = target
+
+    return char_map
+
+
+class TextNormalizer:
+    """文本归一化器
+
+    检测前先把文本归一化一次：删除零宽字符和填充符号、全角转半角、繁体转简体，
+    避免为每种变体单独编写正则。所有操作都是逐字映射或删除，基于预先构建的
+    ``str.translate`` 表；有字符被删除时额外生成一个 ``array`` 偏移表，
+    用于把归一化文本中的位置映射回原文。
+
+    多数文本只有少量几种需要处理的字符（如全角逗号）：用字符类正则找出出现的字符，
+    逐个 ``str.replace``，不对整段文本做 ``translate``（字典表逐字查找，比正则和
+    ``replace`` 慢得多）；一个都没有时直接返回原文。映射结果本身还会被映射时
+    （如自定义的链式映射）逐个替换会重复映射，退回 ``translate``。
+    """
+
+    def __init__(
+        self,
+        extra_map: Optional[Dict[str, str]] = None,
+        extra_removed: Iterable[str] = (),
+        remove_ascii_symbols: bool = False
+    ):
+        """初始化归一化器
+
+        Args:
+            extra_map: 额外的逐字映射（如异体字）
+            extra_removed: 额外需要删除的字符
+            remove_ascii_symbols: 是否同时删除 ASCII 填充符号（``ASCII_NOISE_SYMBOLS``）
+        """
+        char_map = _build_char_map(extra_map)
+        removed = set(INVISIBLE_CHARS) | set(NOISE_SYMBOLS) | set(extra_removed)
+        if remove_ascii_symbols:
+            removed |= set(ASCII_NOISE_SYMBOLS)
+
+        # 删除的字符优先于映射
+        self.table: Dict[int, Optional[str]] = dict(char_map)
+        for char in removed:
+            self.table[ord(char)] = None
+
+        # 规则侧只做映射不做删除，映射结果为正则元字符时转义
+        self.pattern_table: Dict[int, str] = {
+            code: ("\\" + target if target in _REGEX_SPECIAL else target)
+            for code, target in char_map.items()
+        }
+
+        self._removed_re = re.compile(
+            "[" + "".join(re.escape(char) for char in sorted(removed)) + "]+"
+        )
+        self._mappable_re = re.compile(char_class(self.table))
+        self._mappable_runs_re = re.compile(char_class(self.table) + "+")
+        self._replaceable = not any(
+            target is not None and any(ord(char) in self.table for char in target)
+            for target in self.table.values()
+        )
+
+    def normalize(self, text: str) -> Tuple[str, Optional[array]]:
+        """归一化文本
+
+        Args:
+            text: 原始文本
+
+        Returns:
+            Tuple[str, Optional[array]]: (归一化文本, 偏移表)。
+            偏移表第 i 项为归一化文本第 i 个字符在原文中的位置；
+            没有字符被删除时位置一一对应，偏移表为 None。
+        """
+        first = self._mappable_re.search(text)
+        if first is None:
+            return text, None
+        if self._replaceable:
+            runs = self._mappable_runs_re.findall(text, first.start())
+            normalized = text
+            for char in set("".join(runs)):
+                normalized = normalized.replace(char, self.table[ord(char)] or "")
+        else:
+            normalized = text.translate(self.table)
+        if len(normalized) == len(text):
+            return normalized, None
+
+        offsets = array("I")
+        pos = 0
+        for match in self._removed_re.finditer(text):
+            offsets.extend(range(pos, match.start()))
+            pos = match.end()
+        offsets.extend(range(pos, len(text)))
+        return normalized, offsets
+
+    def normalize_keyword(self, keyword: str) -> str:
+        """归一化关键词（与文本使用同一张表）"""
+        return keyword.translate(self.table)
+
+    def normalize_pattern(self, pattern: str) -> str:
+        """归一化正则表达式
+
+        只做逐字映射、不删除字符，映射结果为正则元字符时加转义，
+        保证规则与归一化后的文本使用同一种写法。
+
+        Args:
+            pattern: 原始正则
+
+        Returns:
+            str: 归一化后的正则
+        """
+        return pattern.translate(self.pattern_table)
+
+
+def map_span(offsets: Optional[array], start: int, end: int, original_length: int) -> Tuple[int, int]:
+    """把归一化文本中的区间映射回原文
+
+    Args:
+        offsets: 偏移表（None 表示位置一一对应）
+        start: 起始位置
+        end: 结束位置（不含）
+        original_length: 原文长度
+
+    Returns:
+        Tuple[int, int]: 原文中的区间
+    """
+    if offsets is None:
+        return start, end
+    original_start = offsets[start] if start < len(offsets) else original_length
+    if end > start:
+        original_end = offsets[end - 1] + 1
+    else:
+        original_end = original_start
+    return original_start, original_end